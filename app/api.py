@@ -1,14 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import init_db
+from app.database import DeadlineExceeded, init_db
 from app.routes import main_router
+from app.services.role_expiry import role_expiry
+from app.utils.routes_utils import FastJSONResponse
 
 init_db()
+# Назначения ролей меняются через HTTP: планировщик истечения живет в HTTP процессах
+role_expiry.start()
 
 app = FastAPI(
     title="PermissionServiceAndAuth",
     debug=True,
+    default_response_class=FastJSONResponse,
 )
 
 app.include_router(main_router)
+
+
+@app.exception_handler(DeadlineExceeded)
+def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    # Бюджет времени SQL маршрута исчерпан (HTTP_DB_BUDGET, HTTP_ROUTE_DB_BUDGETS)
+    return FastJSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "Превышено время выполнения запроса"},
+    )
@@ -1,31 +1,214 @@
 import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Annotated
 
 from dotenv import load_dotenv
-from fastapi import Depends
-from sqlalchemy import create_engine
+from fastapi import Depends, Request, Response
+from sqlalchemy import Engine, Pool, Select, create_engine, event
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
 load_dotenv()
 
-DATABASE_URL = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+DATABASE_URL = (
+    os.getenv("DATABASE_URL")
+    or f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+)
+# Реплика для чтения (по умолчанию выключена, все запросы идут в основную БД)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+# Сколько секунд после записи клиент читает из основной БД (read-your-writes)
+REPLICA_STICKY_SECONDS = int(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "5"))
+REPLICA_STICKY_COOKIE = "db_primary"
+# Бюджет времени SQL на HTTP запрос (секунды, 0 - без ограничения)
+HTTP_DB_BUDGET = float(os.getenv("HTTP_DB_BUDGET", "0"))
+# Бюджеты отдельных маршрутов: "GET /api/as/users/all=10;POST /api/as/users/import=0"
+HTTP_ROUTE_DB_BUDGETS = {
+    route.strip(): float(budget)
+    for route, _, budget in (
+        item.rpartition("=") for item in os.getenv("HTTP_ROUTE_DB_BUDGETS", "").split(";")
+    )
+    if route.strip()
+}
+# Таймауты длиннее этого считаются отсутствием дедлайна (gRPC без дедлайна)
+MAX_DEADLINE = 24 * 3600
+# MySQL: запрос прерван по MAX_EXECUTION_TIME
+MYSQL_QUERY_TIMEOUT = 3024
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _create_engine(url: str):
+    if url.startswith("sqlite"):
+        # SQLite используется для локальной проверки; сессии живут в пуле потоков
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(url)
+
+
+engine = _create_engine(DATABASE_URL)
+replica_engine = _create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+
+
+class RoutingSession(Session):
+    """
+    Сессия, отправляющая SELECT в реплику.
+
+    Реплика используется, только если сессия создана для чтения
+    (info["use_replica"]) и еще ничего не записывала. После первой записи все
+    запросы сессии идут в основную БД, чтобы читать свои изменения.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            replica_engine is not None
+            and self.info.get("use_replica")
+            and not self.info.get("wrote")
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            return replica_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def _mark_write(session: Session) -> None:
+    if session.info.get("wrote"):
+        return
+    session.info["wrote"] = True
+    on_write = session.info.get("on_write")
+    if on_write is not None:
+        on_write()
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _on_execute(orm_execute_state) -> None:
+    if not orm_execute_state.is_select:
+        _mark_write(orm_execute_state.session)
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _on_flush(session, flush_context, instances) -> None:
+    _mark_write(session)
+
+
+class DeadlineExceeded(Exception):
+    """Дедлайн запроса истек до или во время выполнения SQL"""
+
+
+def set_deadline(db: Session, timeout: float | None) -> None:
+    """
+    Ограничивает SQL запросы сессии временем timeout секунд от текущего момента.
+
+    SELECT в MySQL получает подсказку MAX_EXECUTION_TIME по оставшемуся времени,
+    сервер сам прерывает запрос и соединение сразу возвращается в пул. Запрос
+    после истечения дедлайна не отправляется. В обоих случаях - DeadlineExceeded.
+    """
+    if timeout is None or timeout > MAX_DEADLINE:
+        return
+    db.info["deadline"] = time.monotonic() + timeout
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _on_begin(session, transaction, connection) -> None:
+    deadline = session.info.get("deadline")
+    if deadline is not None:
+        connection.info["deadline"] = deadline
+
+
+@event.listens_for(Pool, "checkin")
+def _on_checkin(dbapi_connection, connection_record) -> None:
+    if connection_record.info.pop("deadline", None) is not None and hasattr(
+        dbapi_connection, "set_progress_handler"
+    ):
+        dbapi_connection.set_progress_handler(None, 0)
+
+
+@event.listens_for(Engine, "before_cursor_execute", retval=True)
+def _apply_deadline(conn, cursor, statement, parameters, context, executemany):
+    deadline = conn.info.get("deadline")
+    if deadline is None:
+        return statement, parameters
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("Deadline exceeded before SQL statement")
+
+    if conn.dialect.name == "mysql":
+        stripped = statement.lstrip()
+        if stripped[:6].upper() == "SELECT":
+            timeout_ms = max(1, int(remaining * 1000))
+            statement = f"SELECT /*+ MAX_EXECUTION_TIME({timeout_ms}) */{stripped[6:]}"
+    elif conn.dialect.name == "sqlite":
+        # SQLite (локальная проверка): прерывание через обработчик прогресса
+        cursor.connection.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+    return statement, parameters
+
+
+@event.listens_for(Engine, "handle_error")
+def _deadline_error(context) -> None:
+    conn = context.connection
+    deadline = conn.info.get("deadline") if conn is not None and not conn.closed else None
+    if deadline is None:
+        return
+
+    original = context.original_exception
+    code = original.args[0] if original is not None and original.args else None
+    if (
+        code == MYSQL_QUERY_TIMEOUT
+        or "interrupted" in str(original)
+        or time.monotonic() >= deadline
+    ):
+        raise DeadlineExceeded("Deadline exceeded during SQL statement") from original
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-def get_db() -> Session:  # pyright: ignore[reportInvalidTypeForm]
+def get_db(request: Request, response: Response) -> Session:  # pyright: ignore[reportInvalidTypeForm]
     db = SessionLocal()
+    if replica_engine is not None:
+        # GET без недавних записей клиента читает из реплики
+        db.info["use_replica"] = request.method in ("GET", "HEAD") and (
+            REPLICA_STICKY_COOKIE not in request.cookies
+        )
+        db.info["on_write"] = lambda: response.set_cookie(
+            REPLICA_STICKY_COOKIE, "1", max_age=REPLICA_STICKY_SECONDS, httponly=True
+        )
+
+    route = request.scope.get("route")
+    budget = HTTP_ROUTE_DB_BUDGETS.get(
+        f"{request.method} {getattr(route, 'path', request.url.path)}", HTTP_DB_BUDGET
+    )
+    if budget > 0:
+        set_deadline(db, budget)
     try:
         yield db  # pyright: ignore[reportReturnType]
     finally:
         db.close()
 
 
+def get_read_db() -> Session:  # pyright: ignore[reportInvalidTypeForm]
+    """Сессия для обработчиков только на чтение вне HTTP (gRPC проверки)"""
+    db = SessionLocal(info={"use_replica": True})
+    try:
+        yield db  # pyright: ignore[reportReturnType]
+    finally:
+        db.close()
+
+
+@contextmanager
+def use_primary(db: Session) -> Iterator[Session]:
+    """Временно направляет чтения сессии в основную БД"""
+    use_replica = db.info.get("use_replica", False)
+    db.info["use_replica"] = False
+    try:
+        yield db
+    finally:
+        db.info["use_replica"] = use_replica
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
 
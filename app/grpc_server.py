@@ -0,0 +1,35 @@
+import grpc
+
+from app.middleware.grpc_admission import AdmissionExecutor, AdmissionInterceptor
+from app.services.permission_grpc_service import PermissionGrpcService
+from app.services.user_grpc_service import UserGrpcService
+from generated.permission_pb2_grpc import (
+    add_PermissionServiceServicer_to_server,
+    add_UserServiceServicer_to_server,
+)
+
+
+def create_grpc_server(
+    address: str, max_workers: int = 10, reuse_port: bool = False
+) -> grpc.Server:
+    """
+    Создает gRPC сервер со всеми сервисами
+
+    Args:
+        address: Адрес для прослушивания (например, "0.0.0.0:8383")
+        max_workers: Количество потоков обработки запросов (очередь с приоритетами
+            и лимитами - app/middleware/grpc_admission.py)
+        reuse_port: Разрешить нескольким процессам слушать один порт (SO_REUSEPORT)
+    """
+    options = [("grpc.so_reuseport", 1 if reuse_port else 0)]
+
+    server = grpc.server(
+        AdmissionExecutor(max_workers),
+        interceptors=[AdmissionInterceptor()],
+        options=options,
+    )
+    add_PermissionServiceServicer_to_server(PermissionGrpcService(), server)
+    add_UserServiceServicer_to_server(UserGrpcService(), server)
+    server.add_insecure_port(address)
+
+    return server
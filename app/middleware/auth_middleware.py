@@ -1,4 +1,5 @@
 import hashlib
+import time
 from datetime import datetime, timezone
 from typing import Annotated
 
@@ -11,6 +12,7 @@ from app.models.session import SessionDB
 from app.models.user import User
 from app.repositories.permission_repository import PermissionRepository
 from app.repositories.session_repository import SessionRepository
+from app.services.audit_log import audit_log
 
 
 def require_permission(entity: str, action: str):
@@ -20,7 +22,11 @@ def require_permission(entity: str, action: str):
         session_token: str | None = Cookie(default=None, alias="session"),
         db: Session = Depends(get_db),
     ):
+        started = time.perf_counter()
+        code = f"{service_name}:{entity}:{action}"
+
         if not session_token:
+            audit_log.record(None, code, status.HTTP_401_UNAUTHORIZED, "http", started)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Session token missing"
             )
@@ -30,6 +36,7 @@ def require_permission(entity: str, action: str):
         session = session_repository.get_by_token(session_token)
 
         if not session:
+            audit_log.record(None, code, status.HTTP_401_UNAUTHORIZED, "http", started)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid session")
 
         perm_repository = PermissionRepository(db)
@@ -37,8 +44,10 @@ def require_permission(entity: str, action: str):
         exist = perm_repository.exist_by_user_id(str(session.user_id), service_name, entity, action)
 
         if not exist:
+            audit_log.record(str(session.user_id), code, status.HTTP_403_FORBIDDEN, "http", started)
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа")
 
+        audit_log.record(str(session.user_id), code, status.HTTP_200_OK, "http", started)
         return session
 
     return dependency
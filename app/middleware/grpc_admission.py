@@ -0,0 +1,247 @@
+"""
+Контроль допуска и сброс нагрузки gRPC сервера
+
+AdmissionInterceptor помечает обработчик каждого вызова, AdmissionExecutor
+заменяет ThreadPoolExecutor сервера:
+
+- ограничивает число ожидающих и выполняющихся вызовов на метод и в сумме;
+  сверх лимита вызов сразу отклоняется с RESOURCE_EXHAUSTED; отказы отвечает
+  отдельный поток, а не пул, поэтому ответ не ждет освобождения занятых потоков;
+- берет из очереди вызовы по приоритету: проверки прав (ValidatePermission)
+  раньше массовых GetUsers;
+- пропускает вызовы, дедлайн которых истек, пока они ждали в очереди
+  (DEADLINE_EXCEEDED без обращения к БД);
+- долгие потоки (WatchRevocations) выполняются в отдельных потоках вне пула и
+  общего лимита, чтобы подписчики не занимали потоки проверок; их число
+  ограничено своим лимитом;
+- считает время ожидания в очереди, счетчики доступны в /api/as/metrics (grpc.*).
+
+Счетчик ожидающих уменьшается в задаче пула, а не в обработчике: gRPC не
+вызывает обработчик, если клиент отменил вызов, пока тот стоял в очереди.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+
+import grpc
+
+from app.utils import metrics
+
+# Максимум ожидающих и выполняющихся вызовов процесса
+GRPC_MAX_PENDING = int(os.getenv("GRPC_MAX_PENDING", "1000"))
+# Максимум ожидающих и выполняющихся массовых вызовов (GetUsers)
+GRPC_BULK_MAX_PENDING = int(os.getenv("GRPC_BULK_MAX_PENDING", "20"))
+# Максимум открытых долгих потоков процесса (WatchRevocations)
+GRPC_MAX_STREAMS = int(os.getenv("GRPC_MAX_STREAMS", "100"))
+
+
+@dataclass(frozen=True)
+class MethodPolicy:
+    # Меньше - раньше берется из очереди
+    priority: int
+    max_pending: int
+    # Вызов держит поток долго: выполняется в отдельном потоке, а не в пуле
+    long_lived: bool = False
+
+
+METHOD_POLICIES = {
+    "/generated.permission.PermissionService/ValidatePermission": MethodPolicy(0, GRPC_MAX_PENDING),
+    "/generated.permission.UserService/GetUsers": MethodPolicy(1, GRPC_BULK_MAX_PENDING),
+    "/generated.permission.PermissionService/WatchRevocations": MethodPolicy(
+        1, GRPC_MAX_STREAMS, long_lived=True
+    ),
+}
+DEFAULT_POLICY = MethodPolicy(1, GRPC_MAX_PENDING)
+
+
+class MethodStats:
+    def __init__(self, method: str, policy: MethodPolicy) -> None:
+        self.method = method
+        self.policy = policy
+        self.pending = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        metrics.register(f"grpc.{method.rsplit('/', 1)[-1]}", self.stats)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "pending": self.pending,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "queue_ms_avg": round(self.queue_time_total / self.admitted * 1000, 3)
+            if self.admitted
+            else 0.0,
+            "queue_ms_max": round(self.queue_time_max * 1000, 3),
+        }
+
+
+class _AdmittedBehavior:
+    """Обработчик вызова с решением о допуске; решение принимает AdmissionExecutor.submit"""
+
+    def __init__(self, behavior, stats: MethodStats) -> None:
+        self.behavior = behavior
+        self.stats = stats
+        self.rejected = False
+        self.called = False
+        self.submitted_at = 0.0
+
+    def __call__(self, request, context: grpc.ServicerContext):
+        if self.rejected:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Server is overloaded")
+
+        remaining = context.time_remaining()
+        if remaining is not None and remaining <= 0:
+            context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, "Deadline expired in queue")
+
+        self.called = True
+        return self.behavior(request, context)
+
+
+class AdmissionInterceptor(grpc.ServerInterceptor):
+    def __init__(self) -> None:
+        self._stats: dict[str, MethodStats] = {}
+        self._lock = threading.Lock()
+
+    def _method_stats(self, method: str) -> MethodStats:
+        stats = self._stats.get(method)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(
+                    method, MethodStats(method, METHOD_POLICIES.get(method, DEFAULT_POLICY))
+                )
+        return stats
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+
+        stats = self._method_stats(handler_call_details.method)
+        if handler.unary_unary is not None:
+            return handler._replace(unary_unary=_AdmittedBehavior(handler.unary_unary, stats))
+        if handler.unary_stream is not None:
+            return handler._replace(unary_stream=_AdmittedBehavior(handler.unary_stream, stats))
+        return handler
+
+
+class AdmissionExecutor(Executor):
+    """Пул потоков с очередью по приоритету методов и лимитами ожидающих вызовов"""
+
+    def __init__(self, max_workers: int, max_pending: int = GRPC_MAX_PENDING) -> None:
+        self.max_pending = max_pending
+        self.pending = 0
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        # Отказы: обработчик отклоненного вызова только отвечает RESOURCE_EXHAUSTED
+        self._rejects: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(
+                target=self._worker, args=(self._queue,), name=f"grpc-worker-{i}", daemon=True
+            )
+            for i in range(max_workers)
+        ]
+        self._threads.append(
+            threading.Thread(
+                target=self._worker, args=(self._rejects,), name="grpc-reject", daemon=True
+            )
+        )
+        for thread in self._threads:
+            thread.start()
+
+    def _admit(self, admitted: _AdmittedBehavior) -> int:
+        """Решение о допуске; возвращает приоритет задачи (для отклоненного - не важен)"""
+        stats = admitted.stats
+        long_lived = stats.policy.long_lived
+        with self._lock:
+            if (
+                not long_lived and self.pending >= self.max_pending
+            ) or stats.pending >= stats.policy.max_pending:
+                admitted.rejected = True
+                stats.rejected += 1
+                return stats.policy.priority
+            if not long_lived:
+                self.pending += 1
+            stats.pending += 1
+        admitted.submitted_at = time.monotonic()
+        return stats.policy.priority
+
+    def _release(self, admitted: _AdmittedBehavior) -> None:
+        with self._lock:
+            if not admitted.stats.policy.long_lived:
+                self.pending -= 1
+            admitted.stats.pending -= 1
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        if self._shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+        admitted = next((arg for arg in args if isinstance(arg, _AdmittedBehavior)), None)
+        priority = self._admit(admitted) if admitted is not None else DEFAULT_POLICY.priority
+
+        future: Future = Future()
+        if admitted is not None and not admitted.rejected and admitted.stats.policy.long_lived:
+            threading.Thread(
+                target=self._execute,
+                args=(fn, args, kwargs, future, admitted),
+                name="grpc-stream",
+                daemon=True,
+            ).start()
+            return future
+
+        tasks = self._rejects if admitted is not None and admitted.rejected else self._queue
+        tasks.put((priority, next(self._seq), fn, args, kwargs, future, admitted))
+        return future
+
+    def _worker(self, tasks: queue.PriorityQueue) -> None:
+        while True:
+            _, _, fn, args, kwargs, future, admitted = tasks.get()
+            if fn is None:
+                return
+            self._execute(fn, args, kwargs, future, admitted)
+
+    def _execute(
+        self, fn, args, kwargs, future: Future, admitted: _AdmittedBehavior | None
+    ) -> None:
+        try:
+            if admitted is not None and not admitted.rejected:
+                stats = admitted.stats
+                queue_time = time.monotonic() - admitted.submitted_at
+                stats.admitted += 1
+                stats.queue_time_total += queue_time
+                if queue_time > stats.queue_time_max:
+                    stats.queue_time_max = queue_time
+
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+        finally:
+            if admitted is not None and not admitted.rejected:
+                if not admitted.called:
+                    # Дедлайн истек в очереди или клиент отменил вызов
+                    # (тогда gRPC сам не вызывает обработчик)
+                    admitted.stats.expired += 1
+                self._release(admitted)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self._shutdown = True
+        for thread in self._threads:
+            # Остановка после уже принятых вызовов
+            tasks = self._rejects if thread.name == "grpc-reject" else self._queue
+            tasks.put((float("inf"), next(self._seq), None, (), {}, None, None))
+        if wait:
+            for thread in self._threads:
+                thread.join()
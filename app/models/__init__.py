@@ -1,6 +1,9 @@
+from app.models.audit_log import AuthzAuditRecord
+from app.models.authz_version import AuthzChange, AuthzVersion
+from app.models.effective_permission import UserEffectivePermission
 from app.models.gender import Gender
 from app.models.permission import PermissionBase, PermissionResponse
-from app.models.role import RoleResponse
+from app.models.role import RoleClosure, RoleParent, RoleResponse
 from app.models.service import Service, ServiceBase, ServiceCreate, ServiceResponse
 from app.models.user import User
 from app.models.user_roles import UserRole
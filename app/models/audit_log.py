@@ -0,0 +1,25 @@
+from sqlalchemy import CHAR, Boolean, Column, DateTime, Float, Integer, SmallInteger, String
+
+from app.database import Base
+
+
+class AuthzAuditRecord(Base):
+    """
+    Решение авторизации (ValidatePermission, require_permission).
+
+    Пишется пакетами фоновым потоком app.services.audit_log. Внешних ключей нет:
+    записи должны переживать удаление пользователей.
+    """
+
+    __tablename__ = "authz_audit_log"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    user_id = Column(CHAR(36), index=True)
+    # Проверяемый код "service:entity:action"
+    code = Column(String(255), nullable=False)
+    allowed = Column(Boolean, nullable=False)
+    status_code = Column(SmallInteger, nullable=False)
+    # Кто спрашивал: http или grpc:<x-source-service | адрес клиента>
+    source = Column(String(255), nullable=False)
+    latency_ms = Column(Float, nullable=False)
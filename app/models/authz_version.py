@@ -0,0 +1,41 @@
+from sqlalchemy import Column, DateTime, Integer, String, func
+
+from app.database import Base
+
+# Ключ глобального поколения авторизационных данных (роли, разрешения, назначения)
+AUTHZ_GENERATION = "authz"
+
+# Версии таблиц для кэша ответов списков: меняются при любой записи, влияющей на список
+SERVICES_TABLE = "table:services"
+PERMISSIONS_TABLE = "table:permissions"
+# Включает назначения ролей и разрешений: список ролей содержит их количество
+ROLES_TABLE = "table:roles"
+
+
+def user_key(user_id: str) -> str:
+    """Ключ изменения набора ролей пользователя"""
+    return f"user:{user_id}"
+
+
+def role_key(role_id: str) -> str:
+    """Ключ изменения роли или ее набора разрешений"""
+    return f"role:{role_id}"
+
+
+class AuthzVersion(Base):
+    __tablename__ = "authz_versions"
+
+    key = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class AuthzChange(Base):
+    """Журнал изменившихся сущностей для точечной инвалидации кэшей в других процессах"""
+
+    __tablename__ = "authz_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Индекс: последняя запись пользователя и его ролей (AuthzVersionRepository.user_version)
+    key = Column(String(100), nullable=False, index=True)
+    # Время сервера БД: читатели сравнивают его только между собой, без учета часов приложений
+    created_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
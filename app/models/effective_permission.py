@@ -0,0 +1,26 @@
+from sqlalchemy import CHAR, Column, ForeignKey, Index, String
+
+from app.database import Base
+
+
+class UserEffectivePermission(Base):
+    """
+    Денормализованные итоговые разрешения пользователя (user_roles x role_permissions).
+
+    Поддерживается инкрементально репозиториями при изменении назначений,
+    перестраивается командой python -m cmd.effective_permissions rebuild.
+    """
+
+    __tablename__ = "user_effective_permissions"
+
+    user_id = Column(CHAR(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    permission_id = Column(
+        CHAR(36), ForeignKey("permissions.id", ondelete="CASCADE"), primary_key=True
+    )
+    permission_code = Column(String(255), nullable=False)
+    service_id = Column(CHAR(36))
+
+    __table_args__ = (
+        Index("ix_user_effective_permissions_user_code", "user_id", "permission_code"),
+        Index("ix_user_effective_permissions_user_service", "user_id", "service_id"),
+    )
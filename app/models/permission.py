@@ -3,8 +3,8 @@ from datetime import datetime
 from typing import TYPE_CHECKING, Union
 
 from pydantic import BaseModel, Field, computed_field
-from sqlalchemy import CHAR, Column, DateTime, ForeignKey, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import CHAR, Column, DateTime, ForeignKey, Index, String
+from sqlalchemy.orm import relationship, validates
 
 from ..database import Base
 
@@ -12,12 +12,30 @@ if TYPE_CHECKING:
     from app.models.service import ServiceBase
 
 
+def parse_code(code: str | None) -> tuple[str | None, str | None, str | None]:
+    """Сегменты кода "service:entity:action"; отсутствующие сегменты - None"""
+    if not code:
+        return None, None, None
+    parts = code.split(":", 2)
+    if len(parts) < 2:
+        return None, None, None
+    return parts[0], parts[1], parts[2] if len(parts) == 3 else None
+
+
 class Permission(Base):
     __tablename__ = "permissions"
+    __table_args__ = (
+        # Проверки с wildcard "all" - поиск по диапазонам индекса вместо LIKE
+        Index("ix_permissions_code_parts", "code_service", "code_entity", "code_action"),
+    )
 
     id = Column(CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     service_id = Column(CHAR(36), ForeignKey("services.id"))
     code = Column(String(255))
+    # Сегменты code, заполняются автоматически при изменении code
+    code_service = Column(String(255))
+    code_entity = Column(String(255))
+    code_action = Column(String(255))
     name = Column(String(255))
     description = Column(String(500))
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -25,6 +43,11 @@ class Permission(Base):
     roles = relationship("Role", secondary="role_permissions", back_populates="permissions")
     service = relationship("Service", back_populates="permissions")
 
+    @validates("code")
+    def _set_code_parts(self, key: str, code: str | None) -> str | None:
+        self.code_service, self.code_entity, self.code_action = parse_code(code)
+        return code
+
 
 class PermissionBase(BaseModel):
     service_id: str | None = Field(default=None)
@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import TYPE_CHECKING
 
 from pydantic import BaseModel, Field, computed_field
-from sqlalchemy import CHAR, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import CHAR, Column, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -43,6 +43,34 @@ class RolePermission(Base):
     granted_at = Column(DateTime, default=datetime.utcnow)
 
 
+class RoleParent(Base):
+    """Наследование: роль role_id получает все разрешения роли parent_id"""
+
+    __tablename__ = "role_parents"
+
+    role_id = Column(CHAR(36), ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
+    parent_id = Column(
+        CHAR(36), ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+
+class RoleClosure(Base):
+    """
+    Транзитивное замыкание role_parents: роль и все ее предки, включая саму роль.
+
+    Поддерживается RoleHierarchyRepository при изменении ролей и связей,
+    поэтому разрешения с учетом наследования читаются одним join без рекурсии.
+    """
+
+    __tablename__ = "role_closure"
+
+    role_id = Column(CHAR(36), ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
+    ancestor_id = Column(CHAR(36), ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
+
+    # Обратный поиск: все наследники роли
+    __table_args__ = (Index("ix_role_closure_ancestor", "ancestor_id", "role_id"),)
+
+
 class RoleBase(BaseModel):
     service_id: str | None = Field(default=None)
     name: str = Field()
@@ -69,3 +97,25 @@ class RoleResponse(RoleBase):
 class RoleAddPermission(BaseModel):
     role_id: str
     perm_id: str
+
+
+class RoleAddParent(BaseModel):
+    role_id: str
+    parent_id: str
+
+
+# Максимум id в одном массовом запросе
+BULK_MAX_IDS = 5000
+
+
+class RoleBulkPermissions(BaseModel):
+    role_id: str
+    add: list[str] = Field(default_factory=list, max_length=BULK_MAX_IDS)
+    remove: list[str] = Field(default_factory=list, max_length=BULK_MAX_IDS)
+
+
+class BulkAssignResult(BaseModel):
+    added: list[str] = Field(default_factory=list)
+    removed: list[str] = Field(default_factory=list)
+    skipped: list[str] = Field(default_factory=list)  # уже назначены (add) или не назначены (remove)
+    missing: list[str] = Field(default_factory=list)  # не существуют
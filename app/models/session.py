@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 
 from pydantic import BaseModel
-from sqlalchemy import CHAR, Column, DateTime, ForeignKey, String
+from sqlalchemy import CHAR, Column, DateTime, ForeignKey, String, func
 
 from ..database import Base
 
@@ -13,7 +13,21 @@ class SessionDB(Base):
     id = Column(CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(CHAR(36), ForeignKey("users.id"))
     token_hash = Column(String(64))
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
+
+
+class RevokedSession(Base):
+    """Отозванные сессии: подписанные токены проверяются без sessions, поэтому отзыв хранится отдельно"""
+
+    __tablename__ = "revoked_sessions"
+
+    session_id = Column(CHAR(36), primary_key=True)
+    # Для рассылки отзывов подписчикам WatchRevocations
+    token_hash = Column(String(64))
+    user_id = Column(CHAR(36))
+    # После истечения токен недействителен и без отзыва, запись можно удалить
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, server_default=func.now(), nullable=False, index=True)
 
 
 class SessionBase(BaseModel):
@@ -23,4 +37,4 @@ class SessionBase(BaseModel):
 
 
 class SessionCreate(SessionBase):
-    pass
+    id: str | None = None
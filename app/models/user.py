@@ -1,13 +1,15 @@
 import uuid
 from datetime import datetime, timezone
+from functools import lru_cache
 
-from pydantic import BaseModel, Field, computed_field
+from pydantic import BaseModel, ConfigDict, Field, computed_field, create_model
 from sqlalchemy import CHAR, Column, DateTime, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.database import Base
 from app.models import RoleResponse
 from app.models.gender import GenderResponse
+from app.models.role import BULK_MAX_IDS
 
 
 class User(Base):
@@ -28,6 +30,10 @@ class User(Base):
 
     gender = relationship("Gender", back_populates="users")
 
+    @property
+    def roles_count(self) -> int:
+        return len(self.roles)
+
 
 class UserBase(BaseModel):
     name: str = Field()
@@ -57,6 +63,39 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+# Поля UserResponse, которые можно запросить через fields= (в порядке вывода)
+USER_FIELDS = (
+    "id",
+    "name",
+    "surname",
+    "patronymic",
+    "username",
+    "birthday",
+    "status",
+    "created_at",
+    "gender",
+    "roles",
+    "roles_count",
+)
+
+
+@lru_cache(maxsize=256)
+def user_projection(fields: frozenset[str]) -> type[BaseModel]:
+    """Модель ответа только с запрошенными полями UserResponse"""
+    definitions = {}
+    for name in USER_FIELDS:
+        if name not in fields:
+            continue
+        if name == "roles_count":
+            definitions[name] = (int, Field())
+        else:
+            field = UserResponse.model_fields[name]
+            definitions[name] = (field.annotation, field)
+    return create_model(
+        "UserProjection", __config__=ConfigDict(from_attributes=True), **definitions
+    )
+
+
 class UserUpdate(BaseModel):
     name: str | None = Field(default=None)
     surname: str | None = Field(default=None)
@@ -68,6 +107,15 @@ class UserUpdate(BaseModel):
     password: str | None = Field(default=None)
 
 
+class UserBulkRoles(BaseModel):
+    user_id: str = Field()
+    add: list[str] = Field(default_factory=list, max_length=BULK_MAX_IDS)
+    remove: list[str] = Field(default_factory=list, max_length=BULK_MAX_IDS)
+
+
 class UserAddRole(BaseModel):
     user_id: str = Field()
     role_id: str = Field()
+    # Временное назначение: роль действует с valid_from и до valid_until
+    valid_from: datetime | None = Field(default=None)
+    valid_until: datetime | None = Field(default=None)
@@ -1,4 +1,6 @@
-from sqlalchemy import CHAR, Column, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import CHAR, Column, ColumnElement, DateTime, ForeignKey, and_, or_
 
 from app.database import Base
 
@@ -8,3 +10,16 @@ class UserRole(Base):
 
     user_id = Column(CHAR(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
     role_id = Column(CHAR(36), ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
+    # Срок действия назначения (UTC), NULL - без ограничения.
+    # Истекшие строки удаляет app/services/role_expiry.py в момент истечения
+    valid_from = Column(DateTime)
+    valid_until = Column(DateTime, index=True)
+
+    @classmethod
+    def active(cls, now: datetime | None = None) -> ColumnElement[bool]:
+        """Условие действующего назначения"""
+        now = now or datetime.utcnow()
+        return and_(
+            or_(cls.valid_from.is_(None), cls.valid_from <= now),
+            or_(cls.valid_until.is_(None), cls.valid_until > now),
+        )
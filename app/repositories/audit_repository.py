@@ -0,0 +1,16 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.audit_log import AuthzAuditRecord
+
+
+class AuditRepository:
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def insert_many(self, records: list[dict]) -> None:
+        """Пакетная вставка одним executemany"""
+        if not records:
+            return
+        self.db.execute(insert(AuthzAuditRecord), records)
+        self.db.commit()
@@ -0,0 +1,117 @@
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.authz_version import (
+    AUTHZ_GENERATION,
+    AuthzChange,
+    AuthzVersion,
+    role_key,
+    user_key,
+)
+from app.models.role import RoleClosure
+from app.models.user_roles import UserRole
+from app.repositories.role_hierarchy_repository import ROLE_INHERITANCE_ENABLED
+
+
+class AuthzVersionRepository:
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def get(self, key: str = AUTHZ_GENERATION) -> int:
+        version = self.db.query(AuthzVersion.version).filter(AuthzVersion.key == key).scalar()
+        return version or 0
+
+    def get_many(self, *keys: str) -> tuple[int, ...]:
+        rows = dict(
+            self.db.query(AuthzVersion.key, AuthzVersion.version).filter(AuthzVersion.key.in_(keys))
+        )
+        return tuple(rows.get(key) or 0 for key in keys)
+
+    def user_version(self, user_id: str) -> tuple[int | str, ...]:
+        """
+        Версия авторизационных данных одного пользователя для ETag его ответов.
+
+        Меняется только при изменении его назначений и его ролей (с наследованием - и
+        ролей-предков) по журналу authz_changes, а не при любом изменении прав в системе.
+        Действующие роли входят в версию: начало и истечение временного назначения
+        меняют права и без записи в журнал.
+
+        Журнал чистится (prune_changes): если записей пользователя и его ролей в нем не
+        осталось, версия не меньше id последней удаленной записи и не совпадет с версией
+        до удаленного изменения. Пустой журнал - версия по глобальному поколению.
+        """
+        role_ids = sorted(
+            str(role_id)
+            for (role_id,) in self.db.query(UserRole.role_id).filter(
+                UserRole.user_id == user_id, UserRole.active()
+            )
+        )
+        keys = [user_key(user_id), *(role_key(role_id) for role_id in role_ids)]
+        if ROLE_INHERITANCE_ENABLED and role_ids:
+            ancestors = self.db.query(RoleClosure.ancestor_id).filter(
+                RoleClosure.role_id.in_(role_ids)
+            )
+            keys += [role_key(str(ancestor_id)) for (ancestor_id,) in ancestors.distinct()]
+
+        oldest = self.db.query(func.min(AuthzChange.id)).scalar()
+        if oldest is None:
+            return ("generation", self.get(), *role_ids)
+        last = (
+            self.db.query(func.max(AuthzChange.id))
+            .filter(AuthzChange.key.in_(dict.fromkeys(keys)))
+            .scalar()
+        )
+        return (max(last or 0, oldest - 1), *role_ids)
+
+    def bump(self, *keys: str, changed: Iterable[str] = (), generation: bool = True) -> None:
+        """
+        Увеличивает версии в текущей транзакции (без commit).
+
+        Вызывается репозиториями перед commit изменения, чтобы новая версия
+        стала видна одновременно с самими данными.
+
+        Args:
+            keys: Дополнительные версионируемые ключи
+            changed: Ключи измененных сущностей (user_key, role_key) для журнала authz_changes
+            generation: Увеличить глобальное поколение AUTHZ_GENERATION. Не нужно, если
+                изменение не влияет на права пользователей (например, новая роль без назначений)
+        """
+        for key in dict.fromkeys((AUTHZ_GENERATION, *keys) if generation else keys):
+            updated = (
+                self.db.query(AuthzVersion)
+                .filter(AuthzVersion.key == key)
+                .update({AuthzVersion.version: AuthzVersion.version + 1}, synchronize_session=False)
+            )
+            if not updated:
+                self.db.add(AuthzVersion(key=key, version=1))
+
+        self.db.add_all(AuthzChange(key=key) for key in dict.fromkeys(changed))
+        self.db.flush()
+
+    def last_change_time(self) -> datetime | None:
+        return self.db.query(func.max(AuthzChange.created_at)).scalar()
+
+    def changes_since(self, since: datetime | None) -> list[tuple[int, str, datetime]]:
+        """
+        Записи журнала начиная с since (включительно).
+
+        Транзакции фиксируются не в порядке id, поэтому читатели запрашивают
+        окно с перекрытием и отбрасывают уже примененные id.
+        """
+        query = self.db.query(AuthzChange.id, AuthzChange.key, AuthzChange.created_at)
+        if since is not None:
+            query = query.filter(AuthzChange.created_at >= since)
+        rows = query.order_by(AuthzChange.id).all()
+        return [(row.id, row.key, row.created_at) for row in rows]
+
+    def prune_changes(self, before: datetime) -> int:
+        deleted = (
+            self.db.query(AuthzChange)
+            .filter(AuthzChange.created_at < before)
+            .delete(synchronize_session=False)
+        )
+        self.db.commit()
+        return deleted
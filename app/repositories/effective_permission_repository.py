@@ -0,0 +1,228 @@
+import os
+
+from sqlalchemy import ColumnElement, delete, exists, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models.effective_permission import UserEffectivePermission
+from app.models.permission import Permission
+from app.models.role import RoleClosure, RolePermission
+from app.models.user_roles import UserRole
+from app.repositories.role_hierarchy_repository import ROLE_INHERITANCE_ENABLED
+
+# Читать проверки из user_effective_permissions вместо join по ролям.
+# Включать после python -m cmd.effective_permissions rebuild
+EFFECTIVE_PERMISSIONS_ENABLED = os.getenv("EFFECTIVE_PERMISSIONS_ENABLED", "false").lower() in (
+    "1",
+    "true",
+)
+
+_COLUMNS = [
+    UserEffectivePermission.user_id,
+    UserEffectivePermission.permission_id,
+    UserEffectivePermission.permission_code,
+    UserEffectivePermission.service_id,
+]
+
+
+def role_grants():
+    """
+    Пары (role_id, permission_id): разрешения роли, с наследованием - вместе с
+    разрешениями всех ее предков (один join с role_closure)
+    """
+    if ROLE_INHERITANCE_ENABLED:
+        return (
+            select(RoleClosure.role_id, RolePermission.permission_id)
+            .join(RolePermission, RolePermission.role_id == RoleClosure.ancestor_id)
+            .subquery()
+        )
+    return RolePermission.__table__
+
+
+def role_inheritors(role_id: str):
+    """Роли, получающие разрешения роли role_id (с ней самой)"""
+    if ROLE_INHERITANCE_ENABLED:
+        return select(RoleClosure.role_id).where(RoleClosure.ancestor_id == role_id)
+    return [role_id]
+
+
+class EffectivePermissionRepository:
+    """
+    Инкрементальное обновление user_effective_permissions.
+
+    Методы не делают commit: вызываются из репозиториев внутри транзакции
+    изменения после flush, чтобы таблица менялась атомарно с исходными данными.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def _expected_query(self):
+        """Итоговые разрешения, вычисленные по исходным таблицам"""
+        grants = role_grants()
+        return (
+            select(
+                UserRole.user_id,
+                Permission.id,
+                Permission.code,
+                Permission.service_id,
+            )
+            .join(grants, grants.c.role_id == UserRole.role_id)
+            .join(Permission, Permission.id == grants.c.permission_id)
+            .where(UserRole.active())
+            .distinct()
+        )
+
+    def _revoke_ungranted(
+        self,
+        *conditions: ColumnElement[bool],
+        exclude_role_id: str | None = None,
+    ) -> None:
+        """Удаляет строки из conditions, которые больше не выдает ни одна роль пользователя"""
+        grants = role_grants()
+        still_granted = (
+            select(UserRole.user_id)
+            .join(grants, grants.c.role_id == UserRole.role_id)
+            .where(
+                UserRole.user_id == UserEffectivePermission.user_id,
+                grants.c.permission_id == UserEffectivePermission.permission_id,
+                UserRole.active(),
+            )
+        )
+        if exclude_role_id is not None:
+            still_granted = still_granted.where(UserRole.role_id != exclude_role_id)
+
+        self.db.execute(delete(UserEffectivePermission).where(*conditions, ~still_granted.exists()))
+
+    def user_role_added(self, user_id: str, role_id: str) -> None:
+        self.user_roles_added(user_id, [role_id])
+
+    def user_roles_added(self, user_id: str, role_ids: list[str]) -> None:
+        """Вызывается для действующих назначений: после вставки или в момент начала действия"""
+        grants = role_grants()
+        granted = (
+            select(literal(user_id), Permission.id, Permission.code, Permission.service_id)
+            .join(grants, grants.c.permission_id == Permission.id)
+            .where(grants.c.role_id.in_(role_ids))
+            .where(
+                ~exists().where(
+                    UserEffectivePermission.user_id == user_id,
+                    UserEffectivePermission.permission_id == Permission.id,
+                )
+            )
+            .distinct()
+        )
+        self.db.execute(insert(UserEffectivePermission).from_select(_COLUMNS, granted))
+
+    def user_role_removed(self, user_id: str, role_id: str) -> None:
+        self.user_roles_removed(user_id, [role_id])
+
+    def user_roles_removed(self, user_id: str, role_ids: list[str]) -> None:
+        """Вызывается после удаления строк user_roles"""
+        grants = role_grants()
+        self._revoke_ungranted(
+            UserEffectivePermission.user_id == user_id,
+            UserEffectivePermission.permission_id.in_(
+                select(grants.c.permission_id).where(grants.c.role_id.in_(role_ids))
+            ),
+        )
+
+    def role_permission_added(self, role_id: str, permission_id: str) -> None:
+        self.role_permissions_added(role_id, [permission_id])
+
+    def role_permissions_added(self, role_id: str, permission_ids: list[str]) -> None:
+        granted = (
+            select(UserRole.user_id, Permission.id, Permission.code, Permission.service_id)
+            .join(Permission, Permission.id.in_(permission_ids))
+            .where(UserRole.role_id.in_(role_inheritors(role_id)), UserRole.active())
+            .where(
+                ~exists().where(
+                    UserEffectivePermission.user_id == UserRole.user_id,
+                    UserEffectivePermission.permission_id == Permission.id,
+                )
+            )
+            # С наследованием у пользователя может быть несколько наследников роли
+            .distinct()
+        )
+        self.db.execute(insert(UserEffectivePermission).from_select(_COLUMNS, granted))
+
+    def role_permission_removed(self, role_id: str, permission_id: str) -> None:
+        self.role_permissions_removed(role_id, [permission_id])
+
+    def role_permissions_removed(self, role_id: str, permission_ids: list[str]) -> None:
+        """Вызывается после удаления строк role_permissions"""
+        self._revoke_ungranted(
+            UserEffectivePermission.permission_id.in_(permission_ids),
+            UserEffectivePermission.user_id.in_(
+                select(UserRole.user_id).where(UserRole.role_id.in_(role_inheritors(role_id)))
+            ),
+        )
+
+    def role_deleted(self, role_id: str) -> None:
+        """
+        Вызывается до удаления роли, пока ее назначения еще существуют.
+        С наследованием вместо этого - users_recomputed после удаления
+        """
+        self._revoke_ungranted(
+            UserEffectivePermission.user_id.in_(
+                select(UserRole.user_id).where(UserRole.role_id == role_id)
+            ),
+            UserEffectivePermission.permission_id.in_(
+                select(RolePermission.permission_id).where(RolePermission.role_id == role_id)
+            ),
+            exclude_role_id=role_id,
+        )
+
+    def users_recomputed(self, user_ids: list[str]) -> None:
+        """
+        Пересчитывает строки пользователей по исходным таблицам. Для изменений
+        наследования ролей, затрагивающих разрешения через несколько уровней
+        """
+        if not user_ids:
+            return
+        self.db.execute(
+            delete(UserEffectivePermission).where(UserEffectivePermission.user_id.in_(user_ids))
+        )
+        self.db.execute(
+            insert(UserEffectivePermission).from_select(
+                _COLUMNS, self._expected_query().where(UserRole.user_id.in_(user_ids))
+            )
+        )
+
+    def permission_updated(self, permission: Permission) -> None:
+        self.db.execute(
+            update(UserEffectivePermission)
+            .where(UserEffectivePermission.permission_id == permission.id)
+            .values(permission_code=permission.code, service_id=permission.service_id)
+        )
+
+    def permission_deleted(self, permission_id: str) -> None:
+        self.db.execute(
+            delete(UserEffectivePermission).where(
+                UserEffectivePermission.permission_id == permission_id
+            )
+        )
+
+    def user_deleted(self, user_id: str) -> None:
+        self.db.execute(
+            delete(UserEffectivePermission).where(UserEffectivePermission.user_id == user_id)
+        )
+
+    def rebuild(self) -> int:
+        """Полностью перестраивает таблицу. Возвращает количество строк"""
+        self.db.execute(delete(UserEffectivePermission))
+        result = self.db.execute(
+            insert(UserEffectivePermission).from_select(_COLUMNS, self._expected_query())
+        )
+        self.db.commit()
+        return result.rowcount
+
+    def find_inconsistencies(self) -> tuple[set[tuple], set[tuple]]:
+        """
+        Сравнивает таблицу с вычисленными по исходным таблицам разрешениями.
+
+        Returns:
+            (отсутствующие строки, лишние или устаревшие строки)
+        """
+        expected = {tuple(row) for row in self.db.execute(self._expected_query())}
+        actual = {tuple(row) for row in self.db.execute(select(*_COLUMNS))}
+        return expected - actual, actual - expected
@@ -11,6 +11,12 @@ class GenderRepositry:
         gender = self.db.query(Gender).filter(Gender.id == gender_id).first()
         return gender
 
+    def existing_ids(self, gender_ids: list[int]) -> set[int]:
+        if not gender_ids:
+            return set()
+        rows = self.db.query(Gender.id).filter(Gender.id.in_(gender_ids))
+        return {row.id for row in rows}
+
     def get_all(self) -> list[Gender]:
         genders = self.db.query(Gender).all()
         return genders
@@ -1,16 +1,44 @@
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
+from app.models.authz_version import PERMISSIONS_TABLE, ROLES_TABLE, role_key
+from app.models.effective_permission import UserEffectivePermission
 from app.models.permission import Permission, PermissionCreate
-from app.models.role import Role
+from app.models.role import RolePermission
 from app.models.service import Service
-from app.models.user import User
+from app.models.user_roles import UserRole
+from app.repositories.authz_version_repository import AuthzVersionRepository
+from app.repositories.effective_permission_repository import (
+    EFFECTIVE_PERMISSIONS_ENABLED,
+    EffectivePermissionRepository,
+    role_grants,
+)
+from app.repositories.role_hierarchy_repository import (
+    ROLE_INHERITANCE_ENABLED,
+    RoleHierarchyRepository,
+)
+from app.services.authz_engine import AUTHZ_ENGINE, authz_engine
+from app.services.authz_snapshot import get_authz_snapshot
 from app.utils.pagination_utils import Page, paginate
 
 
 class PermissionRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.versions = AuthzVersionRepository(db)
+        self.effective = EffectivePermissionRepository(db)
+        self.hierarchy = RoleHierarchyRepository(db)
+
+    def _user_permissions(self, user_id: str, *columns):
+        """Разрешения действующих ролей пользователя, с наследованием - и их предков"""
+        grants = role_grants()
+        return (
+            self.db.query(*columns)
+            .select_from(Permission)
+            .join(grants, grants.c.permission_id == Permission.id)
+            .join(UserRole, UserRole.role_id == grants.c.role_id)
+            .filter(UserRole.user_id == user_id, UserRole.active())
+        )
 
     def get_all(self, page: int, limit: int) -> Page[Permission]:
         permissions = self.db.query(Permission)
@@ -21,6 +49,13 @@ class PermissionRepository:
 
         return permission
 
+    def existing_ids(self, permission_ids: list[str]) -> set[str]:
+        """Какие из переданных id разрешений существуют (один запрос)"""
+        if not permission_ids:
+            return set()
+        rows = self.db.query(Permission.id).filter(Permission.id.in_(permission_ids))
+        return {str(row.id) for row in rows}
+
     def get_by_code(self, code: str) -> Permission | None:
         permission = self.db.query(Permission).filter(Permission.code == code).first()
 
@@ -39,14 +74,18 @@ class PermissionRepository:
         return permissions
 
     def get_by_user_id(self, user_id: str) -> list[Permission]:
-        permissions = (
-            self.db.query(Permission)
-            .join(Permission.roles)
-            .join(Role.users)
-            .filter(User.id == user_id)
-            .distinct()
-            .all()
-        )
+        if EFFECTIVE_PERMISSIONS_ENABLED:
+            return (
+                self.db.query(Permission)
+                .join(
+                    UserEffectivePermission,
+                    UserEffectivePermission.permission_id == Permission.id,
+                )
+                .filter(UserEffectivePermission.user_id == user_id)
+                .all()
+            )
+
+        permissions = self._user_permissions(user_id, Permission).distinct().all()
         return permissions
 
     def get_by_user_id_and_service_id(self, user_id: str, service_id: str) -> list[Permission]:
@@ -61,22 +100,32 @@ class PermissionRepository:
 
         service_name = service.name
 
+        if EFFECTIVE_PERMISSIONS_ENABLED:
+            return (
+                self.db.query(Permission)
+                .join(
+                    UserEffectivePermission,
+                    UserEffectivePermission.permission_id == Permission.id,
+                )
+                .filter(UserEffectivePermission.user_id == user_id)
+                .filter(
+                    or_(
+                        UserEffectivePermission.service_id == service_id,
+                        UserEffectivePermission.permission_code.startswith(f"{service_name}:"),
+                        UserEffectivePermission.permission_code.startswith("all:"),
+                    )
+                )
+                .all()
+            )
+
         permissions = (
-            self.db.query(Permission)
-            .join(Permission.roles)
-            .join(Role.users)
-            .filter(User.id == user_id)
+            self._user_permissions(user_id, Permission)
             .filter(
                 or_(
                     # Разрешения, привязанные к текущему сервису
                     Permission.service_id == service_id,
-                    # Wildcard разрешения, которые покрывают этот сервис
-                    or_(
-                        # Разрешения, начинающиеся с имени сервиса и двоеточия
-                        Permission.code.startswith(f"{service_name}:"),
-                        # Разрешения, начинающиеся с "all:"
-                        Permission.code.startswith("all:"),
-                    ),
+                    # Разрешения с кодом этого сервиса и wildcard "all:..."
+                    Permission.code_service.in_((service_name, "all")),
                 )
             )
             .distinct()
@@ -124,21 +173,56 @@ class PermissionRepository:
             "all:all:all",
         ]
 
+        # Если загрузчик поддерживает снимок в разделяемой памяти - отвечаем из него без БД
+        snapshot = get_authz_snapshot()
+        if snapshot is not None:
+            return snapshot.has_any_code(user_id, permission_patterns)
+
+        if AUTHZ_ENGINE == "bitset":
+            return authz_engine.exists(self.db, user_id, permission_patterns)
+
+        if EFFECTIVE_PERMISSIONS_ENABLED:
+            # Точечный поиск по индексу (user_id, permission_code)
+            return (
+                self.db.query(UserEffectivePermission.permission_id)
+                .filter(
+                    UserEffectivePermission.user_id == user_id,
+                    UserEffectivePermission.permission_code.in_(permission_patterns),
+                )
+                .limit(1)
+                .scalar()
+            ) is not None
+
         exists = (
-            self.db.query(Permission.id)
-            .join(Permission.roles)
-            .join(Role.users)
-            .filter(User.id == user_id)
-            .filter(Permission.code.in_(permission_patterns))
+            self._user_permissions(user_id, Permission.id)
+            # Те же восемь шаблонов по сегментам кода - диапазоны составного индекса
+            .filter(
+                Permission.code_service.in_((service, "all")),
+                Permission.code_entity.in_((entity, "all")),
+                Permission.code_action.in_((action, "all")),
+            )
             .limit(1)
             .scalar()
         ) is not None
 
         return exists
 
+    def _role_keys(self, permission_id: str) -> list[str]:
+        """Ключи ролей, в которые входит разрешение (с наследованием - и их наследников)"""
+        role_ids = {
+            str(row.role_id)
+            for row in self.db.query(RolePermission.role_id).filter(
+                RolePermission.permission_id == permission_id
+            )
+        }
+        if ROLE_INHERITANCE_ENABLED:
+            role_ids = {r for role_id in role_ids for r in self.hierarchy.descendant_ids(role_id)}
+        return [role_key(role_id) for role_id in role_ids]
+
     def create(self, permission_data: PermissionCreate) -> Permission:
         permission = Permission(**permission_data.model_dump())
         self.db.add(permission)
+        self.versions.bump(PERMISSIONS_TABLE, generation=False)
         self.db.commit()
         self.db.refresh(permission)
         permission.service_name = permission.service.name
@@ -149,6 +233,9 @@ class PermissionRepository:
         if permission:
             for field, value in permission_data.model_dump().items():
                 setattr(permission, field, value)
+            self.db.flush()
+            self.effective.permission_updated(permission)
+            self.versions.bump(PERMISSIONS_TABLE, changed=self._role_keys(permission_id))
             self.db.commit()
             self.db.refresh(permission)
         return permission
@@ -156,6 +243,9 @@ class PermissionRepository:
     def delete(self, permission_id: str) -> Permission | None:
         permission = self.db.query(Permission).filter(Permission.id == permission_id).first()
         if permission:
+            changed = self._role_keys(permission_id)
+            self.effective.permission_deleted(permission_id)
             self.db.delete(permission)
+            self.versions.bump(PERMISSIONS_TABLE, ROLES_TABLE, changed=changed)
             self.db.commit()
         return permission
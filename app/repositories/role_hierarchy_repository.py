@@ -0,0 +1,194 @@
+import os
+
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, noload
+
+from app.models.authz_version import ROLES_TABLE, AuthzVersion
+from app.models.role import Role, RoleClosure, RoleParent
+from app.models.user_roles import UserRole
+
+# Учитывать наследование ролей в проверках и выборках разрешений.
+# Включать после migrations/003_role_hierarchy.sql (замыкание для существующих ролей)
+ROLE_INHERITANCE_ENABLED = os.getenv("ROLE_INHERITANCE_ENABLED", "false").lower() in (
+    "1",
+    "true",
+)
+
+
+class RoleHierarchyRepository:
+    """
+    Связи наследования ролей и их транзитивное замыкание role_closure.
+
+    Добавление связи дописывает в замыкание только новые пары (наследник,
+    предок). Удаление связи или роли пересчитывает предков только затронутых
+    наследников по оставшимся связям. Методы не делают commit.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def parent_ids(self, role_id: str) -> list[str]:
+        rows = self.db.query(RoleParent.parent_id).filter(RoleParent.role_id == role_id)
+        return [str(parent_id) for (parent_id,) in rows]
+
+    def get_parents(self, role_id: str) -> list[Role]:
+        """Прямые родители роли для RoleResponse (без загрузки разрешений)"""
+        return (
+            self.db.query(Role)
+            .options(noload(Role.permissions))
+            .join(RoleParent, RoleParent.parent_id == Role.id)
+            .filter(RoleParent.role_id == role_id)
+            .all()
+        )
+
+    def descendant_ids(self, role_id: str) -> list[str]:
+        """Роль и все роли, которые ее наследуют"""
+        rows = self.db.query(RoleClosure.role_id).filter(RoleClosure.ancestor_id == role_id)
+        return list({role_id, *(str(descendant_id) for (descendant_id,) in rows)})
+
+    def ancestor_ids(self, role_id: str) -> list[str]:
+        """Роль и все роли, от которых она наследует разрешения"""
+        rows = self.db.query(RoleClosure.ancestor_id).filter(RoleClosure.role_id == role_id)
+        return list({role_id, *(str(ancestor_id) for (ancestor_id,) in rows)})
+
+    def user_ids(self, role_ids: list[str]) -> list[str]:
+        """Пользователи, которым назначена хотя бы одна из ролей"""
+        rows = self.db.query(UserRole.user_id).filter(UserRole.role_id.in_(role_ids)).distinct()
+        return [str(user_id) for (user_id,) in rows]
+
+    def lock(self) -> None:
+        """
+        Сериализует изменения связей: блокирует строку версии ROLES_TABLE до конца
+        транзакции. Без нее две транзакции проверяют циклы и дописывают замыкание по
+        своим снимкам: встречные связи A->B и B->A обе проходят would_cycle, а при
+        A->B и B->C пара (A, C) не записывается ни одной.
+
+        Вызывается до would_cycle и чтения замыкания. Начинает новую транзакцию: снимок
+        чтений берется после блокировки и видит изменения, зафиксированные до нее.
+        """
+        self.db.commit()
+        locked = (
+            self.db.query(AuthzVersion.key)
+            .filter(AuthzVersion.key == ROLES_TABLE)
+            .with_for_update()
+            .first()
+        )
+        if locked is not None:
+            return
+        try:
+            self.db.add(AuthzVersion(key=ROLES_TABLE, version=0))
+            self.db.flush()
+        except IntegrityError:
+            # Строку одновременно вставила другая транзакция - ждем ее блокировку
+            self.db.rollback()
+            self.lock()
+
+    def role_created(self, role_id: str) -> None:
+        self.db.execute(insert(RoleClosure).values(role_id=role_id, ancestor_id=role_id))
+
+    def would_cycle(self, role_id: str, parent_id: str) -> bool:
+        """Связь замкнет цикл, если parent_id уже наследует role_id (или это та же роль)"""
+        if role_id == parent_id:
+            return True
+        return (
+            self.db.query(RoleClosure.role_id)
+            .filter(RoleClosure.role_id == parent_id, RoleClosure.ancestor_id == role_id)
+            .first()
+        ) is not None
+
+    def parent_add(self, role_id: str, parent_id: str) -> bool:
+        """
+        Добавляет связь. Проверка циклов - would_cycle до вызова.
+
+        Returns:
+            False, если связь уже есть
+        """
+        try:
+            self.db.execute(insert(RoleParent).values(role_id=role_id, parent_id=parent_id))
+        except IntegrityError:
+            self.db.rollback()
+            return False
+
+        # Наследники role_id (с ней самой) получают предков parent_id (с ней самой)
+        descendants = self.descendant_ids(role_id)
+        ancestors = self.ancestor_ids(parent_id)
+        existing = {
+            (str(row.role_id), str(row.ancestor_id))
+            for row in self.db.query(RoleClosure.role_id, RoleClosure.ancestor_id).filter(
+                RoleClosure.role_id.in_(descendants), RoleClosure.ancestor_id.in_(ancestors)
+            )
+        }
+        pairs = [
+            {"role_id": descendant_id, "ancestor_id": ancestor_id}
+            for descendant_id in descendants
+            for ancestor_id in ancestors
+            if (descendant_id, ancestor_id) not in existing
+        ]
+        if pairs:
+            self.db.execute(insert(RoleClosure), pairs)
+        return True
+
+    def parent_remove(self, role_id: str, parent_id: str) -> bool:
+        """
+        Удаляет связь и пересчитывает замыкание наследников role_id.
+
+        Returns:
+            False, если связи не было
+        """
+        result = self.db.execute(
+            delete(RoleParent).where(
+                RoleParent.role_id == role_id, RoleParent.parent_id == parent_id
+            )
+        )
+        if not result.rowcount:  # pyright: ignore[reportAttributeAccessIssue]
+            return False
+
+        self._recompute(self.descendant_ids(role_id))
+        return True
+
+    def role_deleted(self, role_id: str) -> None:
+        """Вызывается до удаления роли: ее наследники теряют предков, полученных через нее"""
+        descendants = [r for r in self.descendant_ids(role_id) if r != role_id]
+        self.db.execute(
+            delete(RoleParent).where(
+                (RoleParent.role_id == role_id) | (RoleParent.parent_id == role_id)
+            )
+        )
+        self.db.execute(
+            delete(RoleClosure).where(
+                (RoleClosure.role_id == role_id) | (RoleClosure.ancestor_id == role_id)
+            )
+        )
+        self._recompute(descendants)
+
+    def _recompute(self, role_ids: list[str]) -> None:
+        """Заменяет строки замыкания ролей role_ids предками по текущим связям"""
+        if not role_ids:
+            return
+
+        # Связей немного (их задают администраторы), обход графа дешевле рекурсивного SQL
+        parents: dict[str, list[str]] = {}
+        for child_id, parent_id in self.db.query(RoleParent.role_id, RoleParent.parent_id):
+            parents.setdefault(str(child_id), []).append(str(parent_id))
+
+        rows = []
+        for role_id in role_ids:
+            seen = {role_id}
+            stack = [role_id]
+            while stack:
+                for parent_id in parents.get(stack.pop(), ()):
+                    if parent_id not in seen:
+                        seen.add(parent_id)
+                        stack.append(parent_id)
+            rows.extend({"role_id": role_id, "ancestor_id": ancestor_id} for ancestor_id in seen)
+
+        self.db.execute(delete(RoleClosure).where(RoleClosure.role_id.in_(role_ids)))
+        self.db.execute(insert(RoleClosure), rows)
+
+    def rebuild(self) -> int:
+        """Полностью перестраивает замыкание всех ролей. Возвращает количество строк"""
+        role_ids = [str(role_id) for (role_id,) in self.db.query(Role.id)]
+        self.db.execute(delete(RoleClosure))
+        self._recompute(role_ids)
+        return self.db.query(RoleClosure).count()
@@ -1,13 +1,30 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, noload
 
-from app.models.permission import Permission
-from app.models.role import Role
+from app.models.authz_version import ROLES_TABLE, role_key
+from app.models.role import Role, RolePermission
+from app.repositories.authz_version_repository import AuthzVersionRepository
+from app.repositories.effective_permission_repository import EffectivePermissionRepository
+from app.repositories.role_hierarchy_repository import (
+    ROLE_INHERITANCE_ENABLED,
+    RoleHierarchyRepository,
+)
 from app.utils.pagination_utils import Page, paginate
 
 
 class RoleRepository:
     def __init__(self, db: Session) -> None:
         self.db = db
+        self.versions = AuthzVersionRepository(db)
+        self.effective = EffectivePermissionRepository(db)
+        self.hierarchy = RoleHierarchyRepository(db)
+
+    def _changed_keys(self, role_id: str) -> list[str]:
+        """Ключи ролей, разрешения которых меняются вместе с разрешениями role_id"""
+        if ROLE_INHERITANCE_ENABLED:
+            return [role_key(r) for r in self.hierarchy.descendant_ids(role_id)]
+        return [role_key(role_id)]
 
     def get_all_with_counts(self, page: int, limit: int):
         """Получает страницу ролей с количеством пользователей и разрешений для каждой роли"""
@@ -99,17 +116,80 @@ class RoleRepository:
         role = self.db.query(Role).filter(Role.id == role_id).first()
         return role
 
-    def permission_add(self, role: Role, perm_data: Permission):
-        role.permissions.append(perm_data)
+    def get_without_permissions(self, role_id: str) -> Role | None:
+        """Роль для RoleResponse: разрешения в ответ не входят, поэтому не загружаются"""
+        return (
+            self.db.query(Role).options(noload(Role.permissions)).filter(Role.id == role_id).first()
+        )
+
+    def permission_add(self, role_id: str, permission_id: str) -> bool:
+        """
+        Добавляет разрешение роли одним INSERT, без загрузки role.permissions.
+
+        Returns:
+            False, если разрешение уже есть у роли (нарушение первичного ключа role_permissions)
+        """
+        try:
+            self.db.execute(
+                insert(RolePermission).values(role_id=role_id, permission_id=permission_id)
+            )
+        except IntegrityError:
+            self.db.rollback()
+            return False
+
+        self.effective.role_permission_added(role_id, permission_id)
+        self.versions.bump(ROLES_TABLE, changed=self._changed_keys(role_id))
+        self.db.commit()
+        return True
+
+    def existing_ids(self, role_ids: list[str]) -> set[str]:
+        """Какие из переданных id ролей существуют (один запрос)"""
+        if not role_ids:
+            return set()
+        rows = self.db.query(Role.id).filter(Role.id.in_(role_ids))
+        return {str(row.id) for row in rows}
+
+    def permission_ids(self, role_id: str, permission_ids: list[str]) -> set[str]:
+        """Какие из переданных разрешений уже есть у роли (один запрос)"""
+        if not permission_ids:
+            return set()
+        rows = self.db.query(RolePermission.permission_id).filter(
+            RolePermission.role_id == role_id,
+            RolePermission.permission_id.in_(permission_ids),
+        )
+        return {str(row.permission_id) for row in rows}
+
+    def permissions_bulk_update(self, role_id: str, add_ids: list[str], remove_ids: list[str]):
+        """Добавляет и удаляет разрешения роли одной транзакцией. Списки уже очищены от лишних id"""
+        if not add_ids and not remove_ids:
+            return
+
+        if add_ids:
+            self.db.execute(
+                insert(RolePermission),
+                [{"role_id": role_id, "permission_id": perm_id} for perm_id in add_ids],
+            )
+            self.effective.role_permissions_added(role_id, add_ids)
+        if remove_ids:
+            self.db.execute(
+                delete(RolePermission).where(
+                    RolePermission.role_id == role_id,
+                    RolePermission.permission_id.in_(remove_ids),
+                )
+            )
+            self.effective.role_permissions_removed(role_id, remove_ids)
+
+        self.versions.bump(ROLES_TABLE, changed=self._changed_keys(role_id))
         self.db.commit()
-        self.db.refresh(role)
-        return role
 
     def create(self, role_data):
         """Создает новую роль"""
         from app.models.role import Role, RoleCreate
         role = Role(**role_data.model_dump())
         self.db.add(role)
+        self.db.flush()
+        self.hierarchy.role_created(str(role.id))
+        self.versions.bump(ROLES_TABLE, generation=False)
         self.db.commit()
         self.db.refresh(role)
         return role
@@ -121,6 +201,7 @@ class RoleRepository:
         if role:
             for field, value in role_data.model_dump().items():
                 setattr(role, field, value)
+            self.versions.bump(ROLES_TABLE, changed=[role_key(role_id)])
             self.db.commit()
             self.db.refresh(role)
         return role
@@ -199,16 +280,73 @@ class RoleRepository:
             'users_with_role': users_with_role
         }
 
-    def permission_remove(self, role: Role, perm_data: Permission):
-        role.permissions.remove(perm_data)
+    def permission_remove(self, role_id: str, permission_id: str) -> bool:
+        """
+        Удаляет разрешение роли одним DELETE.
+
+        Returns:
+            False, если у роли не было этого разрешения
+        """
+        result = self.db.execute(
+            delete(RolePermission).where(
+                RolePermission.role_id == role_id, RolePermission.permission_id == permission_id
+            )
+        )
+        if not result.rowcount:  # pyright: ignore[reportAttributeAccessIssue]
+            self.db.rollback()
+            return False
+
+        self.effective.role_permission_removed(role_id, permission_id)
+        self.versions.bump(ROLES_TABLE, changed=self._changed_keys(role_id))
         self.db.commit()
-        self.db.refresh(role)
-        return role
+        return True
 
     def delete(self, role_id: str):
         """Удаляет роль по ID"""
         role = self.db.query(Role).filter(Role.id == role_id).first()
         if role:
-            self.db.delete(role)
+            changed = self._changed_keys(role_id)
+            if ROLE_INHERITANCE_ENABLED:
+                # Наследники теряют разрешения, полученные через роль, - пересчет их пользователей
+                users = self.hierarchy.user_ids(self.hierarchy.descendant_ids(role_id))
+                self.hierarchy.role_deleted(role_id)
+                self.db.delete(role)
+                self.db.flush()
+                self.effective.users_recomputed(users)
+            else:
+                self.effective.role_deleted(role_id)
+                self.hierarchy.role_deleted(role_id)
+                self.db.delete(role)
+            self.versions.bump(ROLES_TABLE, changed=changed)
             self.db.commit()
         return role
+
+    def parent_add(self, role_id: str, parent_id: str) -> bool:
+        """
+        Роль role_id начинает наследовать разрешения parent_id.
+
+        Returns:
+            False, если связь уже есть
+        """
+        if not self.hierarchy.parent_add(role_id, parent_id):
+            return False
+        self._hierarchy_changed(role_id)
+        return True
+
+    def parent_remove(self, role_id: str, parent_id: str) -> bool:
+        """
+        Returns:
+            False, если роль не наследовала parent_id
+        """
+        if not self.hierarchy.parent_remove(role_id, parent_id):
+            self.db.rollback()
+            return False
+        self._hierarchy_changed(role_id)
+        return True
+
+    def _hierarchy_changed(self, role_id: str) -> None:
+        """Предки role_id изменились: пересчет пользователей ее наследников и инвалидация"""
+        descendants = self.hierarchy.descendant_ids(role_id)
+        self.effective.users_recomputed(self.hierarchy.user_ids(descendants))
+        self.versions.bump(ROLES_TABLE, changed=[role_key(r) for r in descendants])
+        self.db.commit()
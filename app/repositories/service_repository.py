@@ -1,12 +1,18 @@
 from sqlalchemy.orm import Session
 
+from app.models.authz_version import SERVICES_TABLE
+from app.models.role import Role, RoleClosure
 from app.models.service import Service, ServiceCreate
+from app.models.user_roles import UserRole
+from app.repositories.authz_version_repository import AuthzVersionRepository
+from app.repositories.role_hierarchy_repository import ROLE_INHERITANCE_ENABLED
 from app.utils.pagination_utils import Page, paginate
 
 
 class ServiceRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.versions = AuthzVersionRepository(db)
 
     def get_all(self, page: int, limit: int) -> Page[Service]:
         services = self.db.query(Service)
@@ -15,6 +21,7 @@ class ServiceRepository:
     def create(self, service_data: ServiceCreate) -> Service:
         service = Service(**service_data.model_dump())
         self.db.add(service)
+        self.versions.bump(SERVICES_TABLE)
         self.db.commit()
         self.db.refresh(service)
         return service
@@ -24,28 +31,31 @@ class ServiceRepository:
         if service:
             for field, value in service_data.model_dump().items():
                 setattr(service, field, value)
+            self.versions.bump(SERVICES_TABLE)
             self.db.commit()
             self.db.refresh(service)
         return service
 
-    def get_services_by_user_roles(self, user_id: str):
-        from app.models.user import User
-        from app.models.role import Role
-        from sqlalchemy import and_, or_
-        
-        user_roles = (
-            self.db.query(Role)
-            .join(Role.users)
-            .filter(User.id == user_id)
-            .subquery()
-        )
-        
-        services_query = self.db.query(Service).join(
-            user_roles,
-            or_(
-                user_roles.c.service_id == Service.id,
-                user_roles.c.service_id.is_(None)
+    def get_catalog(self) -> list[Service]:
+        return self.db.query(Service).all()
+
+    def accessible_service_ids(self, user_id: str) -> tuple[bool, frozenset[str]]:
+        """
+        Сервисы ролей пользователя (с наследованием - и ролей-предков).
+
+        Returns:
+            (all_services, service_ids): роль без service_id дает доступ ко всем
+            сервисам, тогда all_services=True и service_ids не используется
+        """
+        rows = self.db.query(Role.service_id)
+        if ROLE_INHERITANCE_ENABLED:
+            rows = rows.join(RoleClosure, RoleClosure.ancestor_id == Role.id).join(
+                UserRole, UserRole.role_id == RoleClosure.role_id
             )
-        ).distinct()
-        
-        return services_query.all()
+        else:
+            rows = rows.join(UserRole, UserRole.role_id == Role.id)
+        rows = rows.filter(UserRole.user_id == user_id, UserRole.active()).distinct()
+        service_ids = {service_id for (service_id,) in rows}
+        if None in service_ids:
+            return True, frozenset()
+        return False, frozenset(service_ids)
@@ -1,31 +1,144 @@
 import hashlib
+import uuid
 from datetime import datetime, timezone
 
 from sqlalchemy.orm import Session
 
-from app.models.session import SessionCreate, SessionDB
+from app.models.session import RevokedSession, SessionCreate, SessionDB
+from app.repositories.session_store import get_session_store
+from app.services.session_filter import session_filter
+from app.services.session_revocation import revocation_list
+from app.services.session_touch import session_touch
+from app.utils.token_utils import (
+    create_hash,
+    is_signed_token,
+    signed_tokens_verifiable,
+    verify_signed_token,
+)
 
 
 class SessionRepository:
     def __init__(self, db: Session) -> None:
         self.db = db
+        self.store = get_session_store(db)
 
     def get_by_token(self, token: str):
-        current_time = datetime.now(timezone.utc)
+        if is_signed_token(token) and signed_tokens_verifiable():
+            return self._get_by_signed_token(token)
 
-        session = (
-            self.db.query(SessionDB)
-            .filter(
-                SessionDB.token_hash == hashlib.sha256(token.encode()).hexdigest(),
-                SessionDB.expires_at > current_time,
-            )
-            .first()
-        )
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        if session_filter.is_known_invalid(token_hash):
+            return None
+
+        session = self.store.get(token_hash)
+        if session is None:
+            session_filter.mark_invalid(token_hash)
+        else:
+            session_touch.touch(session)
         return session
 
+    def _get_by_signed_token(self, token: str) -> SessionDB | None:
+        """
+        Проверяет подписанный токен локально: подпись, срок действия и список отзывов.
+
+        Возвращает несохраненный SessionDB с теми же полями, что и строка sessions.
+        """
+        payload = verify_signed_token(token)
+        if payload is None or payload.expires_at <= datetime.now(timezone.utc):
+            return None
+
+        revocation_list.refresh(self.db)
+        if not revocation_list.is_fresh():
+            # Список отзывов устарел - проверяем сессию по хранилищу
+            session = self.store.get(create_hash(token))
+            if session is None or str(session.id) != payload.session_id:
+                return None
+            return session
+
+        if revocation_list.is_revoked(payload.session_id):
+            return None
+
+        return SessionDB(
+            id=payload.session_id,
+            user_id=payload.user_id,
+            token_hash=create_hash(token),
+            expires_at=payload.expires_at.replace(tzinfo=None),
+        )
+
     def create(self, session_data: SessionCreate) -> SessionDB:
-        session = SessionDB(**session_data.model_dump())
-        self.db.add(session)
+        session = SessionDB(**session_data.model_dump(exclude_none=True))
+        if session.id is None:
+            session.id = str(uuid.uuid4())
+        self.store.add(session)
+        return session
+
+    def revoke(self, session: SessionDB) -> None:
+        """Записывает сессию в revoked_sessions (без commit)"""
+        self.db.merge(
+            RevokedSession(
+                session_id=session.id,
+                token_hash=session.token_hash,
+                user_id=session.user_id,
+                expires_at=session.expires_at,
+            )
+        )
+        self.db.flush()
+
+    def revoke_token(self, token: str) -> SessionDB | None:
+        """
+        Удаляет сессию токена и отзывает ее (выход).
+
+        Returns:
+            Отозванная сессия или None, если токен уже недействителен
+        """
+        found = self.get_by_token(token)
+        if found is None:
+            return None
+        # Строка sql хранилища удаляется, наружу - несохраненная копия
+        session = SessionDB(
+            id=found.id,
+            user_id=found.user_id,
+            token_hash=found.token_hash,
+            expires_at=found.expires_at,
+        )
+        self.store.delete(str(session.token_hash))
+        self.revoke(session)
         self.db.commit()
-        self.db.refresh(session)
         return session
+
+    def revoke_by_user(self, user_id: str) -> list[SessionDB]:
+        """Удаляет все сессии пользователя и отзывает действующие (без commit)"""
+        sessions = self.store.delete_by_user(user_id)
+        for session in sessions:
+            self.revoke(session)
+        return sessions
+
+    def revoked_since(self, since: datetime | None) -> list[tuple[str, datetime, datetime]]:
+        """Отзывы начиная с since (включительно), только с еще не истекшим сроком"""
+        query = self.db.query(
+            RevokedSession.session_id, RevokedSession.expires_at, RevokedSession.revoked_at
+        ).filter(RevokedSession.expires_at > datetime.now(timezone.utc))
+        if since is not None:
+            query = query.filter(RevokedSession.revoked_at >= since)
+        return [(row.session_id, row.expires_at, row.revoked_at) for row in query]
+
+    def revocation_events(self, since: datetime | None) -> list[tuple[str, str, str, datetime]]:
+        """Отзывы для рассылки: (session_id, token_hash, user_id, revoked_at) начиная с since"""
+        query = self.db.query(
+            RevokedSession.session_id,
+            RevokedSession.token_hash,
+            RevokedSession.user_id,
+            RevokedSession.revoked_at,
+        ).filter(RevokedSession.expires_at > datetime.now(timezone.utc))
+        if since is not None:
+            query = query.filter(RevokedSession.revoked_at >= since)
+        return [(row.session_id, row.token_hash, row.user_id, row.revoked_at) for row in query]
+
+    def prune_revoked(self) -> int:
+        deleted = (
+            self.db.query(RevokedSession)
+            .filter(RevokedSession.expires_at <= datetime.now(timezone.utc))
+            .delete(synchronize_session=False)
+        )
+        self.db.commit()
+        return deleted
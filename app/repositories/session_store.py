@@ -0,0 +1,331 @@
+"""
+Хранилища действующих сессий (SESSION_STORE)
+
+- sql (по умолчанию): таблица sessions;
+- memory: LRU в памяти процесса, только для запуска одним процессом (сессии
+  HTTP воркера не видны gRPC и другим воркерам), теряются при перезапуске;
+- kv: внешнее key-value хранилище по протоколу RESP (Redis и совместимые
+  серверы) по адресу SESSION_KV_URL, сессии уходят из реляционной БД.
+
+Хранилище ищет сессию по хэшу токена и возвращает SessionDB (для memory и kv -
+несохраненный объект с теми же полями). Отзывы подписанных токенов
+(revoked_sessions) остаются в SQL: их мало и они читаются списком.
+Изменения в memory и kv применяются сразу, вне транзакции сессии БД.
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from app.database import use_primary
+from app.models.session import SessionDB
+from app.services.session_filter import session_filter
+from app.utils import metrics
+from app.utils.cache_utils import LRUCache
+from app.utils.kv_client import KvClient
+
+SESSION_STORE = os.getenv("SESSION_STORE", "sql")
+# Максимум сессий в памяти процесса (SESSION_STORE=memory)
+SESSION_MEMORY_MAX_SIZE = int(os.getenv("SESSION_MEMORY_MAX_SIZE", "100000"))
+# Адрес key-value хранилища (SESSION_STORE=kv): redis://[:пароль@]хост:порт/номер_БД
+SESSION_KV_URL = os.getenv("SESSION_KV_URL", "redis://localhost:6379/0")
+SESSION_KV_TIMEOUT = float(os.getenv("SESSION_KV_TIMEOUT", "1"))
+# Префикс ключей, если хранилище общее с другими сервисами
+SESSION_KV_PREFIX = os.getenv("SESSION_KV_PREFIX", "as:")
+
+
+def _utc(value: datetime) -> datetime:
+    """Наивное UTC, как в колонке sessions.expires_at"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _is_live(expires_at: datetime) -> bool:
+    return _utc(expires_at) > datetime.utcnow()
+
+
+class SessionStore(ABC):
+    @abstractmethod
+    def get(self, token_hash: str) -> SessionDB | None:
+        """Действующая сессия по хэшу токена"""
+
+    @abstractmethod
+    def add(self, session: SessionDB) -> None:
+        """Сохраняет новую сессию"""
+
+    @abstractmethod
+    def delete(self, token_hash: str) -> None:
+        """Удаляет сессию по хэшу токена"""
+
+    @abstractmethod
+    def delete_by_user(self, user_id: str) -> list[SessionDB]:
+        """Удаляет все сессии пользователя, возвращает удаленные действующие"""
+
+    @abstractmethod
+    def extend(self, sessions: list[SessionDB]) -> None:
+        """
+        Переносит expires_at сессий на переданный. Истекшие и удаленные сессии
+        не восстанавливаются, срок не сокращается
+        """
+
+
+class SqlSessionStore(SessionStore):
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def get(self, token_hash: str) -> SessionDB | None:
+        if not session_filter.might_exist(self.db, token_hash):
+            return None
+
+        session = self._get(token_hash)
+        if session is None and self.db.info.get("use_replica"):
+            # Только что созданная сессия могла еще не дойти до реплики
+            with use_primary(self.db):
+                session = self._get(token_hash)
+        return session
+
+    def _get(self, token_hash: str) -> SessionDB | None:
+        return (
+            self.db.query(SessionDB)
+            .filter(
+                SessionDB.token_hash == token_hash,
+                SessionDB.expires_at > datetime.now(timezone.utc),
+            )
+            .first()
+        )
+
+    def add(self, session: SessionDB) -> None:
+        self.db.add(session)
+        self.db.commit()
+        self.db.refresh(session)
+        session_filter.added(str(session.token_hash))
+
+    def delete(self, token_hash: str) -> None:
+        """Без commit, как и delete_by_user"""
+        self.db.query(SessionDB).filter(SessionDB.token_hash == token_hash).delete(
+            synchronize_session=False
+        )
+
+    def delete_by_user(self, user_id: str) -> list[SessionDB]:
+        """Без commit: удаление идет в транзакции вызывающего (удаление пользователя)"""
+        # Несохраненные копии, как у других хранилищ: строки удаляются здесь же
+        live = [
+            SessionDB(
+                id=row.id, user_id=row.user_id, token_hash=row.token_hash, expires_at=row.expires_at
+            )
+            for row in self.db.query(
+                SessionDB.id, SessionDB.user_id, SessionDB.token_hash, SessionDB.expires_at
+            ).filter(
+                SessionDB.user_id == user_id, SessionDB.expires_at > datetime.now(timezone.utc)
+            )
+        ]
+        self.db.query(SessionDB).filter(SessionDB.user_id == user_id).delete(
+            synchronize_session=False
+        )
+        return live
+
+    def extend(self, sessions: list[SessionDB]) -> None:
+        # UPDATE таблицы, а не ORM: один executemany по первичному ключу
+        sessions_table = SessionDB.__table__
+        self.db.execute(
+            update(sessions_table)
+            .where(
+                sessions_table.c.id == bindparam("b_id"),
+                sessions_table.c.expires_at > datetime.now(timezone.utc),
+                sessions_table.c.expires_at < bindparam("b_expires_at"),
+            )
+            .values(expires_at=bindparam("b_expires_at")),
+            [{"b_id": session.id, "b_expires_at": session.expires_at} for session in sessions],
+        )
+        self.db.commit()
+
+    def count_live(self) -> int:
+        return (
+            self.db.query(func.count(SessionDB.id))
+            .filter(SessionDB.expires_at > datetime.now(timezone.utc))
+            .scalar()
+        )
+
+    def live_token_hashes(self, since: datetime | None = None) -> list[tuple[str, datetime]]:
+        """Хэши действующих сессий, при since - только истекающих не раньше since"""
+        query = self.db.query(SessionDB.token_hash, SessionDB.expires_at).filter(
+            SessionDB.expires_at > datetime.now(timezone.utc)
+        )
+        if since is not None:
+            query = query.filter(SessionDB.expires_at >= since)
+        return [(row.token_hash, row.expires_at) for row in query]
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, maxsize: int) -> None:
+        # token_hash -> (id, user_id, expires_at)
+        self.sessions: LRUCache[str, tuple[str, str, datetime]] = LRUCache(maxsize)
+        self.by_user: dict[str, set[str]] = {}
+        self.lock = threading.Lock()
+        metrics.register("session_store", self.stats)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self.sessions),
+            "users": len(self.by_user),
+            "evictions": self.sessions.evictions,
+        }
+
+    def get(self, token_hash: str) -> SessionDB | None:
+        item = self.sessions.get(token_hash)
+        if item is None:
+            return None
+        session_id, user_id, expires_at = item
+        if not _is_live(expires_at):
+            self.sessions.pop(token_hash)
+            return None
+        return SessionDB(
+            id=session_id, user_id=user_id, token_hash=token_hash, expires_at=expires_at
+        )
+
+    def add(self, session: SessionDB) -> None:
+        token_hash, user_id = str(session.token_hash), str(session.user_id)
+        self.sessions.set(token_hash, (str(session.id), user_id, _utc(session.expires_at)))  # pyright: ignore[reportArgumentType]
+        with self.lock:
+            # Заодно забываем сессии пользователя, вытесненные из LRU
+            hashes = {h for h in self.by_user.get(user_id, ()) if self.sessions.peek(h)}
+            hashes.add(token_hash)
+            self.by_user[user_id] = hashes
+
+    def delete(self, token_hash: str) -> None:
+        with self.lock:
+            item = self.sessions.pop(token_hash)
+            hashes = self.by_user.get(item[1], set()) if item is not None else set()
+            hashes.discard(token_hash)
+
+    def delete_by_user(self, user_id: str) -> list[SessionDB]:
+        removed = []
+        with self.lock:
+            for token_hash in self.by_user.pop(user_id, set()):
+                item = self.sessions.pop(token_hash)
+                if item is not None and _is_live(item[2]):
+                    removed.append(
+                        SessionDB(
+                            id=item[0], user_id=user_id, token_hash=token_hash, expires_at=item[2]
+                        )
+                    )
+        return removed
+
+    def extend(self, sessions: list[SessionDB]) -> None:
+        # Под блокировкой: иначе продление вернет сессию, удаленную delete_by_user
+        with self.lock:
+            for session in sessions:
+                item = self.sessions.peek(str(session.token_hash))
+                expires_at = _utc(session.expires_at)  # pyright: ignore[reportArgumentType]
+                if item is not None and _is_live(item[2]) and item[2] < expires_at:
+                    self.sessions.set(str(session.token_hash), (item[0], item[1], expires_at))
+
+
+class KvSessionStore(SessionStore):
+    """
+    {prefix}session:<хэш токена> -> "id user_id expires_at(мс)" живет до истечения сессии,
+    {prefix}user_sessions:<user_id> -> хэши токенов пользователя (для отзыва всех сессий),
+    живет до истечения последней сессии.
+
+    Нужны только GET, SET (PX, XX), MGET, DEL, SADD, SMEMBERS и PEXPIRE: без серверных
+    скриптов, чтобы подходил и простой совместимый сервер.
+    """
+
+    def __init__(self, client: KvClient, prefix: str) -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def _session_key(self, token_hash: str) -> str:
+        return f"{self.prefix}session:{token_hash}"
+
+    def _user_key(self, user_id: str) -> str:
+        return f"{self.prefix}user_sessions:{user_id}"
+
+    @staticmethod
+    def _decode(token_hash: str, value: str | None) -> SessionDB | None:
+        if value is None:
+            return None
+        session_id, user_id, expires_ms = value.split(" ")
+        expires_at = datetime.fromtimestamp(int(expires_ms) / 1000, timezone.utc)
+        if not _is_live(expires_at):
+            return None
+        return SessionDB(
+            id=session_id, user_id=user_id, token_hash=token_hash, expires_at=_utc(expires_at)
+        )
+
+    def get(self, token_hash: str) -> SessionDB | None:
+        return self._decode(token_hash, self.client.execute("GET", self._session_key(token_hash)))
+
+    @staticmethod
+    def _entry(session: SessionDB) -> tuple[str, int, int]:
+        """Значение ключа сессии, срок (мс с эпохи) и TTL ключа (мс)"""
+        expires_at = _utc(session.expires_at).replace(tzinfo=timezone.utc)  # pyright: ignore[reportArgumentType]
+        expires_ms = int(expires_at.timestamp() * 1000)
+        ttl_ms = max(1, int((expires_at - datetime.now(timezone.utc)).total_seconds() * 1000))
+        return f"{session.id} {session.user_id} {expires_ms}", expires_ms, ttl_ms
+
+    def add(self, session: SessionDB) -> None:
+        token_hash, user_key = str(session.token_hash), self._user_key(str(session.user_id))
+        value, _, ttl_ms = self._entry(session)
+        self.client.pipeline(
+            [
+                ("SET", self._session_key(token_hash), value, "PX", ttl_ms),
+                ("SADD", user_key, token_hash),
+                # Срок сессий одинаковый: последняя созданная истекает последней
+                ("PEXPIRE", user_key, ttl_ms),
+            ]
+        )
+
+    def extend(self, sessions: list[SessionDB]) -> None:
+        # Срок сравнивается на клиенте: запоздавший пакет не сокращает продление, записанное
+        # раньше другим процессом. XX: истекшая или удаленная сессия не появится снова.
+        # Продление другого процесса между MGET и SET может сократиться до этого, то есть
+        # не больше чем на задержку записи пакета
+        keys = [self._session_key(str(session.token_hash)) for session in sessions]
+        stored = self.client.execute("MGET", *keys)
+        commands = []
+        for session, key, current in zip(sessions, keys, stored, strict=True):
+            value, expires_ms, ttl_ms = self._entry(session)
+            if current is None or int(current.rpartition(" ")[2]) >= expires_ms:
+                continue
+            commands.append(("SET", key, value, "PX", ttl_ms, "XX"))
+            commands.append(("PEXPIRE", self._user_key(str(session.user_id)), ttl_ms))
+        if commands:
+            self.client.pipeline(commands)
+
+    def delete(self, token_hash: str) -> None:
+        # Множество пользователя чистится при отзыве всех сессий или истекает само
+        self.client.execute("DEL", self._session_key(token_hash))
+
+    def delete_by_user(self, user_id: str) -> list[SessionDB]:
+        user_key = self._user_key(user_id)
+        hashes = self.client.execute("SMEMBERS", user_key) or []
+        if not hashes:
+            return []
+        keys = [self._session_key(token_hash) for token_hash in hashes]
+        values, _ = self.client.pipeline([("MGET", *keys), ("DEL", user_key, *keys)])
+        sessions = (self._decode(h, value) for h, value in zip(hashes, values, strict=True))
+        return [session for session in sessions if session is not None]
+
+
+def _shared_store() -> SessionStore | None:
+    if SESSION_STORE == "memory":
+        return MemorySessionStore(SESSION_MEMORY_MAX_SIZE)
+    if SESSION_STORE == "kv":
+        return KvSessionStore(KvClient(SESSION_KV_URL, SESSION_KV_TIMEOUT), SESSION_KV_PREFIX)
+    if SESSION_STORE != "sql":
+        raise ValueError(f"Unknown SESSION_STORE: {SESSION_STORE}")
+    return None
+
+
+shared_store = _shared_store()
+
+
+def get_session_store(db: Session) -> SessionStore:
+    """Хранилище сессий из SESSION_STORE; sql работает в сессии БД запроса"""
+    return shared_store if shared_store is not None else SqlSessionStore(db)
@@ -1,21 +1,60 @@
-from sqlalchemy.orm import Session
+from datetime import datetime
 
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session, joinedload, load_only, raiseload, selectinload
+
+from app.models.authz_version import ROLES_TABLE, user_key
 from app.models.role import Role
 from app.models.session import SessionDB
-from app.models.user import User, UserCreate
+from app.models.user import USER_FIELDS, User, UserCreate
+from app.models.user_roles import UserRole
+from app.repositories.authz_version_repository import AuthzVersionRepository
+from app.repositories.effective_permission_repository import EffectivePermissionRepository
+from app.repositories.session_repository import SessionRepository
 from app.utils.pagination_utils import Page, paginate
 
+# Поля ответа, которые читаются колонками users
+USER_COLUMNS = ("name", "surname", "patronymic", "username", "birthday", "status", "created_at")
+
 
 class UserRepository:
     def __init__(self, db: Session) -> None:
         self.db = db
+        self.versions = AuthzVersionRepository(db)
+        self.effective = EffectivePermissionRepository(db)
+        self.sessions = SessionRepository(db)
+
+    @staticmethod
+    def _projected(query: Query, fields: frozenset[str] | None) -> Query:
+        """
+        Загружает только колонки и связи для полей ответа (fields=None - все поля).
+
+        Незапрошенные связи не загружаются вовсе (raiseload): обращение к ним
+        было бы незаметным запросом на каждого пользователя.
+        """
+        if fields is None:
+            fields = frozenset(USER_FIELDS)
 
-    def get_all(self, page: int, limit: int) -> Page[User]:
-        users = self.db.query(User)
+        columns = [getattr(User, name) for name in USER_COLUMNS if name in fields]
+        options = [
+            load_only(User.id, *columns),
+            joinedload(User.gender) if "gender" in fields else raiseload(User.gender),
+        ]
+        if "roles" in fields:
+            options.append(selectinload(User.roles).noload(Role.permissions))
+        elif "roles_count" in fields:
+            options.append(selectinload(User.roles).load_only(Role.id, Role.service_id))
+        else:
+            options.append(raiseload(User.roles))
+        return query.options(*options)
+
+    def get_all(self, page: int, limit: int, fields: frozenset[str] | None = None) -> Page[User]:
+        users = self._projected(self.db.query(User), fields)
         return paginate(users, page, limit)
 
-    def get_all_without_pages(self) -> list[User]:
-        users = self.db.query(User)
+    def get_all_without_pages(self, fields: frozenset[str] | None = None) -> list[User]:
+        users = self._projected(self.db.query(User), fields)
         return users.all()
 
     def get_by_id(self, user_id: str) -> User | None:
@@ -26,16 +65,25 @@ class UserRepository:
         user = self.db.query(User).filter(User.username == username).first()
         return user
 
-    def get_by_service_id(self, page: int, limit: int, service_id: str) -> Page[User]:
-        from app.models.role import Role
-
+    def get_by_service_id(
+        self, page: int, limit: int, service_id: str, fields: frozenset[str] | None = None
+    ) -> Page[User]:
         users = (
-            self.db.query(User)
-            .join(User.roles)
-            .filter(Role.service_id == service_id)
-            .distinct()
+            self.db.query(User).join(User.roles).filter(Role.service_id == service_id).distinct()
         )
-        return paginate(users, page, limit)
+        return paginate(self._projected(users, fields), page, limit)
+
+    def existing_usernames(self, usernames: list[str]) -> set[str]:
+        """Какие из переданных логинов уже заняты (один запрос)"""
+        if not usernames:
+            return set()
+        rows = self.db.query(User.username).filter(User.username.in_(usernames))
+        return {str(row.username) for row in rows}
+
+    def create_many(self, users: list[dict]) -> None:
+        """Вставляет пользователей одним executemany и фиксирует транзакцию"""
+        self.db.execute(insert(User), users)
+        self.db.commit()
 
     def create(self, user_data: UserCreate) -> User:
         user = User(**user_data.model_dump())
@@ -49,13 +97,20 @@ class UserRepository:
         user = self.db.query(User).filter(User.id == user_id).first()
         if user:
             # Сначала удаляем сессии пользователя, иначе FK (sessions.user_id -> users.id) блокирует удаление.
-            self.db.query(SessionDB).filter(SessionDB.user_id == user_id).delete(
-                synchronize_session=False
-            )
+            # Подписанные токены проверяются без хранилища, поэтому сессии еще и отзываются
+            self.sessions.revoke_by_user(user_id)
+            self.effective.user_deleted(user_id)
             self.db.delete(user)
+            self.versions.bump(ROLES_TABLE, changed=[user_key(user_id)])
             self.db.commit()
         return user
 
+    def revoke_sessions(self, user_id: str) -> list[SessionDB]:
+        """Завершает все сессии пользователя, возвращает отозванные"""
+        sessions = self.sessions.revoke_by_user(user_id)
+        self.db.commit()
+        return sessions
+
     def update(self, user_id: str, user_data):
         """Обновляет пользователя по ID"""
         user = self.db.query(User).filter(User.id == user_id).first()
@@ -66,14 +121,152 @@ class UserRepository:
             self.db.refresh(user)
         return user
 
-    def role_add(self, user: User, role_data: Role):
-        user.roles.append(role_data)
+    def role_ids(self, user_id: str, role_ids: list[str]) -> set[str]:
+        """Какие из переданных ролей уже назначены пользователю (один запрос)"""
+        if not role_ids:
+            return set()
+        rows = self.db.query(UserRole.role_id).filter(
+            UserRole.user_id == user_id, UserRole.role_id.in_(role_ids)
+        )
+        return {str(row.role_id) for row in rows}
+
+    def roles_bulk_update(self, user_id: str, add_ids: list[str], remove_ids: list[str]):
+        """Назначает и снимает роли пользователя одной транзакцией. Списки уже очищены от лишних id"""
+        if not add_ids and not remove_ids:
+            return
+
+        if add_ids:
+            self.db.execute(
+                insert(UserRole), [{"user_id": user_id, "role_id": role_id} for role_id in add_ids]
+            )
+            self.effective.user_roles_added(user_id, add_ids)
+        if remove_ids:
+            self.db.execute(
+                delete(UserRole).where(
+                    UserRole.user_id == user_id, UserRole.role_id.in_(remove_ids)
+                )
+            )
+            self.effective.user_roles_removed(user_id, remove_ids)
+
+        self.versions.bump(ROLES_TABLE, changed=[user_key(user_id)])
         self.db.commit()
-        self.db.refresh(user)
-        return user
 
-    def role_remove(self, user: User, role_data: Role):
-        user.roles.remove(role_data)
+    def get_with_roles(self, user_id: str) -> User | None:
+        """Пользователь с ролями для UserResponse, без загрузки разрешений ролей"""
+        return (
+            self.db.query(User)
+            .options(
+                joinedload(User.gender),
+                selectinload(User.roles).noload(Role.permissions),
+            )
+            .filter(User.id == user_id)
+            .first()
+        )
+
+    def role_add(
+        self,
+        user_id: str,
+        role_id: str,
+        valid_from: datetime | None = None,
+        valid_until: datetime | None = None,
+    ) -> bool:
+        """
+        Назначает роль одним INSERT, без загрузки user.roles.
+
+        Назначение с valid_from в будущем не дает разрешений до начала действия
+        (их добавляет role_activated).
+
+        Returns:
+            False, если роль уже назначена (нарушение первичного ключа user_roles)
+        """
+        try:
+            self.db.execute(
+                insert(UserRole).values(
+                    user_id=user_id,
+                    role_id=role_id,
+                    valid_from=valid_from,
+                    valid_until=valid_until,
+                )
+            )
+        except IntegrityError:
+            self.db.rollback()
+            return False
+
+        if valid_from is None or valid_from <= datetime.utcnow():
+            self.effective.user_role_added(user_id, role_id)
+        self.versions.bump(ROLES_TABLE, changed=[user_key(user_id)])
         self.db.commit()
-        self.db.refresh(user)
-        return user
+        return True
+
+    def scheduled_role_changes(self) -> list[tuple[str, str, datetime | None, datetime | None]]:
+        """Временные назначения, которые еще начнутся или истекут (в том числе уже истекшие)"""
+        rows = self.db.query(
+            UserRole.user_id, UserRole.role_id, UserRole.valid_from, UserRole.valid_until
+        ).filter((UserRole.valid_until.isnot(None)) | (UserRole.valid_from > datetime.utcnow()))
+        return [
+            (str(user_id), str(role_id), valid_from, valid_until)
+            for user_id, role_id, valid_from, valid_until in rows
+        ]
+
+    def role_activated(self, user_id: str, role_id: str) -> bool:
+        """
+        Начало действия временного назначения: добавляет разрешения роли.
+
+        Returns:
+            False, если назначения уже нет или оно еще не действует
+        """
+        active = (
+            self.db.query(UserRole.role_id)
+            .filter(UserRole.user_id == user_id, UserRole.role_id == role_id, UserRole.active())
+            .first()
+        )
+        if active is None:
+            self.db.rollback()
+            return False
+
+        self.effective.user_role_added(user_id, role_id)
+        self.versions.bump(ROLES_TABLE, changed=[user_key(user_id)])
+        self.db.commit()
+        return True
+
+    def role_expired(self, user_id: str, role_id: str) -> bool:
+        """
+        Истечение временного назначения: удаляет строку, если срок действительно прошел.
+
+        Returns:
+            False, если назначение уже удалено или продлено
+        """
+        result = self.db.execute(
+            delete(UserRole).where(
+                UserRole.user_id == user_id,
+                UserRole.role_id == role_id,
+                UserRole.valid_until <= datetime.utcnow(),
+            )
+        )
+        if not result.rowcount:  # pyright: ignore[reportAttributeAccessIssue]
+            self.db.rollback()
+            return False
+
+        self.effective.user_role_removed(user_id, role_id)
+        self.versions.bump(ROLES_TABLE, changed=[user_key(user_id)])
+        self.db.commit()
+        return True
+
+    def role_remove(self, user_id: str, role_id: str) -> bool:
+        """
+        Снимает роль одним DELETE.
+
+        Returns:
+            False, если роль не была назначена
+        """
+        result = self.db.execute(
+            delete(UserRole).where(UserRole.user_id == user_id, UserRole.role_id == role_id)
+        )
+        if not result.rowcount:  # pyright: ignore[reportAttributeAccessIssue]
+            self.db.rollback()
+            return False
+
+        self.effective.user_role_removed(user_id, role_id)
+        self.versions.bump(ROLES_TABLE, changed=[user_key(user_id)])
+        self.db.commit()
+        return True
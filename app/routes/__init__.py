@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from app.routes.auth_routes import auth_router
+from app.routes.metrics_routes import metrics_router
 from app.routes.permission_routes import perm_router
 from app.routes.role_routes import roles_router
 from app.routes.service_routers import service_router
@@ -13,3 +14,4 @@ main_router.include_router(perm_router)
 main_router.include_router(service_router)
 main_router.include_router(roles_router)
 main_router.include_router(user_router)
+main_router.include_router(metrics_router)
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Cookie, Response
 
 from app.database import DbSession
 from app.services.auth_service import AuthService, Login
+from app.services.session_touch import SESSION_SLIDING_EXPIRY
 
 auth_router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -15,16 +16,28 @@ def login(
     service = AuthService(db)
     result = service.login(login)
     # Делает cookie доступной для всех поддоменов *.st29.ru и для основного домена.
+    # Скользящая сессия продлевается на сервере, поэтому cookie без срока
     response.set_cookie(
         "session",
         result[0],
-        expires=result[1],
+        expires=None if SESSION_SLIDING_EXPIRY else result[1],
         httponly=True,
         domain=".st29.ru",
         path="/",
     )
 
 
+@auth_router.post("/logout", summary="Выход: завершить текущую сессию")
+def logout(
+    response: Response,
+    db: DbSession,
+    session_token: str | None = Cookie(default=None, alias="session"),
+):
+    if session_token is not None:
+        AuthService(db).logout(session_token)
+    response.delete_cookie("session", httponly=True, domain=".st29.ru", path="/")
+
+
 @auth_router.post("/validate-session", summary="Проверить действительность сессии")
 def validate_session(
     db: DbSession, session_token: str | None = Cookie(default=None, alias="session")
@@ -0,0 +1,18 @@
+import os
+
+from fastapi import APIRouter, Depends
+
+from app.middleware.auth_middleware import require_permission
+from app.utils import metrics
+
+metrics_router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@metrics_router.get(
+    "",
+    summary="Счетчики кэшей и очередей текущего процесса",
+    dependencies=[Depends(require_permission("metrics", "read"))],
+)
+def get_metrics():
+    # При запуске через cmd.serve каждый воркер отдает свои счетчики
+    return {"pid": os.getpid(), "metrics": metrics.collect()}
@@ -6,6 +6,7 @@ from app.middleware.auth_middleware import require_permission
 from app.models.permission import PermissionCreate, PermissionResponse
 from app.services.permission_service import PermissionService
 from app.utils.pagination_utils import PageResponse
+from app.utils.routes_utils import FastJSONResponse
 
 perm_router = APIRouter(prefix="/permissions", tags=["Permissions"])
 
@@ -23,7 +24,7 @@ def get_permissions(
     limit: int = Query(10, ge=1, le=100),
 ):
     service = PermissionService(db)
-    return service.get_all(page, limit)
+    return service.get_all_response(page, limit)
 
 
 @perm_router.get(
@@ -40,7 +41,7 @@ def get_permissions_by_service_id(
     limit: int = Query(10, ge=1, le=100),
 ):
     service = PermissionService(db)
-    return service.get_all_by_service_id(service_id, page, limit)
+    return FastJSONResponse(service.get_all_by_service_id(service_id, page, limit))
 
 
 @perm_router.post(
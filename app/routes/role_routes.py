@@ -2,7 +2,13 @@ from fastapi import APIRouter, Depends, Query
 
 from app.database import DbSession
 from app.middleware.auth_middleware import require_permission
-from app.models.role import RoleAddPermission, RoleCreate
+from app.models.role import (
+    BulkAssignResult,
+    RoleAddParent,
+    RoleAddPermission,
+    RoleBulkPermissions,
+    RoleCreate,
+)
 from app.models.permission import RoleDetailedResponse
 from app.services.role_service import RoleService
 
@@ -20,7 +26,7 @@ def get_roles(
     limit: int = Query(10, ge=1, le=100),
 ):
     service = RoleService(db)
-    return service.get_all(page, limit)
+    return service.get_all_response(page, limit)
 
 
 @roles_router.get(
@@ -35,7 +41,7 @@ def get_roles_by_service_id(
     limit: int = Query(10, ge=1, le=100),
 ):
     service = RoleService(db)
-    return service.get_all_by_service_id(service_id, page, limit)
+    return service.get_all_by_service_id_response(service_id, page, limit)
 
 
 @roles_router.post(
@@ -58,6 +64,37 @@ def role_remove(perm_add_data: RoleAddPermission, db: DbSession):
     return service.permission_remove(perm_add_data)
 
 
+@roles_router.post(
+    "/perm/bulk",
+    summary="Добавить и удалить несколько разрешений роли одним запросом",
+    response_model=BulkAssignResult,
+    dependencies=[Depends(require_permission("roles.perm", "edit"))],
+)
+def role_permissions_bulk(bulk_data: RoleBulkPermissions, db: DbSession):
+    service = RoleService(db)
+    return service.permissions_bulk(bulk_data)
+
+
+@roles_router.post(
+    "/parents/add",
+    summary="Наследовать разрешения другой роли",
+    dependencies=[Depends(require_permission("roles.parents", "edit"))],
+)
+def role_parent_add(parent_data: RoleAddParent, db: DbSession):
+    service = RoleService(db)
+    return service.parent_add(parent_data)
+
+
+@roles_router.post(
+    "/parents/remove",
+    summary="Перестать наследовать разрешения роли",
+    dependencies=[Depends(require_permission("roles.parents", "edit"))],
+)
+def role_parent_remove(parent_data: RoleAddParent, db: DbSession):
+    service = RoleService(db)
+    return service.parent_remove(parent_data)
+
+
 @roles_router.post(
     "/create",
     summary="Создать роль",
@@ -89,6 +126,16 @@ def get_role_detailed(role_id: str, db: DbSession):
     return service.get_role_detailed(role_id)
 
 
+@roles_router.get(
+    "/{role_id}/parents",
+    summary="Получить роли, от которых роль наследует разрешения",
+    dependencies=[Depends(require_permission("roles", "read"))],
+)
+def get_role_parents(role_id: str, db: DbSession):
+    service = RoleService(db)
+    return service.get_parents(role_id)
+
+
 @roles_router.delete(
     "/{role_id}",
     summary="Удалить роль",
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Header, Query, status
 
 from app.database import DbSession
 from app.middleware.auth_middleware import get_session, require_permission
@@ -22,7 +22,7 @@ def get_all(
     limit: int = Query(10, ge=1, le=100),
 ):
     service = ServiceService(db)
-    return service.get_all(page, limit)
+    return service.get_all_response(page, limit)
 
 
 @service_router.post(
@@ -54,8 +54,9 @@ def update(service_id: str, service_data: ServiceCreate, db: DbSession):
 )
 def get_user_accessible_services(
     db: DbSession,
-    session=Depends(get_session)
+    session=Depends(get_session),
+    if_none_match: str | None = Header(default=None),
 ):
     service = ServiceService(db)
     user_id = str(session.user_id)
-    return service.get_services_by_user_roles(user_id)
+    return service.get_services_by_user_roles_response(user_id, if_none_match)
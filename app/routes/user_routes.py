@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, Query, status
+import tempfile
+
+from fastapi import APIRouter, Depends, Header, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 
 from app.database import DbSession
 from app.middleware.auth_middleware import get_session, require_permission
+from app.models.role import BulkAssignResult
 from app.models.session import SessionDB
-from app.models.user import UserAddRole, UserCreate, UserResponse, UserUpdate
+from app.models.user import UserAddRole, UserBulkRoles, UserCreate, UserResponse, UserUpdate
 from app.services.permission_service import PermissionService
+from app.services.user_import_service import ImportFormat, ImportReport, UserImportService
 from app.services.user_service import UserService
+from app.utils.routes_utils import FastJSONResponse
 
 user_router = APIRouter(prefix="/users", tags=["Users"])
 
+FIELDS_QUERY = Query(
+    None,
+    description="Поля пользователя через запятую (например, id,name,surname); по умолчанию все",
+)
+
 
 @user_router.get(
     "",
@@ -20,9 +31,10 @@ def get(
     db: DbSession,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    fields: str | None = FIELDS_QUERY,
 ):
     service = UserService(db)
-    return service.get_all(page, limit)
+    return FastJSONResponse(service.get_all(page, limit, service.parse_fields(fields)))
 
 
 @user_router.get(
@@ -36,9 +48,12 @@ def get_by_service_id(
     db: DbSession,
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    fields: str | None = FIELDS_QUERY,
 ):
     service = UserService(db)
-    return service.get_all_by_service_id(service_id, page, limit)
+    return FastJSONResponse(
+        service.get_all_by_service_id(service_id, page, limit, service.parse_fields(fields))
+    )
 
 
 @user_router.get(
@@ -49,9 +64,10 @@ def get_by_service_id(
 )
 def getWithoutLimits(
     db: DbSession,
+    fields: str | None = FIELDS_QUERY,
 ):
     service = UserService(db)
-    return service.get_all_without_limits()
+    return FastJSONResponse(service.get_all_without_limits(service.parse_fields(fields)))
 
 
 @user_router.get(
@@ -71,9 +87,16 @@ def get_me(db: DbSession, session: SessionDB = Depends(get_session)):
     summary="Получить список разрешений пользователя",
     dependencies=[],
 )
-def get_me_permissions(service_id: str, db: DbSession, session: SessionDB = Depends(get_session)):
+def get_me_permissions(
+    service_id: str,
+    db: DbSession,
+    session: SessionDB = Depends(get_session),
+    if_none_match: str | None = Header(default=None),
+):
     service = PermissionService(db)
-    return service.get_by_user_id_and_service_id(str(session.user_id), service_id)
+    return service.get_by_user_id_and_service_id_response(
+        str(session.user_id), service_id, if_none_match
+    )
 
 
 @user_router.get(
@@ -98,6 +121,16 @@ def update_user(user_id: str, user_data: UserUpdate, db: DbSession):
     return service.update(user_id, user_data)
 
 
+@user_router.post(
+    "/{user_id}/sessions/revoke",
+    summary="Завершить все сессии пользователя",
+    dependencies=[Depends(require_permission("users.sessions", "delete"))],
+)
+def revoke_sessions(user_id: str, db: DbSession):
+    service = UserService(db)
+    return service.revoke_sessions(user_id)
+
+
 @user_router.delete(
     "/{user_id}",
     summary="Удалить пользователя",
@@ -119,6 +152,28 @@ def create(user_data: UserCreate, db: DbSession):
     return service.create(user_data)
 
 
+@user_router.post(
+    "/import",
+    summary="Массовый импорт пользователей из CSV или NDJSON",
+    response_model=ImportReport,
+    dependencies=[Depends(require_permission("users", "create"))],
+)
+async def import_users(
+    request: Request,
+    db: DbSession,
+    file_format: ImportFormat = Query("csv", alias="format"),
+):
+    # Тело читается потоком во временный файл (в памяти до 8 МБ, дальше на диск),
+    # сам импорт выполняется в пуле потоков, чтобы не блокировать event loop
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as file:
+        async for chunk in request.stream():
+            file.write(chunk)
+        file.seek(0)
+
+        service = UserImportService(db)
+        return await run_in_threadpool(service.import_file, file, file_format)
+
+
 @user_router.post(
     "/roles/add",
     summary="Добавить роль пользователю",
@@ -137,3 +192,14 @@ def role_add(user_add_data: UserAddRole, db: DbSession):
 def role_remove(user_remove_data: UserAddRole, db: DbSession):
     service = UserService(db)
     return service.role_remove(user_remove_data)
+
+
+@user_router.post(
+    "/roles/bulk",
+    summary="Назначить и снять несколько ролей пользователя одним запросом",
+    response_model=BulkAssignResult,
+    dependencies=[Depends(require_permission("users.roles", "edit"))],
+)
+def roles_bulk(bulk_data: UserBulkRoles, db: DbSession):
+    service = UserService(db)
+    return service.roles_bulk(bulk_data)
@@ -0,0 +1,218 @@
+"""
+Журнал решений авторизации (ValidatePermission и require_permission)
+
+Горячий путь только добавляет кортеж в буфер: deque.append и popleft атомарны
+под GIL, блокировок нет. Фоновый поток забирает записи раз в
+AUDIT_LOG_FLUSH_INTERVAL или при накоплении пакета и пишет их пакетом в
+таблицу authz_audit_log (AUDIT_LOG_SINK=db) или в сжатые NDJSON-файлы с
+ротацией по размеру (AUDIT_LOG_SINK=file). Если приемник не успевает, буфер
+заполняется до AUDIT_LOG_BUFFER_SIZE и новые записи отбрасываются со
+счетчиком dropped - проверки прав никогда не ждут журнал.
+
+Счетчики доступны в /api/as/metrics (audit_log).
+"""
+
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import BinaryIO
+
+from app.utils import metrics
+
+# Приемник: db, file или пусто (журнал выключен)
+AUDIT_LOG_SINK = os.getenv("AUDIT_LOG_SINK", "")
+# Каталог файлов для AUDIT_LOG_SINK=file
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "audit")
+# Размер несжатых данных, после которого начинается новый файл
+AUDIT_LOG_FILE_MAX_BYTES = int(os.getenv("AUDIT_LOG_FILE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Максимум записей в буфере процесса, сверх него записи отбрасываются
+AUDIT_LOG_BUFFER_SIZE = int(os.getenv("AUDIT_LOG_BUFFER_SIZE", "100000"))
+AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "5000"))
+# Как часто сбрасывать буфер (секунды)
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "1"))
+
+# (время, user_id, код, статус, источник, задержка в мс)
+AuditEntry = tuple[float, str | None, str, int, str, float]
+
+
+def _to_record(entry: AuditEntry) -> dict:
+    created_at, user_id, code, status_code, source, latency_ms = entry
+    return {
+        "created_at": datetime.fromtimestamp(created_at, timezone.utc).replace(tzinfo=None),
+        "user_id": user_id,
+        "code": code,
+        "allowed": status_code == 200,
+        "status_code": status_code,
+        "source": source,
+        "latency_ms": round(latency_ms, 3),
+    }
+
+
+class DbSink:
+    """Пакетная вставка в authz_audit_log"""
+
+    def write(self, entries: list[AuditEntry]) -> None:
+        from app.database import SessionLocal
+        from app.repositories.audit_repository import AuditRepository
+
+        db = SessionLocal()
+        try:
+            AuditRepository(db).insert_many([_to_record(entry) for entry in entries])
+        finally:
+            db.close()
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink:
+    """
+    NDJSON в gzip-файлах, по файлу на процесс.
+
+    Каждый пакет дописывается отдельным gzip-членом, поэтому файл в любой
+    момент читается целиком (zcat, gzip.open), в том числе до ротации.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.file: BinaryIO | None = None
+        self.written = 0
+
+    def _rotate(self) -> None:
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"authz-audit-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.ndjson.gz"
+        self.file = open(os.path.join(self.directory, name), "ab")
+        self.written = 0
+
+    def write(self, entries: list[AuditEntry]) -> None:
+        if self.file is None or self.written >= self.max_bytes:
+            self._rotate()
+        assert self.file is not None
+
+        data = b"".join(
+            json.dumps(_to_record(entry), default=str, ensure_ascii=False).encode() + b"\n"
+            for entry in entries
+        )
+        self.file.write(gzip.compress(data))
+        self.file.flush()
+        self.written += len(data)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+SINKS = {"db": DbSink, "file": lambda: FileSink(AUDIT_LOG_DIR, AUDIT_LOG_FILE_MAX_BYTES)}
+
+
+class AuditLog:
+    def __init__(self, sink: str, buffer_size: int, batch_size: int, flush_interval: float) -> None:
+        self.sink_name = sink
+        self.enabled = sink in SINKS
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer: deque[AuditEntry] = deque()
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+        self._sink = None
+        self._thread: threading.Thread | None = None
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "buffered": len(self.buffer),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+    def record(
+        self, user_id: str | None, code: str, status_code: int, source: str, started: float
+    ) -> None:
+        """
+        Добавляет решение в буфер.
+
+        Args:
+            started: time.perf_counter() в начале проверки
+        """
+        if not self.enabled:
+            return
+        if len(self.buffer) >= self.buffer_size:
+            self.dropped += 1
+            return
+
+        self.buffer.append(
+            (
+                time.time(),
+                user_id,
+                code,
+                status_code,
+                source,
+                (time.perf_counter() - started) * 1000,
+            )
+        )
+        self.recorded += 1
+
+        if self._thread is None:
+            self._start()
+        elif len(self.buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._sink = SINKS[self.sink_name]()
+            self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Пишет накопленные записи пакетами по batch_size"""
+        with self._flush_lock:
+            while self.buffer:
+                batch = []
+                while self.buffer and len(batch) < self.batch_size:
+                    batch.append(self.buffer.popleft())
+                try:
+                    self._sink.write(batch)  # pyright: ignore[reportOptionalMemberAccess]
+                    self.written += len(batch)
+                except Exception as e:
+                    # Пакет теряется; при недоступном приемнике буфер заполнится
+                    # и новые записи будут отброшены, а не накоплены в памяти
+                    self.failed += len(batch)
+                    print(f"Error writing audit log: {e}")
+                    return
+
+    def close(self) -> None:
+        self.flush()
+        if self._sink is not None:
+            self._sink.close()
+
+
+audit_log = AuditLog(
+    AUDIT_LOG_SINK, AUDIT_LOG_BUFFER_SIZE, AUDIT_LOG_BATCH_SIZE, AUDIT_LOG_FLUSH_INTERVAL
+)
+metrics.register("audit_log", audit_log.stats)
@@ -1,4 +1,5 @@
-from datetime import datetime, timedelta, timezone
+import uuid
+from datetime import datetime, timezone
 
 from fastapi import HTTPException
 from pydantic import BaseModel
@@ -8,8 +9,15 @@ from app.database import DbSession
 from app.models.session import SessionCreate
 from app.repositories.session_repository import SessionRepository
 from app.repositories.user_repository import UserRepository
+from app.services.revocation_hub import revocation_hub
+from app.services.session_touch import SESSION_TTL
 from app.utils.password_utils import verify_password
-from app.utils.token_utils import create_hash, generate_token
+from app.utils.token_utils import (
+    SESSION_TOKEN_FORMAT,
+    create_hash,
+    generate_signed_token,
+    generate_token,
+)
 
 
 class Login(BaseModel):
@@ -33,12 +41,18 @@ class AuthService:
         if not verify_password(str(user.password), login.password):
             raise HTTPException(404, detail="Неверный логин или пароль")
 
-        token = generate_token()
+        expires_at = datetime.now(timezone.utc) + SESSION_TTL
+        session_id = str(uuid.uuid4())
+
+        if SESSION_TOKEN_FORMAT == "signed":
+            # Сессия в хранилище все равно создается: по ней работает отзыв и старые версии сервиса
+            token = generate_signed_token(session_id, str(user.id), expires_at)
+        else:
+            token = generate_token()
         token_hash = create_hash(token)
-        expires_at = datetime.now(timezone.utc) + timedelta(hours=3)
 
         session_create = SessionCreate(
-            user_id=str(user.id), token_hash=token_hash, expires_at=expires_at
+            id=session_id, user_id=str(user.id), token_hash=token_hash, expires_at=expires_at
         )
 
         self.repo_session.create(session_create)
@@ -49,3 +63,11 @@ class AuthService:
         """Проверяет действительность сессии по токену"""
         session = self.repo_session.get_by_token(token)
         return session is not None
+
+    def logout(self, token: str) -> bool:
+        """Завершает сессию токена. False - сессия уже недействительна"""
+        session = self.repo_session.revoke_token(token)
+        if session is None:
+            return False
+        revocation_hub.publish([session])
+        return True
@@ -0,0 +1,316 @@
+"""
+Проверка разрешений на битовых масках
+
+Каждому коду разрешения присваивается плотный целочисленный id внутри его
+сервиса (первый сегмент кода "service:entity:action"), роль хранится как
+битовые маски (Python int) своих кодов по сервисам. Итоговая маска
+пользователя - OR масок его ролей, кэшируется на пользователя. Все восемь
+wildcard-шаблонов проверки относятся к двум сервисам (service и all), поэтому
+проверка сводится к двум AND небольших масок. Разбиение по сервисам держит
+маски короткими: одна маска на все 100k кодов весила бы 12 КБ на роль, а
+операции над ней были бы медленнее проверки по множеству.
+
+Изменения из других процессов приходят через журнал authz_changes:
+role:<id> пересчитывает маску одной роли и маски закэшированных пользователей
+с этой ролью (без обращения к БД), user:<id> сбрасывает кэш пользователя.
+
+Временные назначения (user_roles.valid_from/valid_until): запись пользователя
+хранит время ближайшего начала или истечения его назначений и после него
+перечитывается, проверке это добавляет одно сравнение.
+
+Включается переменной AUTHZ_ENGINE=bitset.
+"""
+
+import math
+import os
+import threading
+import time
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from app.database import use_primary
+from app.models.permission import Permission
+from app.models.user_roles import UserRole
+from app.repositories.authz_version_repository import AuthzVersionRepository
+from app.repositories.effective_permission_repository import role_grants
+from app.utils.cache_utils import LRUCache
+
+AUTHZ_ENGINE = os.getenv("AUTHZ_ENGINE", "sql")
+# Как часто читать журнал authz_changes (секунды)
+ENGINE_POLL_INTERVAL = float(os.getenv("AUTHZ_ENGINE_POLL_INTERVAL", "0.5"))
+# Максимум закэшированных пользователей в процессе
+ENGINE_USER_CACHE_SIZE = int(os.getenv("AUTHZ_ENGINE_USER_CACHE_SIZE", "100000"))
+# Максимум закэшированных масок шаблонов проверки
+MASK_CACHE_SIZE = 10_000
+# Перекрытие окна чтения журнала: транзакция может зафиксироваться позже своей метки времени
+CHANGES_OVERLAP = timedelta(seconds=10)
+# Сколько хранить журнал. Процесс, не читавший журнал дольше, перезагружается полностью
+CHANGES_RETENTION = timedelta(days=1)
+
+
+# Маски по сервисам: сегмент сервиса кода -> биты кодов этого сервиса
+Bitmaps = dict[str, int]
+
+
+class BitsetIndex:
+    """Коды разрешений и маски ролей. Не обращается к БД"""
+
+    def __init__(self) -> None:
+        self.code_ids: dict[str, tuple[str, int]] = {}
+        self.segment_sizes: dict[str, int] = {}
+        self.role_bits: dict[str, Bitmaps] = {}
+        # Маски наборов шаблонов: проверки повторяются, сами шаблоны не меняются
+        self.masks: dict[tuple[str, ...], Bitmaps] = {}
+
+    def code_id(self, code: str) -> tuple[str, int]:
+        code_id = self.code_ids.get(code)
+        if code_id is None:
+            segment = code.partition(":")[0]
+            bit = self.segment_sizes.get(segment, 0)
+            self.segment_sizes[segment] = bit + 1
+            code_id = self.code_ids[code] = (segment, bit)
+            # Новый код мог входить в уже посчитанные маски
+            self.masks.clear()
+        return code_id
+
+    def set_role(self, role_id: str, codes: Iterable[str]) -> None:
+        bits: Bitmaps = {}
+        for code in codes:
+            segment, bit = self.code_id(code)
+            bits[segment] = bits.get(segment, 0) | (1 << bit)
+        if bits:
+            self.role_bits[role_id] = bits
+        else:
+            self.role_bits.pop(role_id, None)
+
+    def user_bits(self, role_ids: Iterable[str]) -> Bitmaps:
+        bits: Bitmaps = {}
+        for role_id in role_ids:
+            for segment, role_bits in self.role_bits.get(role_id, {}).items():
+                bits[segment] = bits.get(segment, 0) | role_bits
+        return bits
+
+    def mask(self, codes: tuple[str, ...]) -> Bitmaps:
+        mask = self.masks.get(codes)
+        if mask is not None:
+            return mask
+
+        mask = {}
+        for code in codes:
+            code_id = self.code_ids.get(code)
+            if code_id is not None:
+                segment, bit = code_id
+                mask[segment] = mask.get(segment, 0) | (1 << bit)
+
+        if len(self.masks) >= MASK_CACHE_SIZE:
+            self.masks.clear()
+        self.masks[codes] = mask
+        return mask
+
+    @staticmethod
+    def has_any(bits: Bitmaps, mask: Bitmaps) -> bool:
+        return any(bits.get(segment, 0) & segment_mask for segment, segment_mask in mask.items())
+
+
+class _UserEntry:
+    __slots__ = ("role_ids", "bits", "until")
+
+    def __init__(self, role_ids: tuple[str, ...], bits: Bitmaps, until: float) -> None:
+        self.role_ids = role_ids
+        self.bits = bits
+        # Время (time.time) ближайшего начала или истечения назначения пользователя:
+        # до него набор ролей не меняется, после - запись перечитывается
+        self.until = until
+
+
+class BitsetAuthzEngine:
+    def __init__(self) -> None:
+        self.index: BitsetIndex | None = None
+        self.users: LRUCache[str, _UserEntry] = LRUCache(ENGINE_USER_CACHE_SIZE)
+        # Обратный индекс роль -> закэшированные пользователи (может содержать вытесненных)
+        self.role_users: dict[str, set[str]] = {}
+        # Увеличивается при каждом пересчете масок ролей
+        self.epoch = 0
+        # Увеличивается при каждом сбросе записей пользователей (user:<id>, полная загрузка)
+        self.user_epoch = 0
+        self.cursor: datetime | None = None
+        self.applied: dict[int, datetime] = {}
+        self.polled_at = 0.0
+        self.pruned_at = 0.0
+        self.lock = threading.Lock()
+
+    def _load(self, db: Session) -> None:
+        """Полная загрузка. Id кодов присваиваются по порядку, маски получаются плотными"""
+        versions = AuthzVersionRepository(db)
+        self.cursor = versions.last_change_time()
+        self.applied = {
+            change_id: created_at
+            for change_id, _, created_at in versions.changes_since(self._window_start())
+        }
+
+        index = BitsetIndex()
+        for (code,) in (
+            db.query(Permission.code).filter(Permission.code.isnot(None)).order_by(Permission.code)
+        ):
+            index.code_id(code)
+
+        # С наследованием маска роли включает коды ее предков
+        grants = role_grants()
+        role_codes: dict[str, list[str]] = {}
+        rows = (
+            db.query(grants.c.role_id, Permission.code)
+            .join(Permission, Permission.id == grants.c.permission_id)
+            .filter(Permission.code.isnot(None))
+        )
+        for role_id, code in rows:
+            role_codes.setdefault(str(role_id), []).append(code)
+        for role_id, codes in role_codes.items():
+            index.set_role(role_id, codes)
+
+        self.index = index
+        self.epoch += 1
+        self.user_epoch += 1
+        self.users.clear()
+        self.role_users = {}
+        self.polled_at = time.monotonic()
+
+    def _window_start(self) -> datetime | None:
+        return self.cursor - CHANGES_OVERLAP if self.cursor is not None else None
+
+    def _reload_role(self, db: Session, role_id: str) -> None:
+        assert self.index is not None
+        grants = role_grants()
+        codes = (
+            db.query(Permission.code)
+            .join(grants, grants.c.permission_id == Permission.id)
+            .filter(grants.c.role_id == role_id, Permission.code.isnot(None))
+        )
+        self.index.set_role(role_id, (code for (code,) in codes))
+        self.epoch += 1
+
+        # Пересчитываем только пользователей с этой ролью - из масок ролей, без БД
+        for user_id in self.role_users.get(role_id, set()).copy():
+            entry = self.users.peek(user_id)
+            if entry is None or role_id not in entry.role_ids:
+                self.role_users[role_id].discard(user_id)
+                continue
+            entry.bits = self.index.user_bits(entry.role_ids)
+
+    def _poll(self, db: Session) -> None:
+        if time.monotonic() - self.polled_at > CHANGES_RETENTION.total_seconds():
+            self._load(db)
+            return
+
+        versions = AuthzVersionRepository(db)
+        for change_id, key, created_at in versions.changes_since(self._window_start()):
+            if change_id in self.applied:
+                continue
+            self.applied[change_id] = created_at
+            if self.cursor is None or created_at > self.cursor:
+                self.cursor = created_at
+
+            kind, _, entity_id = key.partition(":")
+            if kind == "role":
+                self._reload_role(db, entity_id)
+            elif kind == "user":
+                self.users.pop(entity_id)
+                self.user_epoch += 1
+
+        window_start = self._window_start()
+        if window_start is not None:
+            self.applied = {
+                change_id: created_at
+                for change_id, created_at in self.applied.items()
+                if created_at >= window_start
+            }
+
+        now = time.monotonic()
+        self.polled_at = now
+        if now - self.pruned_at > 3600:
+            self.pruned_at = now
+            self._prune()
+
+    def _prune(self) -> None:
+        from app.database import SessionLocal
+
+        # Отдельная сессия: prune делает commit, а db принадлежит запросу
+        db = SessionLocal()
+        try:
+            AuthzVersionRepository(db).prune_changes(datetime.utcnow() - CHANGES_RETENTION)
+        finally:
+            db.close()
+
+    def _refresh(self, db: Session) -> None:
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self._load(db)
+            return
+
+        if time.monotonic() - self.polled_at < ENGINE_POLL_INTERVAL:
+            return
+
+        # Опрашивает один поток, остальные продолжают работать с текущими масками
+        if self.lock.acquire(blocking=False):
+            try:
+                self._poll(db)
+            finally:
+                self.lock.release()
+
+    @staticmethod
+    def _user_roles(db: Session, user_id: str) -> tuple[tuple[str, ...], float]:
+        """Действующие роли пользователя и время ближайшего изменения их набора"""
+        now = datetime.utcnow()
+        role_ids = []
+        changes = []
+        rows = db.query(UserRole.role_id, UserRole.valid_from, UserRole.valid_until).filter(
+            UserRole.user_id == user_id
+        )
+        for role_id, valid_from, valid_until in rows:
+            if valid_from is not None and valid_from > now:
+                changes.append(valid_from)
+                continue
+            if valid_until is not None:
+                if valid_until <= now:
+                    continue
+                changes.append(valid_until)
+            role_ids.append(str(role_id))
+
+        until = min(changes).replace(tzinfo=timezone.utc).timestamp() if changes else math.inf
+        return tuple(role_ids), until
+
+    def _user_entry(self, db: Session, user_id: str) -> _UserEntry:
+        assert self.index is not None
+        entry = self.users.get(user_id)
+        if entry is None or time.time() >= entry.until:
+            epoch, user_epoch = self.epoch, self.user_epoch
+            role_ids, until = self._user_roles(db, user_id)
+            entry = _UserEntry(role_ids, self.index.user_bits(role_ids), until)
+            # Под lock: _poll применяет журнал под ним же
+            with self.lock:
+                if epoch != self.epoch:
+                    # Маски ролей пересчитали, пока пользователь загружался
+                    entry.bits = self.index.user_bits(role_ids)
+                if user_epoch != self.user_epoch:
+                    # Пока роли читались, пришел сброс пользователей: прочитанный набор
+                    # мог устареть, запись используется для этой проверки, но не кэшируется
+                    return entry
+                self.users.set(user_id, entry)
+                for role_id in role_ids:
+                    self.role_users.setdefault(role_id, set()).add(user_id)
+        return entry
+
+    def exists(self, db: Session, user_id: str, codes: Iterable[str]) -> bool:
+        """Есть ли у пользователя хотя бы один из кодов"""
+        # Журнал и роли читаются только из основной БД: движок общий для сессий реплики и
+        # основной БД, роли, перечитанные из отстающей реплики после сброса, остались бы в кэше
+        with use_primary(db):
+            self._refresh(db)
+            assert self.index is not None
+            entry = self._user_entry(db, user_id)
+        return self.index.has_any(entry.bits, self.index.mask(tuple(codes)))
+
+
+authz_engine = BitsetAuthzEngine()
@@ -0,0 +1,338 @@
+"""
+Снимок авторизационных данных в memory-mapped файле
+
+Один процесс-загрузчик (run_snapshot_loader) строит неизменяемый снимок
+"пользователь -> коды разрешений" и справочник сервисов и пересобирает его при
+изменении поколения AUTHZ_GENERATION. Все HTTP/gRPC воркеры отображают файл в
+память только для чтения (mmap), поэтому данные не копируются в каждый процесс,
+а новый воркер готов отвечать сразу после старта.
+
+Файл заменяется атомарно (os.replace), открытые отображения старого файла
+остаются валидными до перехода читателя на новый. Загрузчик обновляет mtime
+файла на каждой итерации опроса: если файл давно не обновлялся (загрузчик
+остановился), читатели перестают ему доверять и проверяют права через БД.
+
+Формат (little-endian):
+    заголовок HEADER
+    codes_index: (code_count + 1) * u32 - смещения кодов в codes_blob
+    codes_blob: коды разрешений в UTF-8, отсортированы
+    users: user_count * USER_RECORD - отсортированы по user_id
+    grants: grant_count * u32 - id кодов, отсортированы внутри пользователя
+    services: service_count * SERVICE_RECORD - отсортированы по id
+    names_blob: названия сервисов в UTF-8
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from sqlalchemy.orm import Session
+
+from app.models.permission import Permission
+from app.models.service import Service
+from app.models.user_roles import UserRole
+from app.repositories.authz_version_repository import AuthzVersionRepository
+from app.repositories.effective_permission_repository import role_grants
+
+MAGIC = b"AZSNAP01"
+HEADER = struct.Struct("<8sQIIIIQQQQQQ")
+USER_RECORD = struct.Struct("<36sII")
+SERVICE_RECORD = struct.Struct("<36sII")
+U32 = struct.Struct("<I")
+
+SNAPSHOT_PATH = os.getenv("AUTHZ_SNAPSHOT_PATH")
+# Как часто загрузчик опрашивает поколение, а читатели проверяют файл (секунды)
+SNAPSHOT_POLL_INTERVAL = float(os.getenv("AUTHZ_SNAPSHOT_POLL_INTERVAL", "1"))
+# Снимок, не обновлявшийся дольше этого времени, не используется (секунды)
+SNAPSHOT_MAX_AGE = float(os.getenv("AUTHZ_SNAPSHOT_MAX_AGE", "10"))
+
+
+def _id_bytes(value: str) -> bytes:
+    return value.encode("ascii").ljust(36, b"\0")
+
+
+class AuthzSnapshot:
+    """Читатель снимка. Потокобезопасен: после открытия данные не меняются"""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        (
+            magic,
+            self.generation,
+            self._code_count,
+            self._user_count,
+            self._grant_count,
+            self._service_count,
+            self._codes_index_off,
+            self._codes_blob_off,
+            self._users_off,
+            self._grants_off,
+            self._services_off,
+            self._names_off,
+        ) = HEADER.unpack_from(self._view, 0)
+
+        if magic != MAGIC:
+            raise ValueError(f"Invalid authz snapshot file: {path}")
+
+    def _code(self, index: int) -> bytes:
+        start, end = struct.unpack_from("<II", self._view, self._codes_index_off + index * 4)
+        return bytes(self._view[self._codes_blob_off + start : self._codes_blob_off + end])
+
+    def _code_id(self, code: str) -> int | None:
+        target = code.encode()
+        lo, hi = 0, self._code_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._code(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._code_count and self._code(lo) == target:
+            return lo
+        return None
+
+    def _find_record(self, offset: int, count: int, record: struct.Struct, key: bytes):
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = offset + mid * record.size
+            if bytes(self._view[pos : pos + 36]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < count:
+            values = record.unpack_from(self._view, offset + lo * record.size)
+            if values[0] == key:
+                return values
+        return None
+
+    def _user_grants(self, user_id: str) -> memoryview:
+        found = self._find_record(
+            self._users_off, self._user_count, USER_RECORD, _id_bytes(user_id)
+        )
+        if found is None:
+            return self._view[0:0].cast("I")
+        _, start, count = found
+        begin = self._grants_off + start * U32.size
+        return self._view[begin : begin + count * U32.size].cast("I")
+
+    def has_any_code(self, user_id: str, codes: Iterable[str]) -> bool:
+        """Есть ли у пользователя хотя бы один из кодов разрешений"""
+        grants = self._user_grants(user_id)
+        if not grants:
+            return False
+
+        for code in codes:
+            code_id = self._code_id(code)
+            if code_id is None:
+                continue
+            pos = bisect_left(grants, code_id)
+            if pos < len(grants) and grants[pos] == code_id:
+                return True
+        return False
+
+    def codes_for_user(self, user_id: str) -> list[str]:
+        return [self._code(code_id).decode() for code_id in self._user_grants(user_id)]
+
+    def service_name(self, service_id: str) -> str | None:
+        found = self._find_record(
+            self._services_off, self._service_count, SERVICE_RECORD, _id_bytes(service_id)
+        )
+        if found is None:
+            return None
+        _, start, length = found
+        return bytes(
+            self._view[self._names_off + start : self._names_off + start + length]
+        ).decode()
+
+
+def build_snapshot(db: Session, path: str) -> int:
+    """
+    Строит снимок из БД и атомарно заменяет файл path.
+
+    Поколение читается до данных: если данные изменятся во время сборки,
+    поколение в БД окажется больше записанного и загрузчик пересоберет снимок.
+
+    Returns:
+        Поколение, для которого построен снимок
+    """
+    generation = AuthzVersionRepository(db).get()
+
+    grants = role_grants()
+    grant_rows = (
+        db.query(UserRole.user_id, Permission.code)
+        .join(grants, grants.c.role_id == UserRole.role_id)
+        .join(Permission, Permission.id == grants.c.permission_id)
+        .filter(Permission.code.isnot(None), UserRole.active())
+        .distinct()
+        .all()
+    )
+    services = sorted(
+        (str(service_id), name or "") for service_id, name in db.query(Service.id, Service.name)
+    )
+
+    codes = sorted({code.encode() for _, code in grant_rows})
+    code_ids = {code: i for i, code in enumerate(codes)}
+
+    user_grants: dict[str, list[int]] = {}
+    for user_id, code in grant_rows:
+        user_grants.setdefault(str(user_id), []).append(code_ids[code.encode()])
+
+    codes_index = bytearray()
+    offset = 0
+    for code in codes:
+        codes_index += U32.pack(offset)
+        offset += len(code)
+    codes_index += U32.pack(offset)
+    codes_blob = b"".join(codes)
+
+    users = bytearray()
+    grants = bytearray()
+    grant_count = 0
+    for user_id in sorted(user_grants):
+        ids = sorted(user_grants[user_id])
+        users += USER_RECORD.pack(_id_bytes(user_id), grant_count, len(ids))
+        grants += struct.pack(f"<{len(ids)}I", *ids)
+        grant_count += len(ids)
+
+    services_section = bytearray()
+    names_blob = bytearray()
+    for service_id, name in services:
+        encoded = name.encode()
+        services_section += SERVICE_RECORD.pack(
+            _id_bytes(service_id), len(names_blob), len(encoded)
+        )
+        names_blob += encoded
+
+    codes_index_off = HEADER.size
+    codes_blob_off = codes_index_off + len(codes_index)
+    users_off = codes_blob_off + len(codes_blob)
+    # Выравниваем u32-массивы по 4 байта, чтобы читатель мог использовать memoryview.cast
+    users_off += -users_off % 4
+    grants_off = users_off + len(users)
+    services_off = grants_off + len(grants)
+    names_off = services_off + len(services_section)
+
+    header = HEADER.pack(
+        MAGIC,
+        generation,
+        len(codes),
+        len(user_grants),
+        grant_count,
+        len(services),
+        codes_index_off,
+        codes_blob_off,
+        users_off,
+        grants_off,
+        services_off,
+        names_off,
+    )
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(codes_index)
+        f.write(codes_blob)
+        f.write(b"\0" * (users_off - codes_blob_off - len(codes_blob)))
+        f.write(users)
+        f.write(grants)
+        f.write(services_section)
+        f.write(names_blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    return generation
+
+
+def run_snapshot_loader(path: str, heartbeat=None) -> None:
+    """
+    Цикл процесса-загрузчика: пересобирает снимок при смене поколения.
+
+    Args:
+        path: Путь к файлу снимка
+        heartbeat: Необязательное разделяемое значение для супервизора cmd.serve
+    """
+    from app.database import SessionLocal
+
+    current = None
+    while True:
+        db = SessionLocal()
+        try:
+            generation = AuthzVersionRepository(db).get()
+            if generation != current or not os.path.exists(path):
+                started = time.time()
+                current = build_snapshot(db, path)
+                print(
+                    f"✅ Authz snapshot generation {current} built in {time.time() - started:.2f}s"
+                )
+            else:
+                # Отмечаем, что загрузчик жив и снимок актуален
+                os.utime(path)
+        except Exception as e:
+            print(f"Error in authz snapshot loader: {e}")
+        finally:
+            db.close()
+
+        if heartbeat is not None:
+            heartbeat.value = time.time()
+        time.sleep(SNAPSHOT_POLL_INTERVAL)
+
+
+class _SnapshotHolder:
+    """Текущий снимок процесса с ленивой перепроверкой файла"""
+
+    def __init__(self) -> None:
+        self.snapshot: AuthzSnapshot | None = None
+        self.file_id: tuple[int, int] | None = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self) -> AuthzSnapshot | None:
+        if not SNAPSHOT_PATH:
+            return None
+
+        now = time.time()
+        if now - self.checked_at < SNAPSHOT_POLL_INTERVAL:
+            return self.snapshot
+
+        with self.lock:
+            if now - self.checked_at < SNAPSHOT_POLL_INTERVAL:
+                return self.snapshot
+
+            try:
+                stat = os.stat(SNAPSHOT_PATH)
+                if now - stat.st_mtime > SNAPSHOT_MAX_AGE:
+                    self.snapshot, self.file_id = None, None
+                elif (stat.st_ino, stat.st_dev) != self.file_id:
+                    # Старое отображение закроется сборщиком мусора, когда
+                    # завершатся читающие его потоки
+                    self.snapshot = AuthzSnapshot(SNAPSHOT_PATH)
+                    self.file_id = (stat.st_ino, stat.st_dev)
+            except (OSError, ValueError) as e:
+                print(f"Error loading authz snapshot: {e}")
+                self.snapshot, self.file_id = None, None
+
+            self.checked_at = now
+            return self.snapshot
+
+
+_holder = _SnapshotHolder()
+
+
+def get_authz_snapshot() -> AuthzSnapshot | None:
+    """
+    Возвращает актуальный снимок текущего процесса или None.
+
+    None означает, что снимок выключен (AUTHZ_SNAPSHOT_PATH не задан), еще не
+    построен или устарел - в этом случае проверка выполняется через БД.
+    Файл перепроверяется не чаще SNAPSHOT_POLL_INTERVAL.
+    """
+    return _holder.get()
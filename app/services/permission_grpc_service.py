@@ -1,12 +1,30 @@
+import time
+from collections.abc import Iterator
+
 import grpc
 
-from app.database import get_db
+from app.database import DeadlineExceeded, get_read_db, set_deadline
 from app.repositories.permission_repository import PermissionRepository
 from app.repositories.session_repository import SessionRepository
-from generated.permission_pb2 import PermissionRequest, PermissionResponse
+from app.services.audit_log import audit_log
+from app.services.revocation_hub import SESSION_WATCH_HEARTBEAT, revocation_hub
+from generated.permission_pb2 import (
+    PermissionRequest,
+    PermissionResponse,
+    RevocationEvent,
+    WatchRevocationsRequest,
+)
 from generated.permission_pb2_grpc import PermissionServiceServicer
 
 
+def _source(context: grpc.ServicerContext) -> str:
+    """Вызывающий сервис из метаданных x-source-service, иначе адрес клиента"""
+    for key, value in context.invocation_metadata() or ():
+        if key == "x-source-service":
+            return f"grpc:{value}"
+    return f"grpc:{context.peer()}"
+
+
 class PermissionGrpcService(PermissionServiceServicer):
     def ValidatePermission(
         self, request: PermissionRequest, context: grpc.ServicerContext
@@ -21,9 +39,28 @@ class PermissionGrpcService(PermissionServiceServicer):
         Returns:
             PermissionResponse с полями is_access, message, code
         """
+        started = time.perf_counter()
+        response = self._validate(request, context)
+
+        if audit_log.enabled:
+            audit_log.record(
+                response.user_id or None,
+                f"{request.service}:{request.entity}:{request.action}",
+                response.code,
+                _source(context),
+                started,
+            )
+
+        return response
+
+    def _validate(
+        self, request: PermissionRequest, context: grpc.ServicerContext
+    ) -> PermissionResponse:
         db = None
         try:
-            db = next(get_db())  # pyright: ignore[reportArgumentType]
+            db = next(get_read_db())  # pyright: ignore[reportArgumentType]
+            # Запросы к БД не переживают дедлайн клиента
+            set_deadline(db, context.time_remaining())
 
             perm_repo = PermissionRepository(db)
             session_repo = SessionRepository(db)
@@ -69,6 +106,12 @@ class PermissionGrpcService(PermissionServiceServicer):
                 user_id=str(session.user_id),
             )
 
+        except DeadlineExceeded:
+            context.set_code(grpc.StatusCode.DEADLINE_EXCEEDED)
+            context.set_details("Deadline exceeded")
+
+            return PermissionResponse(is_access=False, message="Превышено время ожидания", code=504)
+
         except StopIteration:
             # Не удалось получить сессию БД
             context.set_code(grpc.StatusCode.INTERNAL)
@@ -93,3 +136,28 @@ class PermissionGrpcService(PermissionServiceServicer):
             # ✅ Закрываем соединение с БД
             if db is not None:
                 db.close()
+
+    def WatchRevocations(
+        self, request: WatchRevocationsRequest, context: grpc.ServicerContext
+    ) -> Iterator[RevocationEvent]:
+        """
+        Поток отзывов сессий (app/services/revocation_hub.py)
+
+        Первое событие - reset. Пока отзывов нет, раз в SESSION_WATCH_HEARTBEAT
+        отправляется пустое событие: так обнаруживается отключившийся подписчик.
+        """
+        subscription = revocation_hub.subscribe()
+        context.add_callback(subscription.close)
+        try:
+            while True:
+                batch = subscription.get(SESSION_WATCH_HEARTBEAT)
+                if subscription.closed or not context.is_active():
+                    return
+                if batch is None:
+                    yield RevocationEvent()
+                    continue
+                yield RevocationEvent(
+                    token_hashes=batch.token_hashes, user_ids=batch.user_ids, reset=batch.reset
+                )
+        finally:
+            revocation_hub.unsubscribe(subscription)
@@ -1,10 +1,23 @@
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
+from app.models.authz_version import PERMISSIONS_TABLE, SERVICES_TABLE
 from app.models.permission import Permission, PermissionCreate, PermissionResponse
 from app.repositories.permission_repository import PermissionRepository
+from app.utils.cache_utils import (
+    LIST_RESPONSE_CACHE_MAX_BYTES,
+    LIST_RESPONSE_CACHE_SIZE,
+    USER_RESPONSE_CACHE_SIZE,
+    ResponseCache,
+)
 from app.utils.pagination_utils import PageResponse
 
+_permissions_adapter = TypeAdapter(list[PermissionResponse])
+_page_adapter = TypeAdapter(PageResponse[PermissionResponse])
+_user_permissions_cache = ResponseCache("user_permissions", USER_RESPONSE_CACHE_SIZE)
+_list_cache = ResponseCache("permissions", LIST_RESPONSE_CACHE_SIZE, LIST_RESPONSE_CACHE_MAX_BYTES)
+
 
 class PermissionService:
     def __init__(self, db: Session):
@@ -21,6 +34,14 @@ class PermissionService:
             pages=page_data.pages,
         )
 
+    def get_all_response(self, page: int = 1, limit: int = 10) -> Response:
+        """Страница разрешений из кэша ответов, пока не менялись разрешения и сервисы"""
+        return _list_cache.respond(
+            ("permissions", page, limit),
+            self.repo.versions.get_many(PERMISSIONS_TABLE, SERVICES_TABLE),
+            lambda: _page_adapter.dump_json(self.get_all(page, limit), by_alias=True),
+        )
+
     def get_by_id(self, id: str) -> Permission | None:
         permission = self.repo.get_by_id(id)
         return permission
@@ -41,6 +62,20 @@ class PermissionService:
         permissions = self.repo.get_by_user_id_and_service_id(user_id, service_id)
         return [PermissionResponse.model_validate(perm) for perm in permissions]
 
+    def get_by_user_id_and_service_id_response(
+        self, user_id: str, service_id: str, if_none_match: str | None = None
+    ) -> Response:
+        """Разрешения пользователя в сервисе с ETag по версии его назначений и ролей"""
+        return _user_permissions_cache.respond(
+            ("user_permissions", user_id, service_id),
+            # Имя сервиса входит в ответ и в отбор wildcard разрешений
+            (self.repo.versions.get(SERVICES_TABLE), *self.repo.versions.user_version(user_id)),
+            lambda: _permissions_adapter.dump_json(
+                self.get_by_user_id_and_service_id(user_id, service_id)
+            ),
+            if_none_match,
+        )
+
     def create(self, permission_data: PermissionCreate) -> PermissionResponse:
         permission_exist = self.repo.get_by_code(permission_data.code)
         if permission_exist:
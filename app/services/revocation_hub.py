@@ -0,0 +1,198 @@
+"""
+Рассылка отзывов сессий подписчикам WatchRevocations
+
+Отзывы (выход, завершение всех сессий пользователя, удаление пользователя)
+пишутся в revoked_sessions процессами HTTP, а потоки WatchRevocations
+обслуживают процессы gRPC. Пока у процесса есть подписчики, один поток
+дочитывает журнал по revoked_at раз в SESSION_WATCH_POLL_INTERVAL и
+рассылает новые отзывы всем подписчикам одним событием. Без подписчиков
+журнал не читается. Отзывы этого же процесса (publish) рассылаются сразу.
+
+Окно чтения перекрывается (revoked_at - время фиксации с точностью до
+секунды), уже разосланные сессии запоминаются и повторно не отправляются.
+
+Первое событие потока - reset: отзывы до подписки (или во время разрыва)
+подписчик не получал и должен сбросить кэш целиком. Так же поступает
+подписчик, который не успевает читать события: очередь переполняется и
+следующим событием он получает reset.
+"""
+
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+
+from app.models.session import SessionDB
+from app.utils import metrics
+
+# Как часто дочитывать журнал отзывов при наличии подписчиков (секунды)
+SESSION_WATCH_POLL_INTERVAL = float(os.getenv("SESSION_WATCH_POLL_INTERVAL", "0.1"))
+# Интервал пустых событий потока, пока отзывов нет (секунды)
+SESSION_WATCH_HEARTBEAT = float(os.getenv("SESSION_WATCH_HEARTBEAT", "15"))
+# Максимум неотправленных событий подписчика, дальше - reset
+SESSION_WATCH_QUEUE_SIZE = int(os.getenv("SESSION_WATCH_QUEUE_SIZE", "1000"))
+# Перекрытие окна чтения: транзакция может зафиксироваться позже своей метки времени
+WATCH_OVERLAP = timedelta(seconds=10)
+
+
+class RevocationBatch:
+    __slots__ = ("token_hashes", "user_ids", "reset")
+
+    def __init__(self, token_hashes: list[str], user_ids: list[str], reset: bool = False) -> None:
+        self.token_hashes = token_hashes
+        self.user_ids = user_ids
+        self.reset = reset
+
+
+class Subscription:
+    def __init__(self, maxsize: int) -> None:
+        self.events: queue.Queue[RevocationBatch] = queue.Queue(maxsize)
+        self.overflow = False
+        self.closed = False
+
+    def put(self, batch: RevocationBatch) -> None:
+        try:
+            self.events.put_nowait(batch)
+        except queue.Full:
+            self.overflow = True
+
+    def close(self) -> None:
+        """Поток завершен (клиент отключился): будит ожидающий get"""
+        self.closed = True
+        self.put(RevocationBatch([], []))
+
+    def get(self, timeout: float) -> RevocationBatch | None:
+        """Следующее событие или None, если за timeout событий не было"""
+        if self.overflow:
+            # Пропущенные события заменяет сброс кэша подписчика
+            self.overflow = False
+            while not self.events.empty():
+                self.events.get_nowait()
+            return RevocationBatch([], [], reset=True)
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class RevocationHub:
+    def __init__(self) -> None:
+        self.subscribers: set[Subscription] = set()
+        # session_id -> revoked_at уже разосланных отзывов в окне перекрытия
+        self.seen: dict[str, datetime] = {}
+        self.cursor: datetime | None = None
+        self.loaded = False
+        self.published = 0
+        self.polls = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._thread: threading.Thread | None = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "polls": self.polls,
+            "failed": self.failed,
+        }
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(SESSION_WATCH_QUEUE_SIZE)
+        subscription.put(RevocationBatch([], [], reset=True))
+        with self._cond:
+            self.subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="revocation-hub", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self.subscribers.discard(subscription)
+            if not self.subscribers:
+                # Следующий подписчик начнет с reset, накопившееся без подписчиков не нужно
+                self.loaded = False
+
+    def publish(self, sessions: list[SessionDB]) -> None:
+        """Рассылает отзывы этого процесса сразу, вызывать после commit"""
+        if not self.subscribers:
+            return
+        now = datetime.utcnow()
+        self._dispatch([(str(s.id), str(s.token_hash), str(s.user_id), now) for s in sessions])
+
+    def _dispatch(self, rows: list[tuple[str, str | None, str | None, datetime]]) -> None:
+        with self._lock:
+            token_hashes: list[str] = []
+            user_ids: set[str] = set()
+            for session_id, token_hash, user_id, revoked_at in rows:
+                known = session_id in self.seen
+                self.seen[session_id] = revoked_at
+                if known:
+                    continue
+                if token_hash:
+                    token_hashes.append(token_hash)
+                if user_id:
+                    user_ids.add(user_id)
+            if not token_hashes and not user_ids:
+                return
+
+            batch = RevocationBatch(token_hashes, sorted(user_ids))
+            for subscription in self.subscribers:
+                subscription.put(batch)
+            self.published += len(token_hashes)
+
+    def _poll(self) -> None:
+        from app.database import SessionLocal
+        from app.repositories.session_repository import SessionRepository
+
+        db = SessionLocal()
+        try:
+            since = self.cursor - WATCH_OVERLAP if self.cursor is not None else None
+            rows = SessionRepository(db).revocation_events(since)
+        finally:
+            db.close()
+
+        fresh = rows
+        if not self.loaded:
+            # Старые отзывы не рассылаются: подписчик начинает с reset. Последние
+            # (окно перекрытия) рассылаются - они могли прийти уже после reset
+            recent = datetime.utcnow() - WATCH_OVERLAP
+            with self._lock:
+                self.seen.update((row[0], row[3]) for row in rows if row[3] < recent)
+            fresh = [row for row in rows if row[3] >= recent]
+            self.loaded = True
+        self._dispatch(fresh)
+
+        for row in rows:
+            if self.cursor is None or row[3] > self.cursor:
+                self.cursor = row[3]
+        if self.cursor is not None:
+            horizon = self.cursor - WATCH_OVERLAP
+            with self._lock:
+                self.seen = {
+                    session_id: revoked_at
+                    for session_id, revoked_at in self.seen.items()
+                    if revoked_at >= horizon
+                }
+        self.polls += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self.subscribers:
+                    self._cond.wait()
+            try:
+                self._poll()
+            except Exception as e:
+                self.failed += 1
+                print(f"Error polling session revocations: {e}")
+            with self._cond:
+                self._cond.wait(SESSION_WATCH_POLL_INTERVAL)
+
+
+revocation_hub = RevocationHub()
+metrics.register("revocation_hub", revocation_hub.stats)
@@ -0,0 +1,150 @@
+"""
+Начало и истечение временных назначений ролей (user_roles.valid_from/valid_until)
+
+Ближайшие события процесса лежат в min-куче по времени. Поток спит до
+ближайшего события, таблица не опрашивается. Куча заполняется одним запросом
+при старте (start) и пополняется при назначении ролей в этом процессе
+(schedule). Упавший процесс супервизор перезапускает, и при старте события
+загружаются заново. В момент события:
+
+- истечение: строка user_roles удаляется, итоговые разрешения пересчитываются;
+- начало: итоговые разрешения пользователя дополняются ролью.
+
+В обоих случаях версия ROLES_TABLE и журнал authz_changes (user:<id>)
+сбрасывают кэши всех процессов. Одно событие может обработать несколько
+процессов. Обработка сверяется со строкой в БД (срок истек, назначение
+действует), поэтому повтор и устаревшее событие ничего не меняют.
+
+Счетчики доступны в /api/as/metrics (role_expiry).
+"""
+
+import heapq
+import itertools
+import os
+import threading
+from datetime import datetime, timedelta
+
+from app.utils import metrics
+
+# Запускать планировщик в HTTP процессах (назначения ролей меняются только через HTTP)
+ROLE_EXPIRY_SCHEDULER = os.getenv("ROLE_EXPIRY_SCHEDULER", "true").lower() == "true"
+# Через сколько секунд повторить событие, обработка которого завершилась ошибкой
+ROLE_EXPIRY_RETRY_DELAY = float(os.getenv("ROLE_EXPIRY_RETRY_DELAY", "5"))
+
+ACTIVATE = "activate"
+EXPIRE = "expire"
+
+
+class RoleExpiryScheduler:
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        # (время UTC, порядковый номер, событие, user_id, role_id)
+        self.heap: list[tuple[datetime, int, str, str, str]] = []
+        self.activated = 0
+        self.expired = 0
+        self.stale = 0
+        self.failed = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "scheduled": len(self.heap),
+            "activated": self.activated,
+            "expired": self.expired,
+            "stale": self.stale,
+            "failed": self.failed,
+        }
+
+    def start(self) -> None:
+        """Загружает предстоящие события из БД и запускает поток"""
+        if not self.enabled:
+            return
+
+        from app.database import SessionLocal
+        from app.repositories.user_repository import UserRepository
+
+        db = SessionLocal()
+        try:
+            changes = UserRepository(db).scheduled_role_changes()
+        except Exception as e:
+            print(f"Error loading role assignment schedule: {e}")
+            return
+        finally:
+            db.close()
+
+        for user_id, role_id, valid_from, valid_until in changes:
+            self.schedule(user_id, role_id, valid_from, valid_until)
+        print(f"⏱️ Role expiry scheduler started: {len(self.heap)} events")
+
+    def schedule(
+        self,
+        user_id: str,
+        role_id: str,
+        valid_from: datetime | None,
+        valid_until: datetime | None,
+    ) -> None:
+        """Добавляет события назначения. Время - наивное UTC, как в user_roles"""
+        if not self.enabled:
+            return
+        now = datetime.utcnow()
+        if valid_from is not None and valid_from > now:
+            self._push(valid_from, ACTIVATE, user_id, role_id)
+        if valid_until is not None:
+            self._push(valid_until, EXPIRE, user_id, role_id)
+
+    def _push(self, when: datetime, event: str, user_id: str, role_id: str) -> None:
+        with self._cond:
+            seq = next(self._seq)
+            heapq.heappush(self.heap, (when, seq, event, user_id, role_id))
+            # Поток спит до прежнего ближайшего события - будим, если новое раньше
+            if self.heap[0][1] == seq:
+                self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="role-expiry", daemon=True)
+                self._thread.start()
+
+    def _next_due(self) -> tuple[datetime, int, str, str, str]:
+        with self._cond:
+            while True:
+                if not self.heap:
+                    self._cond.wait()
+                    continue
+                delay = (self.heap[0][0] - datetime.utcnow()).total_seconds()
+                if delay <= 0:
+                    return heapq.heappop(self.heap)
+                self._cond.wait(delay)
+
+    def _run(self) -> None:
+        while True:
+            _, _, event, user_id, role_id = self._next_due()
+            try:
+                self._fire(event, user_id, role_id)
+            except Exception as e:
+                self.failed += 1
+                print(f"Error processing role {event} for user {user_id}: {e}")
+                retry_at = datetime.utcnow() + timedelta(seconds=ROLE_EXPIRY_RETRY_DELAY)
+                self._push(retry_at, event, user_id, role_id)
+
+    def _fire(self, event: str, user_id: str, role_id: str) -> None:
+        from app.database import SessionLocal
+        from app.repositories.user_repository import UserRepository
+
+        db = SessionLocal()
+        try:
+            repo = UserRepository(db)
+            if event == EXPIRE:
+                changed = repo.role_expired(user_id, role_id)
+                self.expired += changed
+            else:
+                changed = repo.role_activated(user_id, role_id)
+                self.activated += changed
+            # Назначение сняли, продлили или событие уже обработал другой процесс
+            self.stale += not changed
+        finally:
+            db.close()
+
+
+role_expiry = RoleExpiryScheduler(ROLE_EXPIRY_SCHEDULER)
+metrics.register("role_expiry", role_expiry.stats)
@@ -1,12 +1,30 @@
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 from app.models import RoleResponse
-from app.models.role import RoleAddPermission, RoleCreate
+from app.models.authz_version import ROLES_TABLE
+from app.models.role import (
+    BulkAssignResult,
+    RoleAddParent,
+    RoleAddPermission,
+    RoleBulkPermissions,
+    RoleCreate,
+)
 from app.repositories.permission_repository import PermissionRepository
+from app.repositories.role_hierarchy_repository import ROLE_INHERITANCE_ENABLED
 from app.repositories.role_repository import RoleRepository
+from app.utils.bulk_utils import plan_bulk_update
+from app.utils.cache_utils import (
+    LIST_RESPONSE_CACHE_MAX_BYTES,
+    LIST_RESPONSE_CACHE_SIZE,
+    ResponseCache,
+)
 from app.utils.pagination_utils import PageResponse
 
+_page_adapter = TypeAdapter(PageResponse[RoleResponse])
+_list_cache = ResponseCache("roles", LIST_RESPONSE_CACHE_SIZE, LIST_RESPONSE_CACHE_MAX_BYTES)
+
 
 class RoleService:
     def __init__(self, db: Session) -> None:
@@ -87,6 +105,23 @@ class RoleService:
             pages=page_data.pages,
         )
 
+    def get_all_response(self, page: int, limit: int) -> Response:
+        """Страница ролей из кэша ответов, пока не менялись роли и их назначения"""
+        return _list_cache.respond(
+            ("roles", page, limit),
+            self.repo.versions.get_many(ROLES_TABLE),
+            lambda: _page_adapter.dump_json(self.get_all(page, limit), by_alias=True),
+        )
+
+    def get_all_by_service_id_response(self, service_id: str, page: int, limit: int) -> Response:
+        return _list_cache.respond(
+            ("roles_by_service", service_id, page, limit),
+            self.repo.versions.get_many(ROLES_TABLE),
+            lambda: _page_adapter.dump_json(
+                self.get_all_by_service_id(service_id, page, limit), by_alias=True
+            ),
+        )
+
     def permission_add(self, permission_add_data: RoleAddPermission):
         role = self.repo.get_by_id(permission_add_data.role_id)
         if not role:
@@ -96,11 +131,25 @@ class RoleService:
         if not perm:
             raise HTTPException(status_code=404, detail="Роль не найдена")
 
-        if perm in role.permissions:
+        if not self.repo.permission_add(str(role.id), str(perm.id)):
             raise HTTPException(status_code=400, detail="Роль уже имеет это разрешение")
 
-        role = self.repo.permission_add(role, perm)
-        return RoleResponse.model_validate(role)
+        return RoleResponse.model_validate(self.repo.get_without_permissions(str(role.id)))
+
+    def permissions_bulk(self, bulk_data: RoleBulkPermissions) -> BulkAssignResult:
+        role = self.repo.get_by_id(bulk_data.role_id)
+        if not role:
+            raise HTTPException(status_code=404, detail="Роль не найдена")
+
+        role_id = str(role.id)
+        to_add, to_remove, result = plan_bulk_update(
+            bulk_data.add,
+            bulk_data.remove,
+            self.perm_repo.existing_ids,
+            lambda perm_ids: self.repo.permission_ids(role_id, perm_ids),
+        )
+        self.repo.permissions_bulk_update(role_id, to_add, to_remove)
+        return result
 
     def permission_remove(self, permission_add_data: RoleAddPermission):
         role = self.repo.get_by_id(permission_add_data.role_id)
@@ -111,11 +160,47 @@ class RoleService:
         if not perm:
             raise HTTPException(status_code=404, detail="Разрешение не найдено")
 
-        if perm not in role.permissions:
+        if not self.repo.permission_remove(str(role.id), str(perm.id)):
             raise HTTPException(status_code=400, detail="Роль не имеет это разрешение")
 
-        role = self.repo.permission_remove(role, perm)
-        return RoleResponse.model_validate(role)
+        return RoleResponse.model_validate(self.repo.get_without_permissions(str(role.id)))
+
+    def _check_parent_data(self, parent_data: RoleAddParent) -> None:
+        if not ROLE_INHERITANCE_ENABLED:
+            raise HTTPException(status_code=400, detail="Наследование ролей выключено")
+        if not self.repo.get_by_id(parent_data.role_id):
+            raise HTTPException(status_code=404, detail="Роль не найдена")
+        if not self.repo.get_by_id(parent_data.parent_id):
+            raise HTTPException(status_code=404, detail="Родительская роль не найдена")
+
+    def parent_add(self, parent_data: RoleAddParent) -> list[RoleResponse]:
+        """Роль начинает наследовать разрешения родительской роли"""
+        self._check_parent_data(parent_data)
+
+        self.repo.hierarchy.lock()
+        if self.repo.hierarchy.would_cycle(parent_data.role_id, parent_data.parent_id):
+            raise HTTPException(status_code=400, detail="Наследование ролей образует цикл")
+
+        if not self.repo.parent_add(parent_data.role_id, parent_data.parent_id):
+            raise HTTPException(status_code=400, detail="Роль уже наследует эту роль")
+
+        return self.get_parents(parent_data.role_id)
+
+    def parent_remove(self, parent_data: RoleAddParent) -> list[RoleResponse]:
+        self._check_parent_data(parent_data)
+
+        self.repo.hierarchy.lock()
+        if not self.repo.parent_remove(parent_data.role_id, parent_data.parent_id):
+            raise HTTPException(status_code=400, detail="Роль не наследует эту роль")
+
+        return self.get_parents(parent_data.role_id)
+
+    def get_parents(self, role_id: str) -> list[RoleResponse]:
+        """Роли, от которых роль напрямую наследует разрешения"""
+        if not self.repo.get_by_id(role_id):
+            raise HTTPException(status_code=404, detail="Роль не найдена")
+        parents = self.repo.hierarchy.get_parents(role_id)
+        return [RoleResponse.model_validate(role) for role in parents]
 
     def create(self, role_data):
         """Создает новую роль"""
@@ -131,6 +216,8 @@ class RoleService:
 
     def delete(self, role_id: str):
         """Удаляет роль по ID"""
+        # Удаление пересчитывает замыкание наследников, как и изменение связей
+        self.repo.hierarchy.lock()
         role = self.repo.delete(role_id)
         if not role:
             raise HTTPException(status_code=404, detail="Роль не найдена")
@@ -1,11 +1,41 @@
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+from pydantic_core import to_json
 from sqlalchemy.orm import Session
 
 from app.models import ServiceCreate, ServiceResponse
+from app.models.authz_version import PERMISSIONS_TABLE, SERVICES_TABLE
 from app.models.service import ServiceAccessResponse
 from app.repositories.service_repository import ServiceRepository
+from app.utils import metrics
+from app.utils.cache_utils import (
+    LIST_RESPONSE_CACHE_MAX_BYTES,
+    LIST_RESPONSE_CACHE_SIZE,
+    USER_RESPONSE_CACHE_SIZE,
+    LRUCache,
+    ResponseCache,
+)
 from app.utils.pagination_utils import PageResponse
 
+_accessible_adapter = TypeAdapter(list[ServiceAccessResponse])
+_page_adapter = TypeAdapter(PageResponse[ServiceResponse])
+_accessible_cache = ResponseCache("accessible_services", USER_RESPONSE_CACHE_SIZE)
+_list_cache = ResponseCache("services", LIST_RESPONSE_CACHE_SIZE, LIST_RESPONSE_CACHE_MAX_BYTES)
+# Справочник сервисов по версии таблицы services: общий для всех пользователей
+_catalog_cache: LRUCache[int, list[ServiceAccessResponse]] = LRUCache(2)
+# Доступные сервисы пользователя по версии его ролей: (все сервисы, id сервисов)
+_user_services_cache: LRUCache[tuple[str, tuple], tuple[bool, frozenset[str]]] = LRUCache(
+    USER_RESPONSE_CACHE_SIZE
+)
+metrics.register(
+    "accessible_services.users",
+    lambda: {
+        "hits": _user_services_cache.hits,
+        "misses": _user_services_cache.misses,
+        "entries": len(_user_services_cache),
+    },
+)
+
 
 class ServiceService:
     def __init__(self, db: Session) -> None:
@@ -22,6 +52,17 @@ class ServiceService:
             pages=page_data.pages,
         )
 
+    def get_all_response(self, page: int = 1, limit: int = 10) -> Response:
+        """Страница сервисов из кэша ответов, пока не менялись сервисы и разрешения"""
+        return _list_cache.respond(
+            ("services", page, limit),
+            self.repo.versions.get_many(SERVICES_TABLE, PERMISSIONS_TABLE),
+            # Через dict: поле service_name с alias "name" дублирует ключ name
+            lambda: to_json(
+                _page_adapter.dump_python(self.get_all(page, limit), mode="json", by_alias=True)
+            ),
+        )
+
     def create(self, service_date: ServiceCreate) -> ServiceResponse:
         service = self.repo.create(service_date)
         return ServiceResponse.model_validate(service)
@@ -32,6 +73,51 @@ class ServiceService:
             raise HTTPException(status_code=404, detail="Сервис не найден")
         return ServiceResponse.model_validate(service)
 
-    def get_services_by_user_roles(self, user_id: str):
-        services = self.repo.get_services_by_user_roles(user_id)
-        return [ServiceAccessResponse.model_validate(service) for service in services]
+    def get_services_by_user_roles(
+        self, user_id: str, versions: tuple[int, tuple] | None = None
+    ) -> list[ServiceAccessResponse]:
+        """
+        Доступные пользователю сервисы.
+
+        Множество id сервисов пользователя кэшируется до изменения его ролей или
+        назначений (AuthzVersionRepository.user_version), сами сервисы берутся из
+        справочника в памяти.
+
+        Args:
+            versions: Версии (SERVICES_TABLE, версия пользователя), если уже прочитаны
+        """
+        services_version, roles_version = versions or self._versions(user_id)
+
+        access = _user_services_cache.get((user_id, roles_version))
+        if access is None:
+            access = self.repo.accessible_service_ids(user_id)
+            _user_services_cache.set((user_id, roles_version), access)
+
+        catalog = _catalog_cache.get(services_version)
+        if catalog is None:
+            catalog = [
+                ServiceAccessResponse.model_validate(service) for service in self.repo.get_catalog()
+            ]
+            _catalog_cache.set(services_version, catalog)
+
+        all_services, service_ids = access
+        if all_services:
+            return list(catalog)
+        return [service for service in catalog if service.id in service_ids]
+
+    def _versions(self, user_id: str) -> tuple[int, tuple]:
+        return self.repo.versions.get(SERVICES_TABLE), self.repo.versions.user_version(user_id)
+
+    def get_services_by_user_roles_response(
+        self, user_id: str, if_none_match: str | None = None
+    ) -> Response:
+        """Доступные пользователю сервисы с ETag по версиям сервисов и ролей пользователя"""
+        versions = self._versions(user_id)
+        return _accessible_cache.respond(
+            ("accessible_services", user_id),
+            versions,
+            lambda: _accessible_adapter.dump_json(
+                self.get_services_by_user_roles(user_id, versions)
+            ),
+            if_none_match,
+        )
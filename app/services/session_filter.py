@@ -0,0 +1,192 @@
+"""
+Отсев недействительных непрозрачных токенов сессий до запроса к хранилищу сессий
+
+Отрицательный кэш: хэши токенов, для которых сессия не нашлась. Токены
+случайные, поэтому ненайденный хэш не станет действительным позже, TTL
+нужен только для ограничения памяти вместе с размером LRU.
+
+Фильтр Блума (SESSION_BLOOM_FILTER=true, только для SESSION_STORE=sql): хэши
+всех живых сессий. Строится целиком раз в SESSION_BLOOM_REBUILD_INTERVAL, новые сессии процесса
+добавляются при входе. Сессии других процессов дочитываются по expires_at
+(новая сессия истекает через SESSION_TTL после входа - позже любой уже
+прочитанной, в том числе продленной, с точностью до задержки фиксации): при
+промахе фильтра запрос ждет синхронизацию, начатую после его прихода, и
+только потом отклоняет токен. Одновременные промахи ждут одну синхронизацию,
+поэтому сканирование токенов дает не больше одного запроса к БД за раз на процесс.
+"""
+
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.database import use_primary
+from app.utils import metrics
+from app.utils.cache_utils import LRUCache
+
+SESSION_NEGATIVE_CACHE_SIZE = int(os.getenv("SESSION_NEGATIVE_CACHE_SIZE", "100000"))
+# Сколько помнить ненайденный токен (секунды)
+SESSION_NEGATIVE_CACHE_TTL = float(os.getenv("SESSION_NEGATIVE_CACHE_TTL", "600"))
+SESSION_BLOOM_FILTER = os.getenv("SESSION_BLOOM_FILTER", "false").lower() == "true"
+SESSION_BLOOM_ERROR_RATE = float(os.getenv("SESSION_BLOOM_ERROR_RATE", "0.01"))
+# Как часто перестраивать фильтр целиком, выбрасывая истекшие сессии (секунды)
+SESSION_BLOOM_REBUILD_INTERVAL = float(os.getenv("SESSION_BLOOM_REBUILD_INTERVAL", "600"))
+# Перекрытие окна дочитывания: часы процессов и порядок фиксации транзакций расходятся
+SYNC_OVERLAP = timedelta(seconds=10)
+
+
+class BloomFilter:
+    """
+    Фильтр Блума по hex sha256. Хэш уже равномерный, поэтому позиции
+    получаются двойным хэшированием из его частей без дополнительных вычислений.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, token_hash: str):
+        h1 = int(token_hash[:16], 16)
+        h2 = int(token_hash[16:32], 16) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, token_hash: str) -> None:
+        for pos in self._positions(token_hash):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, token_hash: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(token_hash))
+
+
+class SessionTokenFilter:
+    def __init__(self, bloom_enabled: bool) -> None:
+        self.bloom_enabled = bloom_enabled
+        self.negative: LRUCache[str, bool] = LRUCache(
+            SESSION_NEGATIVE_CACHE_SIZE, ttl=SESSION_NEGATIVE_CACHE_TTL
+        )
+        self.bloom: BloomFilter | None = None
+        self.cursor: datetime | None = None
+        self.built_at = 0.0
+        # Время начала последней завершенной синхронизации (monotonic)
+        self.synced_from = 0.0
+        self.rejected = 0
+        self.syncs = 0
+        self.rebuilds = 0
+        self.lock = threading.Lock()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "negative_hits": self.negative.hits,
+            "negative_entries": len(self.negative),
+            "bloom_rejected": self.rejected,
+            "bloom_entries": self.bloom.count if self.bloom is not None else 0,
+            "bloom_syncs": self.syncs,
+            "bloom_rebuilds": self.rebuilds,
+        }
+
+    def is_known_invalid(self, token_hash: str) -> bool:
+        return self.negative.get(token_hash) is not None
+
+    def mark_invalid(self, token_hash: str) -> None:
+        self.negative.set(token_hash, True)
+
+    def added(self, token_hash: str) -> None:
+        """Новая сессия этого процесса"""
+        bloom = self.bloom
+        if bloom is not None and token_hash not in bloom:
+            bloom.add(token_hash)
+
+    def might_exist(self, db: Session, token_hash: str) -> bool:
+        """False - сессии с таким токеном точно нет (без запроса к sessions)"""
+        if not self.bloom_enabled:
+            return True
+
+        requested = time.monotonic()
+        bloom = self.bloom
+        if (
+            bloom is None
+            or requested - self.built_at > SESSION_BLOOM_REBUILD_INTERVAL
+            or bloom.count > bloom.capacity
+        ):
+            self._rebuild(db)
+            bloom = self.bloom
+            if bloom is None:
+                return True
+
+        if token_hash in bloom:
+            return True
+
+        # Токен мог быть выдан другим процессом после последней синхронизации
+        # Фильтр мог быть перестроен во время ожидания - проверяем текущий
+        if not self._sync(db, requested) or token_hash in (self.bloom or bloom):
+            return True
+
+        self.rejected += 1
+        return False
+
+    def _rebuild(self, db: Session) -> None:
+        from app.repositories.session_store import SqlSessionStore
+
+        # Перестраивает один поток; остальные работают со старым фильтром или идут в БД
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            started = time.monotonic()
+            store = SqlSessionStore(db)
+            with use_primary(db):
+                # С запасом на входы до следующей перестройки
+                bloom = BloomFilter(store.count_live() * 2 + 10_000, SESSION_BLOOM_ERROR_RATE)
+                cursor = None
+                for token_hash, expires_at in store.live_token_hashes():
+                    bloom.add(token_hash)
+                    if cursor is None or expires_at > cursor:
+                        cursor = expires_at
+            self.bloom, self.cursor = bloom, cursor
+            self.built_at = self.synced_from = started
+            self.rebuilds += 1
+        except Exception as e:
+            print(f"Error building session bloom filter: {e}")
+        finally:
+            self.lock.release()
+
+    def _sync(self, db: Session, requested: float) -> bool:
+        """Дочитывает новые сессии. False - синхронизация не удалась, фильтру верить нельзя"""
+        from app.repositories.session_store import SqlSessionStore
+
+        with self.lock:
+            bloom = self.bloom
+            if bloom is None:
+                return False
+            if self.synced_from >= requested:
+                # Пока ждали блокировку, прошла синхронизация, начатая после запроса
+                return True
+
+            started = time.monotonic()
+            since = self.cursor - SYNC_OVERLAP if self.cursor is not None else None
+            try:
+                with use_primary(db):
+                    rows = SqlSessionStore(db).live_token_hashes(since)
+            except Exception as e:
+                print(f"Error syncing session bloom filter: {e}")
+                return False
+
+            for token_hash, expires_at in rows:
+                # Окно перекрывается: уже добавленные хэши не учитываем повторно в count
+                if token_hash not in bloom:
+                    bloom.add(token_hash)
+                if self.cursor is None or expires_at > self.cursor:
+                    self.cursor = expires_at
+            self.synced_from = started
+            self.syncs += 1
+            return True
+
+
+session_filter = SessionTokenFilter(SESSION_BLOOM_FILTER)
+metrics.register("session_filter", session_filter.stats)
@@ -0,0 +1,96 @@
+"""
+Список отозванных подписанных сессий в памяти процесса
+
+Подписанный токен проверяется без БД, поэтому отзыв (выход, принудительное
+завершение сессии, удаление пользователя) должен доходить до каждого процесса.
+Список загружается из revoked_sessions целиком при первом обращении, затем
+дочитывается по revoked_at с перекрытием окна. Записи с истекшим expires_at
+выбрасываются: такой токен отклоняется и без списка.
+
+Если список давно не удавалось обновить (например, недоступна БД), ему нельзя
+доверять - SessionRepository проверяет такие токены через таблицу sessions.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+# Как часто дочитывать отзывы из БД (секунды)
+REVOCATION_POLL_INTERVAL = float(os.getenv("SESSION_REVOCATION_POLL_INTERVAL", "1"))
+# Список, не обновлявшийся дольше этого времени, не используется (секунды)
+REVOCATION_MAX_AGE = float(os.getenv("SESSION_REVOCATION_MAX_AGE", "10"))
+# Перекрытие окна чтения: транзакция может зафиксироваться позже своей метки времени
+REVOCATION_OVERLAP = timedelta(seconds=10)
+
+
+class RevocationList:
+    def __init__(self) -> None:
+        # session_id -> expires_at (unix time)
+        self.revoked: dict[str, float] = {}
+        self.cursor: datetime | None = None
+        self.loaded = False
+        self.polled_at = 0.0
+        self.pruned_at = 0.0
+        self.lock = threading.Lock()
+
+    def _apply(self, rows: list[tuple[str, datetime, datetime]]) -> None:
+        for session_id, expires_at, revoked_at in rows:
+            self.revoked[session_id] = expires_at.replace(tzinfo=timezone.utc).timestamp()
+            if self.cursor is None or revoked_at > self.cursor:
+                self.cursor = revoked_at
+
+    def _poll(self, db: Session) -> None:
+        from app.repositories.session_repository import SessionRepository
+
+        repo = SessionRepository(db)
+        since = self.cursor - REVOCATION_OVERLAP if self.cursor is not None else None
+        self._apply(repo.revoked_since(since))
+        self.loaded = True
+
+        now = time.time()
+        self.revoked = {
+            session_id: expires_at
+            for session_id, expires_at in self.revoked.items()
+            if expires_at > now
+        }
+
+        self.polled_at = time.monotonic()
+        if self.polled_at - self.pruned_at > 3600:
+            self.pruned_at = self.polled_at
+            self._prune()
+
+    def _prune(self) -> None:
+        from app.database import SessionLocal
+        from app.repositories.session_repository import SessionRepository
+
+        # Отдельная сессия: prune делает commit, а db принадлежит запросу
+        db = SessionLocal()
+        try:
+            SessionRepository(db).prune_revoked()
+        finally:
+            db.close()
+
+    def refresh(self, db: Session) -> None:
+        if self.loaded and time.monotonic() - self.polled_at < REVOCATION_POLL_INTERVAL:
+            return
+
+        # Обновляет один поток, остальные работают с текущим списком
+        if self.lock.acquire(blocking=not self.loaded):
+            try:
+                self._poll(db)
+            except Exception as e:
+                print(f"Error refreshing session revocation list: {e}")
+            finally:
+                self.lock.release()
+
+    def is_fresh(self) -> bool:
+        return self.loaded and time.monotonic() - self.polled_at < REVOCATION_MAX_AGE
+
+    def is_revoked(self, session_id: str) -> bool:
+        return session_id in self.revoked
+
+
+revocation_list = RevocationList()
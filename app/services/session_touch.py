@@ -0,0 +1,116 @@
+"""
+Скользящий срок сессий (SESSION_SLIDING_EXPIRY=true)
+
+Успешная проверка непрозрачного токена продлевает сессию до now + SESSION_TTL.
+Продление не чаще раза в SESSION_TOUCH_INTERVAL: сессия, продленная недавно,
+истекает позже now + SESSION_TTL - SESSION_TOUCH_INTERVAL, и это видно по
+ее expires_at без дополнительного состояния (в том числе между процессами).
+
+Проверка не ждет записи: продления копятся в буфере процесса (повторные
+обращения к одной сессии схлопываются в одну запись) и раз в
+SESSION_TOUCH_FLUSH_INTERVAL или по заполнении SESSION_TOUCH_BATCH_SIZE
+записываются в хранилище одним пакетом из фонового потока. Хранилище продлевает
+только еще живые сессии и не сокращает срок, поэтому запоздавшая запись не
+воскресит истекшую или удаленную сессию. Неудачный пакет отбрасывается:
+следующее обращение к сессии снова поставит ее в буфер.
+
+Подписанные токены несут срок в себе и не продлеваются.
+
+Счетчики доступны в /api/as/metrics (session_touch).
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+from app.models.session import SessionDB
+from app.utils import metrics
+
+SESSION_SLIDING_EXPIRY = os.getenv("SESSION_SLIDING_EXPIRY", "false").lower() == "true"
+# Время жизни сессии при входе и после продления (секунды)
+SESSION_TTL = timedelta(seconds=float(os.getenv("SESSION_TTL", "10800")))
+# Продлевать сессию не чаще раза в этот интервал (секунды)
+SESSION_TOUCH_INTERVAL = timedelta(seconds=float(os.getenv("SESSION_TOUCH_INTERVAL", "300")))
+# Как часто записывать накопленные продления (секунды) и размер пакета записи
+SESSION_TOUCH_FLUSH_INTERVAL = float(os.getenv("SESSION_TOUCH_FLUSH_INTERVAL", "5"))
+SESSION_TOUCH_BATCH_SIZE = int(os.getenv("SESSION_TOUCH_BATCH_SIZE", "500"))
+
+
+class SessionTouchBuffer:
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        # token_hash -> продленная сессия
+        self.pending: dict[str, SessionDB] = {}
+        self.touched = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self.pending),
+            "touched": self.touched,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
+
+    def touch(self, session: SessionDB) -> None:
+        """Ставит продление сессии в буфер, если с прошлого продления прошел интервал"""
+        if not self.enabled:
+            return
+
+        now = datetime.utcnow()
+        if session.expires_at > now + SESSION_TTL - SESSION_TOUCH_INTERVAL:  # pyright: ignore[reportOperatorIssue]
+            return
+
+        extended = SessionDB(
+            id=session.id,
+            user_id=session.user_id,
+            token_hash=session.token_hash,
+            expires_at=now + SESSION_TTL,
+        )
+        with self._cond:
+            self.pending[str(session.token_hash)] = extended
+            self.touched += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-touch", daemon=True)
+                self._thread.start()
+            if len(self.pending) >= SESSION_TOUCH_BATCH_SIZE:
+                self._cond.notify()
+
+    def _take(self) -> list[SessionDB]:
+        with self._cond:
+            if len(self.pending) < SESSION_TOUCH_BATCH_SIZE:
+                self._cond.wait(SESSION_TOUCH_FLUSH_INTERVAL)
+            batch = list(self.pending.values())[:SESSION_TOUCH_BATCH_SIZE]
+            for session in batch:
+                del self.pending[str(session.token_hash)]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take()
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch: list[SessionDB]) -> None:
+        from app.database import SessionLocal
+        from app.repositories.session_store import get_session_store
+
+        db = SessionLocal()
+        try:
+            get_session_store(db).extend(batch)
+            self.flushed += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Error extending {len(batch)} sessions: {e}")
+        finally:
+            db.close()
+
+
+session_touch = SessionTouchBuffer(SESSION_SLIDING_EXPIRY)
+metrics.register("session_touch", session_touch.stats)
@@ -1,6 +1,6 @@
 import grpc
 
-from app.database import get_db
+from app.database import DeadlineExceeded, get_read_db, set_deadline
 from app.repositories.permission_repository import PermissionRepository
 from app.repositories.session_repository import SessionRepository
 from app.repositories.user_repository import UserRepository
@@ -11,12 +11,25 @@ from generated.permission_pb2 import (
 )
 from generated.permission_pb2_grpc import UserServiceServicer
 
+# Поля gRPC UserResponse (пустая маска - все)
+GRPC_USER_FIELDS = ("id", "name", "surname")
+
 
 class UserGrpcService(UserServiceServicer):
     def GetUsers(self, request: GetUsersRequest, context: grpc.ServicerContext) -> GetUsersResponse:
         db = None
         try:
-            db = next(get_db())  # pyright: ignore[reportArgumentType]
+            fields = list(request.field_mask.paths) or list(GRPC_USER_FIELDS)
+            unknown = set(fields) - set(GRPC_USER_FIELDS)
+            if unknown:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(f"Unknown field_mask paths: {', '.join(sorted(unknown))}")
+
+                return GetUsersResponse(message="Неизвестные поля", code=400)
+
+            db = next(get_read_db())  # pyright: ignore[reportArgumentType]
+            # Запросы к БД не переживают дедлайн клиента
+            set_deadline(db, context.time_remaining())
 
             perm_repo = PermissionRepository(db)
             session_repo = SessionRepository(db)
@@ -43,10 +56,11 @@ class UserGrpcService(UserServiceServicer):
                     code=403,
                 )
 
-            users = user_repo.get_all_without_pages()
+            # Из БД читаются только колонки из маски, без ролей и пола
+            users = user_repo.get_all_without_pages(frozenset(fields))
 
             users_response = [
-                UserResponse(id=str(user.id), name=str(user.name), surname=str(user.surname))
+                UserResponse(**{field: str(getattr(user, field)) for field in fields})
                 for user in users
             ]
 
@@ -56,6 +70,12 @@ class UserGrpcService(UserServiceServicer):
                 code=200,
             )
 
+        except DeadlineExceeded:
+            context.set_code(grpc.StatusCode.DEADLINE_EXCEEDED)
+            context.set_details("Deadline exceeded")
+
+            return GetUsersResponse(message="Превышено время ожидания", code=504)
+
         except StopIteration:
             # Не удалось получить сессию БД
             context.set_code(grpc.StatusCode.INTERNAL)
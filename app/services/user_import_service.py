@@ -0,0 +1,237 @@
+"""
+Массовый импорт пользователей из CSV или NDJSON
+
+Файл читается построчно пачками по batch_size строк. Для каждой пачки:
+валидация строк моделью UserCreate, проверка логинов и gender_id одним IN
+запросом на пачку, хэширование паролей в пуле процессов (PBKDF2 занимает
+десятки миллисекунд на пароль и не распараллеливается потоками из-за GIL),
+вставка одним executemany и commit. Ошибки не прерывают импорт, а
+попадают в отчет с номером строки.
+
+Пул процессов один на процесс приложения: создается при первом импорте и
+общий для одновременных импортов (каждый процесс пула при запуске заново
+импортирует приложение). Маленькие пачки хэшируются без пула.
+
+CSV: заголовок name,surname,patronymic,username,birthday,gender_id,password
+NDJSON: по одному JSON объекту с теми же полями на строку
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO, Literal
+
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy.orm import Session
+
+from app.models.user import UserCreate
+from app.repositories.gender_repository import GenderRepositry
+from app.repositories.user_repository import UserRepository
+from app.utils.password_utils import hash_password
+
+ImportFormat = Literal["csv", "ndjson"]
+
+# Строк в одной транзакции
+USER_IMPORT_BATCH_SIZE = int(os.getenv("USER_IMPORT_BATCH_SIZE", "1000"))
+# Процессов для хэширования паролей (по умолчанию - по числу CPU)
+USER_IMPORT_HASH_WORKERS = int(os.getenv("USER_IMPORT_HASH_WORKERS", "0")) or os.cpu_count() or 1
+# Пачки до стольких паролей хэшируются в текущем потоке: запуск пула дольше
+USER_IMPORT_INLINE_HASH_ROWS = int(os.getenv("USER_IMPORT_INLINE_HASH_ROWS", "32"))
+# Сколько ошибок возвращать в отчете (счетчик failed учитывает все)
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportRowError(BaseModel):
+    line: int
+    username: str | None = None
+    error: str
+
+
+class ImportReport(BaseModel):
+    total: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: list[ImportRowError] = Field(default_factory=list)
+
+    def add_error(self, line: int, error: str, username: str | None = None) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(ImportRowError(line=line, username=username, error=error))
+
+
+# (номер строки, данные или текст ошибки разбора)
+ParsedRow = tuple[int, dict | str]
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[ParsedRow]:
+    reader = csv.DictReader(lines)
+    for row in reader:
+        if None in row:
+            yield reader.line_num, "Лишние значения в строке"
+        else:
+            yield reader.line_num, {key: value for key, value in row.items() if value != ""}
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[ParsedRow]:
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_num, f"Некорректный JSON: {e.msg}"
+            continue
+        if isinstance(data, dict):
+            yield line_num, data
+        else:
+            yield line_num, "Ожидается JSON объект"
+
+
+PARSERS = {"csv": parse_csv, "ndjson": parse_ndjson}
+
+
+# Пулы хэширования по числу процессов (HTTP использует один, CLI - свой --workers)
+_hash_pools: dict[int, ProcessPoolExecutor] = {}
+_hash_pools_lock = threading.Lock()
+
+
+def _hash_pool(workers: int) -> ProcessPoolExecutor:
+    with _hash_pools_lock:
+        pool = _hash_pools.get(workers)
+        if pool is None:
+            # spawn: HTTP воркер многопоточный, fork такого процесса небезопасен
+            pool = _hash_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return pool
+
+
+def _drop_hash_pool(workers: int, pool: ProcessPoolExecutor) -> None:
+    """Пул с упавшим процессом больше не принимает задачи: следующий вызов создаст новый"""
+    with _hash_pools_lock:
+        if _hash_pools.get(workers) is pool:
+            del _hash_pools[workers]
+    pool.shutdown(wait=False)
+
+
+def _hash_passwords(passwords: list[str], workers: int) -> list[str]:
+    if len(passwords) <= USER_IMPORT_INLINE_HASH_ROWS or workers <= 1:
+        return [hash_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    pool = _hash_pool(workers)
+    try:
+        return list(pool.map(hash_password, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        _drop_hash_pool(workers, pool)
+        return list(_hash_pool(workers).map(hash_password, passwords, chunksize=chunksize))
+
+
+def _batches(rows: Iterable[ParsedRow], size: int) -> Iterator[list[ParsedRow]]:
+    batch: list[ParsedRow] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class UserImportService:
+    def __init__(self, db: Session) -> None:
+        self.repo = UserRepository(db)
+        self.gender_repo = GenderRepositry(db)
+
+    def import_file(
+        self,
+        file: IO[bytes],
+        file_format: ImportFormat,
+        batch_size: int = USER_IMPORT_BATCH_SIZE,
+        workers: int = USER_IMPORT_HASH_WORKERS,
+    ) -> ImportReport:
+        lines = (line.decode("utf-8-sig") for line in file)
+        return self.import_rows(PARSERS[file_format](lines), batch_size, workers)
+
+    def import_rows(
+        self,
+        rows: Iterable[ParsedRow],
+        batch_size: int = USER_IMPORT_BATCH_SIZE,
+        workers: int = USER_IMPORT_HASH_WORKERS,
+    ) -> ImportReport:
+        report = ImportReport()
+        # Логины из уже обработанных строк файла: дубликаты внутри файла отклоняются
+        seen_usernames: set[str] = set()
+
+        for batch in _batches(rows, batch_size):
+            self._import_batch(batch, report, seen_usernames, workers)
+
+        report.errors.sort(key=lambda error: error.line)
+        return report
+
+    def _import_batch(
+        self,
+        batch: list[ParsedRow],
+        report: ImportReport,
+        seen_usernames: set[str],
+        workers: int,
+    ) -> None:
+        report.total += len(batch)
+
+        valid: list[tuple[int, UserCreate]] = []
+        for line, data in batch:
+            if isinstance(data, str):
+                report.add_error(line, data)
+                continue
+            try:
+                user = UserCreate.model_validate(data)
+            except ValidationError as e:
+                errors = "; ".join(
+                    f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                    for error in e.errors()
+                )
+                report.add_error(line, errors, data.get("username"))
+                continue
+            if user.username in seen_usernames:
+                report.add_error(line, "Логин повторяется в файле", user.username)
+                continue
+            seen_usernames.add(user.username)
+            valid.append((line, user))
+
+        taken = self.repo.existing_usernames([user.username for _, user in valid])
+        genders = self.gender_repo.existing_ids(list({user.gender_id for _, user in valid}))
+
+        accepted: list[tuple[int, UserCreate]] = []
+        for line, user in valid:
+            if user.username in taken:
+                report.add_error(line, "Пользователь с такой почтой уже сушествует", user.username)
+            elif user.gender_id not in genders:
+                report.add_error(line, "Не существующий идентитификатор Gender", user.username)
+            else:
+                accepted.append((line, user))
+
+        if not accepted:
+            return
+
+        hashes = _hash_passwords([user.password for _, user in accepted], workers)
+
+        try:
+            self.repo.create_many(
+                [
+                    {**user.model_dump(), "password": password_hash}
+                    for (_, user), password_hash in zip(accepted, hashes, strict=True)
+                ]
+            )
+        except Exception as e:
+            self.repo.db.rollback()
+            print(f"Error in user import batch: {e}")
+            for line, user in accepted:
+                report.add_error(line, f"Ошибка записи пачки: {e}", user.username)
+            return
+
+        report.created += len(accepted)
@@ -1,25 +1,71 @@
+from datetime import datetime, timezone
+
 from fastapi import HTTPException, status
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app.models.user import UserAddRole, UserCreate, UserResponse
+from app.models.role import BulkAssignResult
+from app.models.user import (
+    USER_FIELDS,
+    UserAddRole,
+    UserBulkRoles,
+    UserCreate,
+    UserResponse,
+    user_projection,
+)
 from app.repositories.gender_repository import GenderRepositry
 from app.repositories.role_repository import RoleRepository
 from app.repositories.user_repository import UserRepository
+from app.services.revocation_hub import revocation_hub
+from app.services.role_expiry import role_expiry
+from app.utils.bulk_utils import plan_bulk_update
 from app.utils.pagination_utils import PageResponse
 from app.utils.password_utils import hash_password
 
 
+def _utc(value: datetime | None) -> datetime | None:
+    """Время с часовым поясом -> наивное UTC (user_roles хранит UTC без пояса)"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 class UserService:
     def __init__(self, db: Session) -> None:
         self.repo = UserRepository(db)
         self.gender_repo = GenderRepositry(db)
         self.role_repo = RoleRepository(db)
 
-    def get_all(self, page: int = 1, limit: int = 10) -> PageResponse[UserResponse]:
-        page_data = self.repo.get_all(page, limit)
+    @staticmethod
+    def parse_fields(fields: str | None) -> frozenset[str] | None:
+        """
+        Разбирает параметр fields ("id,name,surname"). None - все поля UserResponse
+        """
+        if not fields:
+            return None
+
+        requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+        unknown = requested - set(USER_FIELDS)
+        if unknown:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                f"Неизвестные поля: {', '.join(sorted(unknown))}. "
+                f"Доступные: {', '.join(USER_FIELDS)}",
+            )
+        return requested or None
+
+    @staticmethod
+    def _response_model(fields: frozenset[str] | None) -> type[BaseModel]:
+        return user_projection(fields) if fields is not None else UserResponse
 
-        return PageResponse(
-            items=[UserResponse.model_validate(u) for u in page_data.items],
+    def get_all(
+        self, page: int = 1, limit: int = 10, fields: frozenset[str] | None = None
+    ) -> PageResponse:
+        page_data = self.repo.get_all(page, limit, fields)
+        model = self._response_model(fields)
+
+        return PageResponse[model](
+            items=[model.model_validate(u) for u in page_data.items],
             total=page_data.total,
             page=page_data.page,
             limit=page_data.limit,
@@ -27,20 +73,32 @@ class UserService:
         )
 
     def get_all_by_service_id(
-        self, service_id: str, page: int = 1, limit: int = 10
-    ) -> PageResponse[UserResponse]:
-        page_data = self.repo.get_by_service_id(page, limit, service_id)
+        self,
+        service_id: str,
+        page: int = 1,
+        limit: int = 10,
+        fields: frozenset[str] | None = None,
+    ) -> PageResponse:
+        page_data = self.repo.get_by_service_id(page, limit, service_id, fields)
+        model = self._response_model(fields)
 
         items = []
         for user in page_data.items:
-            user_response = UserResponse.model_validate(user)
+            user_response = model.model_validate(user)
             # Оставляем только роли для данного service_id
-            user_response.roles = [
-                role for role in user_response.roles if role.service_id == service_id
-            ]
+            if "roles" in model.model_fields:
+                user_response.roles = [  # pyright: ignore[reportAttributeAccessIssue]
+                    role
+                    for role in user_response.roles  # pyright: ignore[reportAttributeAccessIssue]
+                    if role.service_id == service_id
+                ]
+            if "roles_count" in model.model_fields:
+                user_response.roles_count = sum(  # pyright: ignore[reportAttributeAccessIssue]
+                    1 for role in user.roles if role.service_id == service_id
+                )
             items.append(user_response)
 
-        return PageResponse(
+        return PageResponse[model](
             items=items,
             total=page_data.total,
             page=page_data.page,
@@ -48,9 +106,10 @@ class UserService:
             pages=page_data.pages,
         )
 
-    def get_all_without_limits(self) -> list[UserResponse]:
-        users = self.repo.get_all_without_pages()
-        return [UserResponse.model_validate(u) for u in users]
+    def get_all_without_limits(self, fields: frozenset[str] | None = None) -> list[BaseModel]:
+        users = self.repo.get_all_without_pages(fields)
+        model = self._response_model(fields)
+        return [model.model_validate(u) for u in users]
 
     def get_by_id(self, user_id: str) -> UserResponse:
         user = self.repo.get_by_id(user_id)
@@ -83,11 +142,36 @@ class UserService:
         if not role:
             raise HTTPException(status_code=404, detail="Роль не найдена")
 
-        if role in user.roles:
+        valid_from = _utc(user_add_data.valid_from)
+        valid_until = _utc(user_add_data.valid_until)
+        if valid_until is not None:
+            if valid_until <= datetime.utcnow():
+                raise HTTPException(status_code=400, detail="Срок действия роли уже истек")
+            if valid_from is not None and valid_until <= valid_from:
+                raise HTTPException(
+                    status_code=400, detail="valid_until должен быть позже valid_from"
+                )
+
+        if not self.repo.role_add(str(user.id), str(role.id), valid_from, valid_until):
             raise HTTPException(status_code=400, detail="Пользователь уже имеет эту роль")
+        role_expiry.schedule(str(user.id), str(role.id), valid_from, valid_until)
 
-        user = self.repo.role_add(user, role)
-        return UserResponse.model_validate(user)
+        return UserResponse.model_validate(self.repo.get_with_roles(str(user.id)))
+
+    def roles_bulk(self, bulk_data: UserBulkRoles) -> BulkAssignResult:
+        user = self.repo.get_by_id(bulk_data.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+        user_id = str(user.id)
+        to_add, to_remove, result = plan_bulk_update(
+            bulk_data.add,
+            bulk_data.remove,
+            self.role_repo.existing_ids,
+            lambda role_ids: self.repo.role_ids(user_id, role_ids),
+        )
+        self.repo.roles_bulk_update(user_id, to_add, to_remove)
+        return result
 
     def role_remove(self, user_remove_data: UserAddRole):
         user = self.repo.get_by_id(user_remove_data.user_id)
@@ -98,11 +182,10 @@ class UserService:
         if not role:
             raise HTTPException(status_code=404, detail="Роль не найдена")
 
-        if role not in user.roles:
+        if not self.repo.role_remove(str(user.id), str(role.id)):
             raise HTTPException(status_code=400, detail="Пользователь не имеет этой роли")
 
-        user = self.repo.role_remove(user, role)
-        return UserResponse.model_validate(user)
+        return UserResponse.model_validate(self.repo.get_with_roles(str(user.id)))
 
     def update(self, user_id: str, user_data):
         """Обновляет пользователя по ID"""
@@ -135,6 +218,16 @@ class UserService:
         updated_user = self.repo.update(user_id, user_data)
         return UserResponse.model_validate(updated_user)
 
+    def revoke_sessions(self, user_id: str):
+        """Завершает все сессии пользователя"""
+        user = self.repo.get_by_id(user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+        sessions = self.repo.revoke_sessions(str(user.id))
+        revocation_hub.publish(sessions)
+        return {"message": "Сессии пользователя завершены", "revoked": len(sessions)}
+
     def delete(self, user_id: str):
         """Удаляет пользователя по ID"""
         user = self.repo.delete(user_id)
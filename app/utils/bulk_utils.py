@@ -0,0 +1,48 @@
+from collections.abc import Callable
+
+from fastapi import HTTPException, status
+
+from app.models.role import BulkAssignResult
+
+
+def plan_bulk_update(
+    add: list[str],
+    remove: list[str],
+    existing_ids: Callable[[list[str]], set[str]],
+    current_ids: Callable[[list[str]], set[str]],
+) -> tuple[list[str], list[str], BulkAssignResult]:
+    """
+    Вычисляет, какие связи реально добавить и удалить.
+
+    Args:
+        add: Id для добавления
+        remove: Id для удаления
+        existing_ids: Возвращает существующие из переданных id (один IN запрос)
+        current_ids: Возвращает уже связанные из переданных id (один IN запрос)
+
+    Returns:
+        (добавить, удалить, итог запроса)
+    """
+    add = list(dict.fromkeys(add))
+    remove = list(dict.fromkeys(remove))
+
+    conflicts = set(add) & set(remove)
+    if conflicts:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"Id одновременно в add и remove: {', '.join(sorted(conflicts))}",
+        )
+
+    requested = add + remove
+    existing = existing_ids(requested)
+    current = current_ids([item_id for item_id in requested if item_id in existing])
+
+    result = BulkAssignResult(missing=[item_id for item_id in requested if item_id not in existing])
+    for item_id in add:
+        if item_id in existing:
+            (result.skipped if item_id in current else result.added).append(item_id)
+    for item_id in remove:
+        if item_id in existing:
+            (result.removed if item_id in current else result.skipped).append(item_id)
+
+    return result.added, result.removed, result
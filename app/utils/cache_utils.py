@@ -0,0 +1,163 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+from fastapi import Response, status
+
+from app.utils import metrics
+
+# Максимум закэшированных ответов для пользовательских эндпоинтов (ETag)
+USER_RESPONSE_CACHE_SIZE = int(os.getenv("USER_RESPONSE_CACHE_SIZE", "10000"))
+# Кэш ответов списков для админки: максимум записей и суммарный размер тел (байты)
+LIST_RESPONSE_CACHE_SIZE = int(os.getenv("LIST_RESPONSE_CACHE_SIZE", "1000"))
+LIST_RESPONSE_CACHE_MAX_BYTES = int(
+    os.getenv("LIST_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Потокобезопасный LRU кэш с необязательным TTL и счетчиками попаданий.
+
+    Если задан maxweight, кэш дополнительно ограничен суммарным весом значений
+    (weigh, например размер в байтах). Значение тяжелее maxweight не кэшируется.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float | None = None,
+        maxweight: int | None = None,
+        weigh: Callable[[V], int] = lambda _: 1,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or (self.ttl is not None and time.monotonic() - item[1] > self.ttl):
+                if item is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def peek(self, key: K) -> V | None:
+        """Значение без учета в статистике и без обновления порядка вытеснения"""
+        item = self._data.get(key)
+        return item[0] if item is not None else None
+
+    def _remove(self, key: K) -> V:
+        value = self._data.pop(key)[0]
+        self.weight -= self.weigh(value)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        weight = self.weigh(value)
+        if self.maxweight is not None and weight > self.maxweight:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, time.monotonic())
+            self.weight += weight
+            while len(self._data) > self.maxsize or (
+                self.maxweight is not None and self.weight > self.maxweight
+            ):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            return self._remove(key) if key in self._data else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def make_etag(key: Hashable, version: Hashable) -> str:
+    """Сильный ETag: ответ однозначно определяется ключом и версией данных"""
+    return '"' + hashlib.sha256(repr((key, version)).encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """
+    Кэш сериализованных JSON ответов с поддержкой условных запросов.
+
+    Запись определяется ключом ответа и версией данных, поэтому при смене
+    версии старые записи просто перестают запрашиваться и вытесняются LRU.
+    """
+
+    def __init__(self, name: str, maxsize: int, max_bytes: int | None = None) -> None:
+        self.name = name
+        self._cache: LRUCache[tuple[Hashable, Hashable], bytes] = LRUCache(
+            maxsize, maxweight=max_bytes, weigh=len
+        )
+        metrics.register(f"response_cache.{name}", self.stats)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self._cache.hits,
+            "misses": self._cache.misses,
+            "evictions": self._cache.evictions,
+            "entries": len(self._cache),
+            "bytes": self._cache.weight,
+        }
+
+    def respond(
+        self,
+        key: Hashable,
+        version: Hashable,
+        build: Callable[[], bytes],
+        if_none_match: str | None = None,
+    ) -> Response:
+        """
+        Args:
+            key: Ключ ответа (маршрут и параметры)
+            version: Версия данных, от которых зависит ответ (число или кортеж версий)
+            build: Строит тело ответа, если его нет в кэше
+            if_none_match: Значение заголовка If-None-Match
+        """
+        etag = make_etag(key, version)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        body = self._cache.get((key, version))
+        if body is None:
+            body = build()
+            self._cache.set((key, version), body)
+
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,112 @@
+"""
+Минимальный клиент key-value хранилища по протоколу RESP (Redis и совместимые серверы)
+
+Поддерживает только то, что нужно сервису: отправку команд и конвейер из
+нескольких команд за один обмен. Соединение свое у каждого потока; разорванное
+соединение (перезапуск сервера) переоткрывается, команда повторяется один раз.
+"""
+
+import socket
+import threading
+from urllib.parse import urlsplit
+
+
+class KvError(Exception):
+    """Ошибка, которую вернул сервер"""
+
+
+class KvClient:
+    def __init__(self, url: str, timeout: float) -> None:
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.database = int(parts.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        self._local.conn = conn
+
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.database:
+            setup.append(("SELECT", self.database))
+        if setup:
+            try:
+                self._send(conn, setup)
+            except KvError:
+                self._close()
+                raise
+        return conn
+
+    def _close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    @staticmethod
+    def _encode(command: tuple) -> bytes:
+        out = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("KV server closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return KvError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = reader.read(size + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read(reader) for _ in range(size)]
+        raise ConnectionError(f"Unexpected KV reply: {line!r}")
+
+    def _send(self, conn, commands: list[tuple]) -> list:
+        sock, reader = conn
+        sock.sendall(b"".join(self._encode(command) for command in commands))
+        replies = [self._read(reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, KvError):
+                raise reply
+        return replies
+
+    def pipeline(self, commands: list[tuple]) -> list:
+        """Отправляет команды одним пакетом и возвращает ответы по порядку"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                return self._send(conn, commands)
+            except KvError:
+                raise
+            except OSError:
+                # Соединение из прошлых вызовов мог закрыть сервер - повторяем на новом
+                self._close()
+
+        try:
+            return self._send(self._connect(), commands)
+        except OSError:
+            self._close()
+            raise
+
+    def execute(self, *command):
+        return self.pipeline([command])[0]
@@ -0,0 +1,19 @@
+"""
+Счетчики процесса для /api/as/metrics
+
+Компоненты регистрируют функцию, возвращающую словарь текущих значений.
+Значения собираются только при запросе метрик, поэтому на горячем пути
+нет дополнительных блокировок.
+"""
+
+from collections.abc import Callable
+
+_collectors: dict[str, Callable[[], dict[str, int | float]]] = {}
+
+
+def register(name: str, collector: Callable[[], dict[str, int | float]]) -> None:
+    _collectors[name] = collector
+
+
+def collect() -> dict[str, dict[str, int | float]]:
+    return {name: collector() for name, collector in sorted(_collectors.items())}
@@ -0,0 +1,19 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON ответ, сериализуемый pydantic-core сразу в байты.
+
+    Принимает как готовые dict/list, так и Pydantic модели (в том числе
+    PageResponse[...] и списки моделей). Если маршрут возвращает модель
+    через FastJSONResponse(...), FastAPI пропускает повторную валидацию по
+    response_model и jsonable_encoder - на страницах пользователей с ролями
+    именно они занимают основное время.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, by_alias=True)
@@ -1,5 +1,31 @@
+import base64
 import hashlib
+import hmac
+import os
 import secrets
+import struct
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+# Формат новых токенов: opaque (случайная строка, по умолчанию) или signed (HMAC-подписанный)
+SESSION_TOKEN_FORMAT = os.getenv("SESSION_TOKEN_FORMAT", "opaque")
+# Ключ подписи. Предыдущие ключи (через запятую) принимаются при проверке во время ротации
+SESSION_TOKEN_SECRET = os.getenv("SESSION_TOKEN_SECRET", "")
+SESSION_TOKEN_PREVIOUS_SECRETS = [
+    secret for secret in os.getenv("SESSION_TOKEN_PREVIOUS_SECRETS", "").split(",") if secret
+]
+
+SIGNED_TOKEN_PREFIX = "s1."
+# session_id (uuid), user_id (uuid), expires_at (unix time)
+_PAYLOAD = struct.Struct("<16s16sQ")
+
+
+@dataclass(frozen=True)
+class SignedTokenPayload:
+    session_id: str
+    user_id: str
+    expires_at: datetime
 
 
 def generate_token() -> str:
@@ -8,3 +34,65 @@ def generate_token() -> str:
 
 def create_hash(token: str) -> str:
     return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(secret: str, payload: bytes) -> bytes:
+    return hmac.new(secret.encode(), payload, hashlib.sha256).digest()
+
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(SIGNED_TOKEN_PREFIX)
+
+
+def signed_tokens_verifiable() -> bool:
+    """Можно ли проверять подписанные токены локально (задан ключ подписи)"""
+    return bool(SESSION_TOKEN_SECRET)
+
+
+def generate_signed_token(session_id: str, user_id: str, expires_at: datetime) -> str:
+    """Токен вида s1.<payload>.<hmac-sha256>, проверяемый без обращения к БД"""
+    if not SESSION_TOKEN_SECRET:
+        raise RuntimeError("SESSION_TOKEN_SECRET is required for signed session tokens")
+
+    payload = _PAYLOAD.pack(
+        uuid.UUID(session_id).bytes, uuid.UUID(user_id).bytes, int(expires_at.timestamp())
+    )
+    signature = _sign(SESSION_TOKEN_SECRET, payload)
+    return f"{SIGNED_TOKEN_PREFIX}{_b64encode(payload)}.{_b64encode(signature)}"
+
+
+def verify_signed_token(token: str) -> SignedTokenPayload | None:
+    """
+    Проверяет подпись токена и возвращает его содержимое.
+
+    Срок действия не проверяется - это делает вызывающий код.
+    None - токен поврежден или подписан неизвестным ключом.
+    """
+    try:
+        payload_part, signature_part = token[len(SIGNED_TOKEN_PREFIX) :].split(".")
+        payload = _b64decode(payload_part)
+        signature = _b64decode(signature_part)
+        session_id, user_id, expires_at = _PAYLOAD.unpack(payload)
+    except (ValueError, struct.error):
+        return None
+
+    if not any(
+        hmac.compare_digest(_sign(secret, payload), signature)
+        for secret in (SESSION_TOKEN_SECRET, *SESSION_TOKEN_PREVIOUS_SECRETS)
+        if secret
+    ):
+        return None
+
+    return SignedTokenPayload(
+        session_id=str(uuid.UUID(bytes=session_id)),
+        user_id=str(uuid.UUID(bytes=user_id)),
+        expires_at=datetime.fromtimestamp(expires_at, timezone.utc),
+    )
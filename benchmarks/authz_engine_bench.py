@@ -0,0 +1,108 @@
+"""
+Бенчмарк BitsetIndex: 10k ролей, 100k разрешений
+
+    python -m benchmarks.authz_engine_bench
+
+Сравнивает проверку по битовым маскам с проверкой по множествам кодов
+(эквивалент того, что делает join по ролям, без учета стоимости запроса к БД).
+"""
+
+import random
+import sys
+import time
+
+from app.services.authz_engine import BitsetIndex
+
+ROLES = 10_000
+PERMISSIONS = 100_000
+SERVICES = 200
+PERMISSIONS_PER_ROLE = 50
+ROLES_PER_USER = 5
+USERS = 10_000
+CHECKS = 200_000
+# Различных проверок (service, entity, action) в потоке запросов
+DISTINCT_CHECKS = 1_000
+
+
+def _patterns(service: str, entity: str, action: str) -> list[str]:
+    return [
+        f"{service}:{entity}:{action}",
+        f"{service}:{entity}:all",
+        f"{service}:all:{action}",
+        f"{service}:all:all",
+        f"all:{entity}:{action}",
+        f"all:{entity}:all",
+        f"all:all:{action}",
+        "all:all:all",
+    ]
+
+
+def main() -> None:
+    rng = random.Random(42)
+    codes = [f"s{i % SERVICES}:e{i // SERVICES}:read" for i in range(PERMISSIONS)]
+    # Роли сервиса получают разрешения своего сервиса, как в реальных данных
+    role_codes = {
+        f"role-{r}": [
+            codes[(r % SERVICES) + SERVICES * rng.randrange(PERMISSIONS // SERVICES)]
+            for _ in range(PERMISSIONS_PER_ROLE)
+        ]
+        for r in range(ROLES)
+    }
+    user_roles = [
+        tuple(f"role-{rng.randrange(ROLES)}" for _ in range(ROLES_PER_USER)) for _ in range(USERS)
+    ]
+    check_pool = [
+        tuple(_patterns(f"s{rng.randrange(SERVICES)}", f"e{rng.randrange(500)}", "read"))
+        for _ in range(DISTINCT_CHECKS)
+    ]
+    checks = [(rng.randrange(USERS), rng.choice(check_pool)) for _ in range(CHECKS)]
+
+    started = time.perf_counter()
+    index = BitsetIndex()
+    for code in sorted(codes):
+        index.code_id(code)
+    for role_id, role_code_list in role_codes.items():
+        index.set_role(role_id, role_code_list)
+    build_time = time.perf_counter() - started
+    role_bytes = sum(
+        sys.getsizeof(bits) + sum(sys.getsizeof(b) for b in bits.values())
+        for bits in index.role_bits.values()
+    )
+
+    started = time.perf_counter()
+    user_bits = [index.user_bits(roles) for roles in user_roles]
+    user_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    bitset_hits = sum(
+        index.has_any(user_bits[user], index.mask(patterns)) for user, patterns in checks
+    )
+    bitset_time = time.perf_counter() - started
+
+    role_sets = {role_id: frozenset(codes) for role_id, codes in role_codes.items()}
+    user_sets = [frozenset().union(*(role_sets[r] for r in roles)) for roles in user_roles]
+    user_bits_bytes = sum(
+        sys.getsizeof(bits) + sum(sys.getsizeof(b) for b in bits.values()) for bits in user_bits
+    )
+    user_sets_bytes = sum(sys.getsizeof(codes) for codes in user_sets)
+    started = time.perf_counter()
+    set_hits = sum(any(code in user_sets[user] for code in patterns) for user, patterns in checks)
+    set_time = time.perf_counter() - started
+
+    assert bitset_hits == set_hits
+
+    print(f"roles={ROLES} permissions={PERMISSIONS} users={USERS} checks={CHECKS}")
+    print(
+        f"index build:          {build_time:.2f}s, role bitmaps {role_bytes / 1024 / 1024:.1f} MiB"
+    )
+    print(f"user bitmaps (OR):    {user_time / USERS * 1e6:.1f} us/user")
+    print(f"bitset check:         {bitset_time / CHECKS * 1e6:.2f} us/check")
+    print(f"frozenset check:      {set_time / CHECKS * 1e6:.2f} us/check")
+    print(
+        f"per-user cache:       bitset {user_bits_bytes / 1024 / 1024:.1f} MiB, frozenset {user_sets_bytes / 1024 / 1024:.1f} MiB"
+    )
+    print(f"granted:              {bitset_hits}/{CHECKS}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Бенчмарк сериализации списка пользователей: 1000 UserResponse с ролями и полом
+
+    python -m benchmarks.json_response_bench
+
+Сравнивает путь FastAPI по умолчанию (валидация по response_model,
+jsonable_encoder и json.dumps в JSONResponse) с FastJSONResponse, которая
+сериализует модели pydantic-core сразу в байты.
+"""
+
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models import RoleResponse
+from app.models.gender import GenderResponse
+from app.models.user import UserResponse
+from app.utils.pagination_utils import PageResponse
+from app.utils.routes_utils import FastJSONResponse
+
+USERS = 1000
+ROLES_PER_USER = 5
+ROUNDS = 20
+
+
+def _users() -> list[UserResponse]:
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    return [
+        UserResponse(
+            id=f"00000000-0000-0000-0000-{i:012d}",
+            name="Иван",
+            surname="Иванов",
+            patronymic="Иванович",
+            username=f"user{i}@example.com",
+            birthday=now,
+            status="active",
+            created_at=now,
+            gender=GenderResponse(id=1, name="Мужской"),
+            roles=[
+                RoleResponse(
+                    id=f"10000000-0000-0000-0000-{r:012d}",
+                    service_id=f"20000000-0000-0000-0000-{r:012d}",
+                    name=f"role-{r}",
+                    description="Описание роли",
+                    is_global=0,
+                    created_at=now,
+                    permissions=None,
+                )
+                for r in range(ROLES_PER_USER)
+            ],
+        )
+        for i in range(USERS)
+    ]
+
+
+def _measure(label: str, render) -> float:
+    render()
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        body = render()
+    elapsed = (time.perf_counter() - started) / ROUNDS
+    print(f"{label:<40} {elapsed * 1000:8.2f} ms per {USERS} users, {len(body) // 1024} KiB")
+    return elapsed
+
+
+def main() -> None:
+    users = _users()
+    page = PageResponse[UserResponse](items=users, total=USERS, page=1, limit=USERS, pages=1)
+
+    # То, что делает FastAPI для маршрута без response_model
+    encoder = _measure(
+        "jsonable_encoder + json.dumps",
+        lambda: JSONResponse(jsonable_encoder(page)).body,
+    )
+
+    # То, что делает FastAPI для маршрута с response_model (ModelField - обертка над TypeAdapter)
+    adapter = TypeAdapter(PageResponse[UserResponse])
+
+    def response_model_path() -> bytes:
+        value = adapter.validate_python(page, from_attributes=True)
+        return JSONResponse(adapter.dump_python(value, mode="json", by_alias=True)).body
+
+    response_model = _measure("response_model validate + json.dumps", response_model_path)
+
+    fast = _measure("FastJSONResponse (pydantic-core)", lambda: FastJSONResponse(page).body)
+
+    print(
+        f"speedup: x{encoder / fast:.1f} vs jsonable_encoder, x{response_model / fast:.1f} vs response_model"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Обслуживание таблицы user_effective_permissions
+
+    python -m cmd.effective_permissions rebuild   # полностью перестроить таблицу
+    python -m cmd.effective_permissions check     # сверить с ролями (код 1 при расхождениях)
+    python -m cmd.effective_permissions check --fix
+
+После первого rebuild можно включить чтение из таблицы: EFFECTIVE_PERMISSIONS_ENABLED=true
+"""
+
+import argparse
+import sys
+
+from app.database import SessionLocal, init_db
+from app.models import UserEffectivePermission  # noqa: F401  регистрирует модели для init_db
+from app.repositories.effective_permission_repository import EffectivePermissionRepository
+
+# Сколько расхождений выводить в отчете
+REPORT_LIMIT = 20
+
+
+def rebuild() -> int:
+    db = SessionLocal()
+    try:
+        count = EffectivePermissionRepository(db).rebuild()
+        print(f"✅ user_effective_permissions rebuilt: {count} rows")
+        return 0
+    finally:
+        db.close()
+
+
+def check(fix: bool) -> int:
+    db = SessionLocal()
+    try:
+        repo = EffectivePermissionRepository(db)
+        missing, extra = repo.find_inconsistencies()
+
+        if not missing and not extra:
+            print("✅ user_effective_permissions is consistent")
+            return 0
+
+        print(f"⚠️ Missing rows: {len(missing)}, stale rows: {len(extra)}")
+        for label, rows in (("missing", missing), ("stale", extra)):
+            for user_id, permission_id, code, service_id in sorted(rows)[:REPORT_LIMIT]:
+                print(
+                    f"  {label}: user={user_id} permission={permission_id} code={code} service={service_id}"
+                )
+
+        if fix:
+            count = repo.rebuild()
+            print(f"✅ user_effective_permissions rebuilt: {count} rows")
+            return 0
+
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Обслуживание user_effective_permissions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="Полностью перестроить таблицу")
+    check_parser = subparsers.add_parser("check", help="Проверить согласованность")
+    check_parser.add_argument("--fix", action="store_true", help="Перестроить при расхождениях")
+    args = parser.parse_args()
+
+    init_db()
+
+    if args.command == "rebuild":
+        sys.exit(rebuild())
+    sys.exit(check(args.fix))
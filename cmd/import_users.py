@@ -0,0 +1,54 @@
+"""
+Массовый импорт пользователей из файла
+
+    python -m cmd.import_users users.csv
+    python -m cmd.import_users users.ndjson --format ndjson --batch-size 2000 --workers 8
+
+Формат файла описан в app/services/user_import_service.py. Код выхода 1,
+если хотя бы одна строка не импортирована.
+"""
+
+import argparse
+import sys
+import time
+
+from app.database import SessionLocal, init_db
+from app.services.user_import_service import (
+    USER_IMPORT_BATCH_SIZE,
+    USER_IMPORT_HASH_WORKERS,
+    UserImportService,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Массовый импорт пользователей")
+    parser.add_argument("path", help="Путь к файлу CSV или NDJSON")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="По умолчанию по расширению")
+    parser.add_argument("--batch-size", type=int, default=USER_IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=USER_IMPORT_HASH_WORKERS)
+    args = parser.parse_args()
+
+    file_format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    init_db()
+    db = SessionLocal()
+    started = time.time()
+    try:
+        with open(args.path, "rb") as file:
+            report = UserImportService(db).import_file(
+                file, file_format, args.batch_size, args.workers
+            )
+    finally:
+        db.close()
+
+    for error in report.errors:
+        print(f"  line {error.line} ({error.username or '-'}): {error.error}")
+    print(
+        f"✅ Imported {report.created} of {report.total} users in {time.time() - started:.1f}s, "
+        f"failed: {report.failed}"
+    )
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Обслуживание замыкания наследования ролей role_closure
+
+    python -m cmd.role_closure rebuild   # перестроить замыкание по role_parents
+
+Нужен, если таблицы созданы init_db без migrations/003_role_hierarchy.sql.
+После rebuild можно включить ROLE_INHERITANCE_ENABLED=true, затем перестроить
+python -m cmd.effective_permissions rebuild.
+"""
+
+import argparse
+import sys
+
+from app.database import SessionLocal, init_db
+from app.models import RoleClosure  # noqa: F401  регистрирует модели для init_db
+from app.repositories.role_hierarchy_repository import RoleHierarchyRepository
+
+
+def rebuild() -> int:
+    db = SessionLocal()
+    try:
+        count = RoleHierarchyRepository(db).rebuild()
+        db.commit()
+        print(f"✅ role_closure rebuilt: {count} rows")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Обслуживание role_closure")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="Перестроить замыкание")
+    args = parser.parse_args()
+
+    init_db()
+    sys.exit(rebuild())
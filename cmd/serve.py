@@ -0,0 +1,364 @@
+"""
+Production запуск: несколько процессов FastAPI и gRPC
+
+Каждый воркер - отдельный процесс со своим GIL. Воркеры одного типа слушают
+общий порт через SO_REUSEPORT, ядро само распределяет соединения между ними.
+
+Супервизор следит за воркерами по heartbeat: упавший или зависший воркер
+перезапускается. Повторные перезапуски одного воркера идут с растущей
+задержкой (до RESTART_BACKOFF_MAX); если воркер перезапускался --restart-limit
+раз за --restart-window секунд (например, падает при запуске: БД недоступна,
+ошибка конфигурации), супервизор останавливает все воркеры и завершается с
+кодом 1. По SIGTERM/SIGINT воркеры получают SIGTERM, перестают
+принимать новые соединения и дорабатывают текущие запросы в пределах
+--graceful-timeout, после чего оставшиеся процессы завершаются принудительно.
+
+Если задан --authz-snapshot (AUTHZ_SNAPSHOT_PATH), дополнительно запускается
+процесс-загрузчик снимка авторизационных данных (app/services/authz_snapshot.py),
+а воркеры проверяют разрешения по этому снимку.
+
+Запуск:
+    python -m cmd.serve --http-workers 4 --grpc-workers 2
+
+Все параметры можно задать через переменные окружения (см. _parse_args).
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing.sharedctypes import Synchronized
+
+# Интервал обновления heartbeat воркером (секунды)
+HEARTBEAT_INTERVAL = 1.0
+# Задержка повторного перезапуска воркера: удваивается с каждым перезапуском в окне
+RESTART_BACKOFF_BASE = 1.0
+RESTART_BACKOFF_MAX = 60.0
+
+
+@dataclass(frozen=True)
+class ServeConfig:
+    http_host: str
+    http_port: int
+    http_workers: int
+    grpc_host: str
+    grpc_port: int
+    grpc_workers: int
+    grpc_threads: int
+    graceful_timeout: float
+    heartbeat_timeout: float
+    restart_limit: int
+    restart_window: float
+    log_level: str
+    authz_snapshot: str | None
+
+
+@dataclass
+class Worker:
+    kind: str
+    index: int
+    process: multiprocessing.Process
+    heartbeat: Synchronized
+    started_at: float
+    # Время перезапусков этого воркера за последние restart_window секунд
+    restarts: list[float] = field(default_factory=list)
+    # Процесс завершен, перезапуск запланирован на это время
+    restart_at: float | None = None
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _parse_args() -> ServeConfig:
+    cpu_count = os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description="Многопроцессный запуск HTTP и gRPC серверов")
+    parser.add_argument("--http-host", default=os.getenv("HTTP_HOST", "0.0.0.0"))
+    parser.add_argument("--http-port", type=int, default=_env_int("HTTP_PORT", 8382))
+    parser.add_argument(
+        "--http-workers",
+        type=int,
+        default=_env_int("HTTP_WORKERS", cpu_count),
+        help="Количество процессов FastAPI (0 - не запускать)",
+    )
+    parser.add_argument("--grpc-host", default=os.getenv("GRPC_HOST", "0.0.0.0"))
+    parser.add_argument("--grpc-port", type=int, default=_env_int("GRPC_PORT", 8383))
+    parser.add_argument(
+        "--grpc-workers",
+        type=int,
+        default=_env_int("GRPC_WORKERS", cpu_count),
+        help="Количество процессов gRPC (0 - не запускать)",
+    )
+    parser.add_argument(
+        "--grpc-threads",
+        type=int,
+        default=_env_int("GRPC_THREADS", 10),
+        help="Количество потоков обработки в каждом gRPC процессе",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=_env_float("GRACEFUL_TIMEOUT", 30.0),
+        help="Сколько секунд ждать завершения текущих запросов при остановке",
+    )
+    parser.add_argument(
+        "--heartbeat-timeout",
+        type=float,
+        default=_env_float("HEARTBEAT_TIMEOUT", 30.0),
+        help="Через сколько секунд без heartbeat воркер считается зависшим",
+    )
+    parser.add_argument(
+        "--restart-limit",
+        type=int,
+        default=_env_int("RESTART_LIMIT", 10),
+        help="Сколько перезапусков воркера за --restart-window допустимо, дальше - остановка",
+    )
+    parser.add_argument(
+        "--restart-window",
+        type=float,
+        default=_env_float("RESTART_WINDOW", 300.0),
+        help="Окно подсчета перезапусков воркера (секунды)",
+    )
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    parser.add_argument(
+        "--authz-snapshot",
+        default=os.getenv("AUTHZ_SNAPSHOT_PATH"),
+        help="Путь к файлу снимка авторизационных данных (по умолчанию выключен)",
+    )
+    args = parser.parse_args()
+
+    # Сессии memory живут в памяти одного процесса: созданную при входе в HTTP
+    # воркере не увидят другие HTTP воркеры и gRPC (ValidatePermission)
+    if os.getenv("SESSION_STORE", "sql") == "memory" and args.http_workers + args.grpc_workers > 1:
+        parser.error(
+            "SESSION_STORE=memory работает только в одном процессе: "
+            "используйте sql или kv, либо один воркер"
+        )
+
+    return ServeConfig(
+        http_host=args.http_host,
+        http_port=args.http_port,
+        http_workers=args.http_workers,
+        grpc_host=args.grpc_host,
+        grpc_port=args.grpc_port,
+        grpc_workers=args.grpc_workers,
+        grpc_threads=args.grpc_threads,
+        graceful_timeout=args.graceful_timeout,
+        heartbeat_timeout=args.heartbeat_timeout,
+        restart_limit=args.restart_limit,
+        restart_window=args.restart_window,
+        log_level=args.log_level,
+        authz_snapshot=args.authz_snapshot,
+    )
+
+
+def _bind_reuseport_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_http_worker(config: ServeConfig, heartbeat: Synchronized) -> None:
+    """Процесс FastAPI: свой сокет с SO_REUSEPORT, graceful shutdown средствами uvicorn"""
+    import uvicorn
+
+    class HeartbeatServer(uvicorn.Server):
+        async def on_tick(self, counter: int) -> bool:
+            # on_tick вызывается из event loop, поэтому heartbeat подтверждает,
+            # что цикл событий не заблокирован
+            heartbeat.value = time.time()
+            return await super().on_tick(counter)
+
+    sock = _bind_reuseport_socket(config.http_host, config.http_port)
+    uvicorn_config = uvicorn.Config(
+        "app.api:app",
+        log_level=config.log_level,
+        timeout_graceful_shutdown=int(config.graceful_timeout),
+    )
+    HeartbeatServer(uvicorn_config).run(sockets=[sock])
+
+
+def run_grpc_worker(config: ServeConfig, heartbeat: Synchronized) -> None:
+    """Процесс gRPC: порт общий для всех gRPC воркеров через SO_REUSEPORT"""
+    from app.grpc_server import create_grpc_server
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    server = create_grpc_server(
+        f"{config.grpc_host}:{config.grpc_port}",
+        max_workers=config.grpc_threads,
+        reuse_port=True,
+    )
+    server.start()
+
+    while not stop_event.wait(HEARTBEAT_INTERVAL):
+        heartbeat.value = time.time()
+
+    # Новые RPC отклоняются сразу, текущие дорабатывают до graceful_timeout
+    server.stop(config.graceful_timeout).wait()
+
+
+def run_snapshot_worker(config: ServeConfig, heartbeat: Synchronized) -> None:
+    """Процесс-загрузчик снимка авторизационных данных"""
+    from app.services.authz_snapshot import run_snapshot_loader
+
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    signal.signal(signal.SIGINT, lambda *_: os._exit(0))
+    run_snapshot_loader(str(config.authz_snapshot), heartbeat)
+
+
+WORKER_TARGETS = {
+    "http": run_http_worker,
+    "grpc": run_grpc_worker,
+    "snapshot": run_snapshot_worker,
+}
+
+
+class Supervisor:
+    """Запускает воркеры, перезапускает упавшие и зависшие, останавливает по сигналу"""
+
+    def __init__(self, config: ServeConfig) -> None:
+        self.config = config
+        # spawn: воркеры не наследуют состояние супервизора (gRPC не поддерживает fork)
+        self.ctx = multiprocessing.get_context("spawn")
+        self.workers: list[Worker] = []
+        self.stopping = threading.Event()
+        # Воркер превысил лимит перезапусков
+        self.failed = False
+
+    def _start_worker(self, kind: str, index: int, restarts: list[float] | None = None) -> Worker:
+        target = WORKER_TARGETS[kind]
+        heartbeat = self.ctx.Value("d", time.time(), lock=False)
+        process = self.ctx.Process(
+            target=target,
+            args=(self.config, heartbeat),
+            name=f"{kind}-worker-{index}",
+        )
+        process.start()
+        print(f"🚀 Started {process.name} (pid {process.pid})")
+        return Worker(
+            kind=kind,
+            index=index,
+            process=process,
+            heartbeat=heartbeat,
+            started_at=time.time(),
+            restarts=restarts or [],
+        )
+
+    def _check_workers(self) -> None:
+        now = time.time()
+        for i, worker in enumerate(self.workers):
+            if worker.restart_at is not None:
+                if now >= worker.restart_at and not self.stopping.is_set():
+                    self.workers[i] = self._start_worker(worker.kind, worker.index, worker.restarts)
+                continue
+
+            process = worker.process
+            last_beat = max(worker.heartbeat.value, worker.started_at)
+
+            if not process.is_alive():
+                print(f"⚠️ {process.name} exited with code {process.exitcode}, restarting...")
+            elif now - last_beat > self.config.heartbeat_timeout:
+                print(
+                    f"⚠️ {process.name} missed heartbeat for {now - last_beat:.0f}s, restarting..."
+                )
+                process.kill()
+                process.join()
+            else:
+                continue
+
+            if not self.stopping.is_set():
+                self._schedule_restart(worker, now)
+
+    def _schedule_restart(self, worker: Worker, now: float) -> None:
+        """Первый перезапуск в окне - сразу, следующие - с удваивающейся задержкой"""
+        restarts = [t for t in worker.restarts if now - t < self.config.restart_window]
+        if len(restarts) >= self.config.restart_limit:
+            print(
+                f"❌ {worker.process.name} restarted {len(restarts)} times in "
+                f"{self.config.restart_window:.0f}s, giving up"
+            )
+            self.failed = True
+            self.stopping.set()
+            return
+
+        delay = (
+            min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** (len(restarts) - 1))
+            if restarts
+            else 0.0
+        )
+        if delay:
+            print(f"⏳ Restarting {worker.process.name} in {delay:g}s")
+        worker.restarts = [*restarts, now]
+        worker.restart_at = now + delay
+
+    def _shutdown(self) -> None:
+        print("🛑 Shutting down workers...")
+        for worker in self.workers:
+            if worker.process.is_alive():
+                os.kill(worker.process.pid, signal.SIGTERM)  # pyright: ignore[reportArgumentType]
+
+        deadline = time.time() + self.config.graceful_timeout
+        for worker in self.workers:
+            worker.process.join(max(0.0, deadline - time.time()))
+
+        for worker in self.workers:
+            if worker.process.is_alive():
+                print(f"⚠️ {worker.process.name} did not stop in time, killing")
+                worker.process.kill()
+                worker.process.join()
+
+        print("✅ Workers stopped")
+
+    def run(self) -> int:
+        """Возвращает код завершения: 1, если воркер превысил лимит перезапусков"""
+        signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: self.stopping.set())
+
+        if self.config.authz_snapshot:
+            # Воркеры читают путь к снимку из окружения при импорте
+            os.environ["AUTHZ_SNAPSHOT_PATH"] = self.config.authz_snapshot
+            self.workers.append(self._start_worker("snapshot", 0))
+
+        self.workers += [self._start_worker("http", i) for i in range(self.config.http_workers)] + [
+            self._start_worker("grpc", i) for i in range(self.config.grpc_workers)
+        ]
+
+        print(
+            f"✅ HTTP: {self.config.http_workers} workers on "
+            f"{self.config.http_host}:{self.config.http_port}, "
+            f"gRPC: {self.config.grpc_workers} workers on "
+            f"{self.config.grpc_host}:{self.config.grpc_port}"
+        )
+
+        while not self.stopping.wait(HEARTBEAT_INTERVAL):
+            self._check_workers()
+
+        self._shutdown()
+        return 1 if self.failed else 0
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🔥 STARTING SERVERS (production)")
+    print("=" * 60)
+
+    sys.exit(Supervisor(_parse_args()).run())
@@ -22,9 +22,10 @@ _runtime_version.ValidateProtobufRuntimeVersion(
 _sym_db = _symbol_database.Default()
 
 
+from google.protobuf import field_mask_pb2 as google_dot_protobuf_dot_field__mask__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10permission.proto\x12\x14generated.permission\"}\n\x11PermissionRequest\x12\x15\n\rsession_token\x18\x01 \x01(\t\x12\x0f\n\x07service\x18\x02 \x01(\t\x12\x0e\n\x06\x65ntity\x18\x03 \x01(\t\x12\x0e\n\x06\x61\x63tion\x18\x04 \x01(\t\x12\x14\n\x07user_id\x18\x05 \x01(\tH\x00\x88\x01\x01\x42\n\n\x08_user_id\"W\n\x12PermissionResponse\x12\x11\n\tis_access\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x0f\n\x07user_id\x18\x04 \x01(\t\x12\x0c\n\x04\x63ode\x18\x03 \x01(\x05\"k\n\x0fGetUsersRequest\x12\x43\n\x12permission_request\x18\x01 \x01(\x0b\x32\'.generated.permission.PermissionRequest\x12\x13\n\x0bonly_active\x18\x02 \x01(\x08\"9\n\x0cUserResponse\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0f\n\x07surname\x18\x03 \x01(\t\"u\n\x10GetUsersResponse\x12\x31\n\x05users\x18\x01 \x03(\x0b\x32\".generated.permission.UserResponse\x12\x14\n\x07message\x18\x02 \x01(\tH\x00\x88\x01\x01\x12\x0c\n\x04\x63ode\x18\x03 \x01(\x05\x42\n\n\x08_message2|\n\x11PermissionService\x12g\n\x12ValidatePermission\x12\'.generated.permission.PermissionRequest\x1a(.generated.permission.PermissionResponse2h\n\x0bUserService\x12Y\n\x08GetUsers\x12%.generated.permission.GetUsersRequest\x1a&.generated.permission.GetUsersResponseB(Z&TimeTrackBackend/internal/adapter/grpcb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10permission.proto\x12\x14generated.permission\x1a google/protobuf/field_mask.proto\"}\n\x11PermissionRequest\x12\x15\n\rsession_token\x18\x01 \x01(\t\x12\x0f\n\x07service\x18\x02 \x01(\t\x12\x0e\n\x06\x65ntity\x18\x03 \x01(\t\x12\x0e\n\x06\x61\x63tion\x18\x04 \x01(\t\x12\x14\n\x07user_id\x18\x05 \x01(\tH\x00\x88\x01\x01\x42\n\n\x08_user_id\"W\n\x12PermissionResponse\x12\x11\n\tis_access\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x0f\n\x07user_id\x18\x04 \x01(\t\x12\x0c\n\x04\x63ode\x18\x03 \x01(\x05\"\x9b\x01\n\x0fGetUsersRequest\x12\x43\n\x12permission_request\x18\x01 \x01(\x0b\x32\'.generated.permission.PermissionRequest\x12\x13\n\x0bonly_active\x18\x02 \x01(\x08\x12.\n\nfield_mask\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"9\n\x0cUserResponse\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0f\n\x07surname\x18\x03 \x01(\t\"u\n\x10GetUsersResponse\x12\x31\n\x05users\x18\x01 \x03(\x0b\x32\".generated.permission.UserResponse\x12\x14\n\x07message\x18\x02 \x01(\tH\x00\x88\x01\x01\x12\x0c\n\x04\x63ode\x18\x03 \x01(\x05\x42\n\n\x08_message\"\x19\n\x17WatchRevocationsRequest\"H\n\x0fRevocationEvent\x12\x14\n\x0ctoken_hashes\x18\x01 \x03(\t\x12\x10\n\x08user_ids\x18\x02 \x03(\t\x12\r\n\x05reset\x18\x03 \x01(\x08\x32\xe8\x01\n\x11PermissionService\x12g\n\x12ValidatePermission\x12\'.generated.permission.PermissionRequest\x1a(.generated.permission.PermissionResponse\x12j\n\x10WatchRevocations\x12-.generated.permission.WatchRevocationsRequest\x1a%.generated.permission.RevocationEvent0\x01\x32h\n\x0bUserService\x12Y\n\x08GetUsers\x12%.generated.permission.GetUsersRequest\x1a&.generated.permission.GetUsersResponseB(Z&TimeTrackBackend/internal/adapter/grpcb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,18 +33,22 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'permission_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   _globals['DESCRIPTOR']._loaded_options = None
   _globals['DESCRIPTOR']._serialized_options = b'Z&TimeTrackBackend/internal/adapter/grpc'
-  _globals['_PERMISSIONREQUEST']._serialized_start=42
-  _globals['_PERMISSIONREQUEST']._serialized_end=167
-  _globals['_PERMISSIONRESPONSE']._serialized_start=169
-  _globals['_PERMISSIONRESPONSE']._serialized_end=256
-  _globals['_GETUSERSREQUEST']._serialized_start=258
-  _globals['_GETUSERSREQUEST']._serialized_end=365
-  _globals['_USERRESPONSE']._serialized_start=367
-  _globals['_USERRESPONSE']._serialized_end=424
-  _globals['_GETUSERSRESPONSE']._serialized_start=426
-  _globals['_GETUSERSRESPONSE']._serialized_end=543
-  _globals['_PERMISSIONSERVICE']._serialized_start=545
-  _globals['_PERMISSIONSERVICE']._serialized_end=669
-  _globals['_USERSERVICE']._serialized_start=671
-  _globals['_USERSERVICE']._serialized_end=775
+  _globals['_PERMISSIONREQUEST']._serialized_start=76
+  _globals['_PERMISSIONREQUEST']._serialized_end=201
+  _globals['_PERMISSIONRESPONSE']._serialized_start=203
+  _globals['_PERMISSIONRESPONSE']._serialized_end=290
+  _globals['_GETUSERSREQUEST']._serialized_start=293
+  _globals['_GETUSERSREQUEST']._serialized_end=448
+  _globals['_USERRESPONSE']._serialized_start=450
+  _globals['_USERRESPONSE']._serialized_end=507
+  _globals['_GETUSERSRESPONSE']._serialized_start=509
+  _globals['_GETUSERSRESPONSE']._serialized_end=626
+  _globals['_WATCHREVOCATIONSREQUEST']._serialized_start=628
+  _globals['_WATCHREVOCATIONSREQUEST']._serialized_end=653
+  _globals['_REVOCATIONEVENT']._serialized_start=655
+  _globals['_REVOCATIONEVENT']._serialized_end=727
+  _globals['_PERMISSIONSERVICE']._serialized_start=730
+  _globals['_PERMISSIONSERVICE']._serialized_end=962
+  _globals['_USERSERVICE']._serialized_start=964
+  _globals['_USERSERVICE']._serialized_end=1068
 # @@protoc_insertion_point(module_scope)
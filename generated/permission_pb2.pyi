@@ -1,3 +1,4 @@
+from google.protobuf import field_mask_pb2 as _field_mask_pb2
 from google.protobuf.internal import containers as _containers
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
@@ -33,12 +34,14 @@ class PermissionResponse(_message.Message):
     def __init__(self, is_access: bool = ..., message: _Optional[str] = ..., user_id: _Optional[str] = ..., code: _Optional[int] = ...) -> None: ...
 
 class GetUsersRequest(_message.Message):
-    __slots__ = ("permission_request", "only_active")
+    __slots__ = ("permission_request", "only_active", "field_mask")
     PERMISSION_REQUEST_FIELD_NUMBER: _ClassVar[int]
     ONLY_ACTIVE_FIELD_NUMBER: _ClassVar[int]
+    FIELD_MASK_FIELD_NUMBER: _ClassVar[int]
     permission_request: PermissionRequest
     only_active: bool
-    def __init__(self, permission_request: _Optional[_Union[PermissionRequest, _Mapping]] = ..., only_active: bool = ...) -> None: ...
+    field_mask: _field_mask_pb2.FieldMask
+    def __init__(self, permission_request: _Optional[_Union[PermissionRequest, _Mapping]] = ..., only_active: bool = ..., field_mask: _Optional[_Union[_field_mask_pb2.FieldMask, _Mapping]] = ...) -> None: ...
 
 class UserResponse(_message.Message):
     __slots__ = ("id", "name", "surname")
@@ -59,3 +62,17 @@ class GetUsersResponse(_message.Message):
     message: str
     code: int
     def __init__(self, users: _Optional[_Iterable[_Union[UserResponse, _Mapping]]] = ..., message: _Optional[str] = ..., code: _Optional[int] = ...) -> None: ...
+
+class WatchRevocationsRequest(_message.Message):
+    __slots__ = ()
+    def __init__(self) -> None: ...
+
+class RevocationEvent(_message.Message):
+    __slots__ = ("token_hashes", "user_ids", "reset")
+    TOKEN_HASHES_FIELD_NUMBER: _ClassVar[int]
+    USER_IDS_FIELD_NUMBER: _ClassVar[int]
+    RESET_FIELD_NUMBER: _ClassVar[int]
+    token_hashes: _containers.RepeatedScalarFieldContainer[str]
+    user_ids: _containers.RepeatedScalarFieldContainer[str]
+    reset: bool
+    def __init__(self, token_hashes: _Optional[_Iterable[str]] = ..., user_ids: _Optional[_Iterable[str]] = ..., reset: bool = ...) -> None: ...
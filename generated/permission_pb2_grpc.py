@@ -43,6 +43,12 @@ class PermissionServiceStub(object):
             response_deserializer=permission__pb2.PermissionResponse.FromString,
             _registered_method=True,
         )
+        self.WatchRevocations = channel.unary_stream(
+            "/generated.permission.PermissionService/WatchRevocations",
+            request_serializer=permission__pb2.WatchRevocationsRequest.SerializeToString,
+            response_deserializer=permission__pb2.RevocationEvent.FromString,
+            _registered_method=True,
+        )
 
 
 class PermissionServiceServicer(object):
@@ -54,6 +60,12 @@ class PermissionServiceServicer(object):
         context.set_details("Method not implemented!")
         raise NotImplementedError("Method not implemented!")
 
+    def WatchRevocations(self, request, context):
+        """Поток отзывов сессий для сброса кэшей решений; пустое событие - проверка связи"""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
 
 def add_PermissionServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -62,6 +74,11 @@ def add_PermissionServiceServicer_to_server(servicer, server):
             request_deserializer=permission__pb2.PermissionRequest.FromString,
             response_serializer=permission__pb2.PermissionResponse.SerializeToString,
         ),
+        "WatchRevocations": grpc.unary_stream_rpc_method_handler(
+            servicer.WatchRevocations,
+            request_deserializer=permission__pb2.WatchRevocationsRequest.FromString,
+            response_serializer=permission__pb2.RevocationEvent.SerializeToString,
+        ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
         "generated.permission.PermissionService", rpc_method_handlers
@@ -106,6 +123,36 @@ class PermissionService(object):
             _registered_method=True,
         )
 
+    @staticmethod
+    def WatchRevocations(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            "/generated.permission.PermissionService/WatchRevocations",
+            permission__pb2.WatchRevocationsRequest.SerializeToString,
+            permission__pb2.RevocationEvent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
 
 class UserServiceStub(object):
     """Missing associated documentation comment in .proto file."""
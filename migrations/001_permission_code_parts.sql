@@ -0,0 +1,22 @@
+-- Сегменты кода разрешения "service:entity:action" и составной индекс по ним.
+-- Новые и измененные разрешения заполняют сегменты сами (Permission._set_code_parts),
+-- здесь - добавление колонок и заполнение существующих строк (MySQL).
+
+ALTER TABLE permissions
+    ADD COLUMN code_service VARCHAR(255) NULL AFTER code,
+    ADD COLUMN code_entity VARCHAR(255) NULL AFTER code_service,
+    ADD COLUMN code_action VARCHAR(255) NULL AFTER code_entity;
+
+-- Как app.models.permission.parse_code: сервис и сущность - при наличии хотя бы
+-- одного двоеточия, действие (остаток строки) - при наличии двух
+UPDATE permissions
+SET
+    code_service = CASE WHEN code LIKE '%:%' THEN SUBSTRING_INDEX(code, ':', 1) END,
+    code_entity = CASE
+        WHEN code LIKE '%:%' THEN SUBSTRING_INDEX(SUBSTRING_INDEX(code, ':', 2), ':', -1)
+    END,
+    code_action = CASE
+        WHEN code LIKE '%:%:%' THEN SUBSTRING(code, CHAR_LENGTH(SUBSTRING_INDEX(code, ':', 2)) + 2)
+    END;
+
+CREATE INDEX ix_permissions_code_parts ON permissions (code_service, code_entity, code_action);
@@ -0,0 +1,3 @@
+-- Дочитывание новых сессий в фильтр Блума (app/services/session_filter.py)
+-- и выборка действующих сессий идут по диапазону expires_at.
+CREATE INDEX ix_sessions_expires_at ON sessions (expires_at);
@@ -0,0 +1,24 @@
+-- Наследование ролей (app/repositories/role_hierarchy_repository.py).
+-- role_parents - прямые связи, role_closure - роль и все ее предки.
+CREATE TABLE role_parents (
+    role_id CHAR(36) NOT NULL,
+    parent_id CHAR(36) NOT NULL,
+    PRIMARY KEY (role_id, parent_id),
+    INDEX ix_role_parents_parent_id (parent_id),
+    FOREIGN KEY (role_id) REFERENCES roles (id) ON DELETE CASCADE,
+    FOREIGN KEY (parent_id) REFERENCES roles (id) ON DELETE CASCADE
+);
+
+CREATE TABLE role_closure (
+    role_id CHAR(36) NOT NULL,
+    ancestor_id CHAR(36) NOT NULL,
+    PRIMARY KEY (role_id, ancestor_id),
+    INDEX ix_role_closure_ancestor (ancestor_id, role_id),
+    FOREIGN KEY (role_id) REFERENCES roles (id) ON DELETE CASCADE,
+    FOREIGN KEY (ancestor_id) REFERENCES roles (id) ON DELETE CASCADE
+);
+
+-- Связей до миграции нет: замыкание существующих ролей - только они сами.
+-- Новые роли получают строку при создании.
+INSERT INTO role_closure (role_id, ancestor_id)
+SELECT id, id FROM roles;
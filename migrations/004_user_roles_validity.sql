@@ -0,0 +1,6 @@
+-- Временные назначения ролей (app/services/role_expiry.py): роль действует
+-- с valid_from и до valid_until; NULL - без ограничения.
+ALTER TABLE user_roles
+    ADD COLUMN valid_from DATETIME NULL,
+    ADD COLUMN valid_until DATETIME NULL;
+CREATE INDEX ix_user_roles_valid_until ON user_roles (valid_until);
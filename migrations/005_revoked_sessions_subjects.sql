@@ -0,0 +1,5 @@
+-- Рассылка отзывов сессий подписчикам WatchRevocations (app/services/revocation_hub.py):
+-- журнал отзывов хранит хэш токена и пользователя отозванной сессии.
+ALTER TABLE revoked_sessions
+    ADD COLUMN token_hash VARCHAR(64) NULL,
+    ADD COLUMN user_id CHAR(36) NULL;
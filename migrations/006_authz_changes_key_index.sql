@@ -0,0 +1,3 @@
+-- ETag разрешений и сервисов пользователя строится по последней записи журнала
+-- authz_changes для его назначений и ролей (app/repositories/authz_version_repository.py).
+CREATE INDEX ix_authz_changes_key ON authz_changes (`key`);
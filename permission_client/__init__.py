@@ -0,0 +1,3 @@
+from permission_client.client import PermissionClient
+
+__all__ = ["PermissionClient"]
@@ -0,0 +1,335 @@
+"""
+Клиент gRPC API PermissionService с локальным кэшем решений
+
+    client = PermissionClient("permissions:8383")
+    response = client.validate(session_token, "api", "users", "read")
+    if not response.is_access:
+        ...
+
+Решения (200/401/403) кэшируются по ключу (sha256 токена, service, entity,
+action, user_id) с LRU вытеснением и TTL. Одновременные одинаковые проверки
+объединяются в один RPC. Кэш можно сбрасывать по токену или пользователю
+(invalidate_token / invalidate_user), например по событиям отзыва сессий.
+
+watch_revocations() подписывается на поток отзывов сессий (WatchRevocations) и
+сбрасывает решения отозванных токенов и их пользователей сразу после отзыва,
+поэтому allow_ttl можно делать длинным. Пока поток разорван, отзывы могут
+теряться: кэш очищается и не используется до переподключения.
+"""
+
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import grpc
+
+from generated.permission_pb2 import (
+    PermissionRequest,
+    PermissionResponse,
+    RevocationEvent,
+    WatchRevocationsRequest,
+)
+from generated.permission_pb2_grpc import PermissionServiceStub
+
+# (token_hash, service, entity, action, user_id)
+CacheKey = tuple[str, str, str, str, str]
+
+# Коды ответа, которые можно кэшировать: ошибки сервера (500) не кэшируются
+CACHEABLE_CODES = (200, 401, 403)
+
+
+def token_hash(session_token: str) -> str:
+    """Хэш токена в том же формате, что хранит сервер (sessions.token_hash)"""
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+
+class _DecisionCache:
+    """LRU кэш решений с TTL и индексами по токену и пользователю для инвалидации"""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[CacheKey, tuple[PermissionResponse, float]] = OrderedDict()
+        self._by_token: dict[str, set[CacheKey]] = {}
+        self._by_user: dict[str, set[CacheKey]] = {}
+
+    def get(self, key: CacheKey) -> PermissionResponse | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        response, expires_at = item
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            return None
+        self._data.move_to_end(key)
+        return response
+
+    def set(self, key: CacheKey, response: PermissionResponse, ttl: float) -> None:
+        self._data[key] = (response, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        self._by_token.setdefault(key[0], set()).add(key)
+        if response.user_id:
+            self._by_user.setdefault(response.user_id, set()).add(key)
+        while len(self._data) > self.maxsize:
+            self._remove(next(iter(self._data)))
+
+    def _remove(self, key: CacheKey) -> None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        for index, index_key in ((self._by_token, key[0]), (self._by_user, item[0].user_id)):
+            keys = index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[index_key]
+
+    def remove_token(self, hashed_token: str) -> int:
+        keys = list(self._by_token.get(hashed_token, ()))
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def remove_user(self, user_id: str) -> int:
+        keys = list(self._by_user.get(user_id, ()))
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._by_token.clear()
+        self._by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PermissionClient:
+    """
+    Потокобезопасный клиент PermissionService.
+
+    Args:
+        target: Адрес сервера ("host:port")
+        pool_size: Количество gRPC каналов, запросы распределяются по кругу
+        timeout: Дедлайн одного вызова по умолчанию (секунды)
+        allow_ttl: Сколько кэшировать разрешающие решения (секунды)
+        deny_ttl: Сколько кэшировать запрещающие решения и недействительные сессии
+        cache_size: Максимум решений в кэше (0 - без кэша)
+        channel_options: Дополнительные опции gRPC каналов
+        credentials: Учетные данные для защищенного канала (по умолчанию insecure)
+        source_service: Имя вызывающего сервиса для журнала аудита (x-source-service)
+    """
+
+    def __init__(
+        self,
+        target: str,
+        pool_size: int = 2,
+        timeout: float = 1.0,
+        allow_ttl: float = 30.0,
+        deny_ttl: float = 5.0,
+        cache_size: int = 100_000,
+        channel_options: list[tuple[str, object]] | None = None,
+        credentials: grpc.ChannelCredentials | None = None,
+        source_service: str | None = None,
+    ) -> None:
+        self.timeout = timeout
+        self._metadata = (("x-source-service", source_service),) if source_service else None
+        self.allow_ttl = allow_ttl
+        self.deny_ttl = deny_ttl
+
+        self._channels = [
+            grpc.secure_channel(target, credentials, options=channel_options)
+            if credentials is not None
+            else grpc.insecure_channel(target, options=channel_options)
+            for _ in range(max(1, pool_size))
+        ]
+        self._stubs = [PermissionServiceStub(channel) for channel in self._channels]
+        self._next_stub = itertools.cycle(self._stubs)
+
+        self._cache = _DecisionCache(cache_size)
+        self._cache_enabled = cache_size > 0
+        self._inflight: dict[CacheKey, Future] = {}
+        self._lock = threading.Lock()
+
+        # Подписка на отзывы: номер последнего события и признак потерянных отзывов
+        self._revocation_epoch = 0
+        self._revocations_lost = False
+        self._watch_call = None
+        self._closed = threading.Event()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.rpc_calls = 0
+        self.revocations = 0
+        self.watch_reconnects = 0
+
+    def validate(
+        self,
+        session_token: str,
+        service: str,
+        entity: str,
+        action: str,
+        user_id: str | None = None,
+        timeout: float | None = None,
+    ) -> PermissionResponse:
+        """
+        Проверяет разрешение (аналог ValidatePermission).
+
+        Raises:
+            grpc.RpcError: Сервер недоступен или истек дедлайн
+        """
+        key: CacheKey = (token_hash(session_token), service, entity, action, user_id or "")
+
+        with self._lock:
+            use_cache = self._cache_enabled and not self._revocations_lost
+            epoch = self._revocation_epoch
+            if use_cache:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self.hits += 1
+                    return cached
+                self.misses += 1
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if future is None:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        call_timeout = timeout if timeout is not None else self.timeout
+        if not leader:
+            # Ждем результат уже выполняющегося такого же запроса
+            return future.result(timeout=call_timeout)
+
+        try:
+            request = PermissionRequest(
+                session_token=session_token,
+                service=service,
+                entity=entity,
+                action=action,
+                user_id=user_id,
+            )
+            stub = next(self._next_stub)
+            response = stub.ValidatePermission(
+                request, timeout=call_timeout, metadata=self._metadata
+            )
+            self.rpc_calls += 1
+
+            with self._lock:
+                # Отзыв во время вызова мог сделать ответ устаревшим - такой не кэшируем
+                if (
+                    use_cache
+                    and epoch == self._revocation_epoch
+                    and not self._revocations_lost
+                    and response.code in CACHEABLE_CODES
+                ):
+                    ttl = self.allow_ttl if response.is_access else self.deny_ttl
+                    self._cache.set(key, response, ttl)
+
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def is_allowed(
+        self,
+        session_token: str,
+        service: str,
+        entity: str,
+        action: str,
+        user_id: str | None = None,
+        timeout: float | None = None,
+    ) -> bool:
+        return self.validate(session_token, service, entity, action, user_id, timeout).is_access
+
+    def invalidate_token(self, session_token: str | None = None, hashed: str | None = None) -> int:
+        """Удаляет решения по токену (или по его sha256). Возвращает число удаленных записей"""
+        hashed = hashed or token_hash(session_token or "")
+        with self._lock:
+            return self._cache.remove_token(hashed)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Удаляет решения пользователя. Возвращает число удаленных записей"""
+        with self._lock:
+            return self._cache.remove_user(user_id)
+
+    def watch_revocations(self, retry_delay: float = 1.0) -> None:
+        """Запускает фоновую подписку на отзывы сессий с переподключением"""
+        with self._lock:
+            self._revocations_lost = True
+        threading.Thread(
+            target=self._watch, args=(retry_delay,), name="permission-revocations", daemon=True
+        ).start()
+
+    def _watch(self, retry_delay: float) -> None:
+        while not self._closed.is_set():
+            call = self._stubs[0].WatchRevocations(
+                WatchRevocationsRequest(), metadata=self._metadata
+            )
+            self._watch_call = call
+            try:
+                for event in call:
+                    self._apply_revocations(event)
+            except grpc.RpcError:
+                pass
+
+            with self._lock:
+                # Отзывы до переподключения могли потеряться
+                self._revocations_lost = True
+                self._revocation_epoch += 1
+                self._cache.clear()
+            if self._closed.wait(retry_delay):
+                return
+            self.watch_reconnects += 1
+
+    def _apply_revocations(self, event: RevocationEvent) -> None:
+        if not event.reset and not event.token_hashes and not event.user_ids:
+            # Проверка связи
+            return
+        with self._lock:
+            self._revocation_epoch += 1
+            if event.reset:
+                self._cache.clear()
+                self._revocations_lost = False
+            for hashed in event.token_hashes:
+                self._cache.remove_token(hashed)
+            for user_id in event.user_ids:
+                self._cache.remove_user(user_id)
+        self.revocations += len(event.token_hashes)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "rpc_calls": self.rpc_calls,
+            "cached": len(self._cache),
+            "revocations": self.revocations,
+            "watch_reconnects": self.watch_reconnects,
+        }
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._watch_call is not None:
+            self._watch_call.cancel()
+        for channel in self._channels:
+            channel.close()
+
+    def __enter__(self) -> "PermissionClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,29 +1,22 @@
 """
-Запуск gRPC и FastAPI серверов одновременно
+Запуск gRPC и FastAPI серверов одновременно (режим разработки)
+
+Для production используйте многопроцессный запуск: python -m cmd.serve
 """
 
+import os
 import threading
-from concurrent import futures
 
-import grpc
 import uvicorn
 
-from app.services.permission_grpc_service import PermissionGrpcService
-from app.services.user_grpc_service import UserGrpcService
-from generated.permission_pb2_grpc import (
-    add_PermissionServiceServicer_to_server,
-    add_UserServiceServicer_to_server,
-)
+from app.grpc_server import create_grpc_server
 
 
 def run_grpc_server():
     """Запуск gRPC сервера в отдельном потоке"""
     print("🚀 Starting gRPC server on localhost:8383...")
 
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    add_PermissionServiceServicer_to_server(PermissionGrpcService(), server)
-    add_UserServiceServicer_to_server(UserGrpcService(), server)
-    server.add_insecure_port("0.0.0.0:8383")
+    server = create_grpc_server("0.0.0.0:8383")
 
     server.start()
     print("✅ gRPC server started successfully on localhost:8383")
@@ -39,11 +32,18 @@ def run_fastapi_server():
     """Запуск FastAPI сервера"""
     print("🚀 Starting FastAPI server on 0.0.0.0:8382...")
 
+    # С reload приложение работает в дочернем процессе uvicorn, а gRPC - в этом.
+    # Сессии SESSION_STORE=memory живут в памяти процесса: созданные при входе через
+    # HTTP не увидит gRPC, поэтому с memory оба сервера работают в одном процессе
+    reload = os.getenv("SESSION_STORE", "sql") != "memory"
+    if not reload:
+        print("⚠️ SESSION_STORE=memory: reload disabled, HTTP and gRPC share one process")
+
     uvicorn.run(
         "app.api:app",
         host="0.0.0.0",
         port=8382,
-        reload=True,  # ⚠️ Отключаем reload при многопоточном запуске
+        reload=reload,  # ⚠️ Отключаем reload при многопоточном запуске
         log_level="info",
     )
 